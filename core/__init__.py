@@ -1,13 +1,32 @@
 # Importing modules from the core package
+import importlib
 import logging
 
-from core.bias_detection import handle_bias_detection
-from core.contract_analysis import handle_contract_analysis
-from core.debate import handle_debate
-from core.fact_check import handle_fact_check
-from core.negotiation import handle_negotiation
-from core.salary_negotiation import handle_salary_negotiation
-from utils.prompt_engineering import PROMPT_TEMPLATES, create_prompt
+# Handlers are imported on first access, so importing one core module (or the
+# package itself) does not load every handler and its dependencies.
+_LAZY_EXPORTS = {
+    "handle_debate": "core.debate",
+    "handle_negotiation": "core.negotiation",
+    "handle_fact_check": "core.fact_check",
+    "handle_bias_detection": "core.bias_detection",
+    "handle_contract_analysis": "core.contract_analysis",
+    "handle_salary_negotiation": "core.salary_negotiation",
+    "create_prompt": "utils.prompt_engineering",
+    "PROMPT_TEMPLATES": "utils.prompt_engineering",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 
 # Set the logging level for the setuptools logger to INFO to avoid unnecessary logs during the installation of the package in the user's environment and add a StreamHandler to print the logs to the console.
 setuptools_logger = logging.getLogger("setuptools")
@@ -1,17 +1,26 @@
 """ This module contains functions for detecting cognitive biases in user arguments and suggesting debiasing strategies."""
 
 import logging
-from typing import AsyncIterable, Dict, List
+import os
+from typing import AsyncIterable, List
 
 import fastapi_poe as fp
 from fastapi_poe.client import BotError
 
+from utils.caching import BoundedCache
+from utils.concurrency import ordered_concurrently
+from utils.intent_router import strip_keyword
 from utils.prompt_engineering import create_prompt
+from utils.text_matching import PatternMatcher
+from utils.upstream import fork_request, stream_request
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)  # Set the logging level to INFO
 logger = logging.getLogger(__name__)  # Create a logger for this module
 
+# Name under which upstream responses are cached (see utils.llm_cache)
+HANDLER = "bias_detection"
+
 # List of common cognitive biases
 COMMON_BIASES = [
     "Fundamental Attribution Error",
@@ -46,12 +55,29 @@ COMMON_BIASES = [
     "Empathy Gap",
 ]
 
-# Cache for detected biases to improve performance
-bias_cache: Dict[str, List[str]] = {}
+# Compiled once; scans streamed responses for every bias name in a single pass
+BIAS_MATCHER = PatternMatcher(COMMON_BIASES)
+
+# Bounds for the detected-bias cache (entries, estimated bytes, seconds)
+BIAS_CACHE_MAXSIZE = int(os.environ.get("BIAS_CACHE_MAXSIZE", "1024"))
+BIAS_CACHE_MAX_BYTES = int(os.environ.get("BIAS_CACHE_MAX_BYTES", "4194304"))
+BIAS_CACHE_TTL = float(os.environ.get("BIAS_CACHE_TTL", "3600"))
+
+# How many bias explanations are requested from the upstream bot at once
+BIAS_EXPLAIN_CONCURRENCY = int(os.environ.get("BIAS_EXPLAIN_CONCURRENCY", "4"))
+
+# Cache of detected biases by normalized argument, bounded so long-lived
+# workers don't grow without limit
+bias_cache = BoundedCache(
+    maxsize=BIAS_CACHE_MAXSIZE,
+    max_bytes=BIAS_CACHE_MAX_BYTES,
+    ttl=BIAS_CACHE_TTL,
+    name="bias_cache",
+)
 
 
 async def handle_bias_detection(
-    request: fp.QueryRequest, user_input: str
+    request: fp.QueryRequest, user_input: str, keyword: str = "cognitive bias"
 ) -> AsyncIterable[fp.PartialResponse]:
     """
     Handles user requests for cognitive bias detection.
@@ -59,13 +85,14 @@ async def handle_bias_detection(
     Parameters:
         request (fp.QueryRequest): The request object containing user input and context.
         user_input (str): The user's input argument for analysis.
+        keyword (str): The keyword the message was routed on, removed from the input.
 
     Yields:
         AsyncIterable[fp.PartialResponse]: Responses to the user regarding bias analysis.
     """
     # Handle bias detection logic here and yield responses to the user
     try:
-        argument = user_input.replace("cognitive bias", "").strip()
+        argument = strip_keyword(user_input, keyword)
         if not argument:
             raise BotError("Please provide an argument to analyze.")
 
@@ -79,22 +106,32 @@ async def handle_bias_detection(
                 content=create_prompt("bias_detection", topic=argument), role="user"
             )
         )
-        async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+        async for msg in stream_request(
+            request, "GPT-4", request.access_key, handler=HANDLER
+        ):
             yield fp.PartialResponse(text=msg.text)
 
         # Check cache first
-        if argument in bias_cache:
-            detected_biases = bias_cache[argument]
-        else:
+        detected_biases = bias_cache.get(argument)
+        if detected_biases is None:
             detected_biases = await detect_specific_biases(request, argument)
             bias_cache[argument] = detected_biases
 
         # Provide detailed analysis of detected biases and prompt user for next steps
         if detected_biases:
             yield fp.PartialResponse(text="\n\nDetailed bias analysis:\n\n")
-            for bias in detected_biases:
-                explanation = await explain_bias(request, bias, argument)
-                yield fp.PartialResponse(text=f"{bias}: \n{explanation}\n\n")
+            # Explanations are requested concurrently but shown in detection
+            # order, each as soon as it and the ones before it are ready.
+            explanations = ordered_concurrently(
+                (explain_bias(request, bias, argument) for bias in detected_biases),
+                BIAS_EXPLAIN_CONCURRENCY,
+            )
+            try:
+                for bias in detected_biases:
+                    explanation = await anext(explanations)
+                    yield fp.PartialResponse(text=f"{bias}: \n{explanation}\n\n")
+            finally:
+                await explanations.aclose()
 
             yield fp.PartialResponse(
                 text="\n\nWould you like to: \n"
@@ -138,19 +175,17 @@ async def detect_specific_biases(request: fp.QueryRequest, argument: str) -> Lis
     """
     # Detect specific biases in the argument using GPT-3.5-Turbo model
     try:
-        detected_biases = []
+        scanner = BIAS_MATCHER.scanner()
         request.query.append(
             fp.ProtocolMessage(
                 content=create_prompt("bias_detection", topic=argument), role="user"
             )
         )
-        async for msg in fp.stream_request(
-            request, "GPT-3.5-Turbo", request.access_key
+        async for msg in stream_request(
+            request, "GPT-3.5-Turbo", request.access_key, handler=HANDLER
         ):
-            for bias in COMMON_BIASES:
-                if bias.lower() in msg.text.lower():
-                    detected_biases.append(bias)
-        return detected_biases
+            scanner.feed(msg.text)
+        return scanner.patterns
     except Exception as e:
         logger.error(f"Error in detect_specific_biases: {e}")
         return []  # Return empty list if an error occurs
@@ -174,12 +209,14 @@ async def explain_bias(request: fp.QueryRequest, bias: str, argument: str) -> st
             f"Explain how the {bias} is manifested in the following argument: "
             f"{argument}"
         )
-        request.query.append(
-            fp.ProtocolMessage(content=explanation_prompt, role="user")
+        # Runs alongside the other explanations, so it gets its own copy of the
+        # conversation
+        explain_request = fork_request(
+            request, [fp.ProtocolMessage(content=explanation_prompt, role="user")]
         )
         explanation = ""
-        async for msg in fp.stream_request(
-            request, "Claude-instant", request.access_key
+        async for msg in stream_request(
+            explain_request, "Claude-instant", request.access_key, handler=HANDLER
         ):
             explanation += msg.text
         return explanation
@@ -208,7 +245,9 @@ async def suggest_debiasing_strategies(
             f"{', '.join(biases)}"
         )
         request.query.append(fp.ProtocolMessage(content=prompt, role="user"))
-        async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+        async for msg in stream_request(
+            request, "GPT-4", request.access_key, handler=HANDLER
+        ):
             yield fp.PartialResponse(text=msg.text)
     except Exception as e:
         logger.error(f"Error in suggest_debiasing_strategies: {e}")
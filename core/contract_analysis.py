@@ -1,9 +1,13 @@
 """ The functions in this module leverage the OpenAI API to analyze contract clauses, identify potential legal implications, suggest improvements, and provide sentiment analysis. """
 
+import asyncio
+import os
 from typing import AsyncIterable, Dict
 import fastapi_poe as fp
 from utils.prompt_engineering import create_prompt
+from utils.intent_router import strip_keyword
 from utils.error_handling import BotError
+from utils.upstream import fork_request, stream_request
 
 import logging
 
@@ -12,9 +16,18 @@ logging.basicConfig(level=logging.INFO)  # Change to DEBUG for more detailed log
 logging.getLogger("transformers").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Name under which upstream responses are cached (see utils.llm_cache)
+HANDLER = "contract_analysis"
+
+# Run the breakdown, legal and sentiment stages at the same time as the initial
+# analysis instead of one after another
+CONTRACT_ANALYSIS_CONCURRENT = os.environ.get(
+    "CONTRACT_ANALYSIS_CONCURRENT", "true"
+).lower() in ("1", "true", "yes")
+
 
 async def handle_contract_analysis(
-    request: fp.QueryRequest, user_input: str
+    request: fp.QueryRequest, user_input: str, keyword: str = "contract"
 ) -> AsyncIterable[fp.PartialResponse]:
     """
     Handles user requests for contract analysis.
@@ -22,17 +35,34 @@ async def handle_contract_analysis(
     Parameters:
         request (fp.QueryRequest): The request object containing user input and context.
         user_input (str): The user's input indicating the contract clause to analyze.
+        keyword (str): The keyword the message was routed on, removed from the input.
 
     Yields:
         AsyncIterable[fp.PartialResponse]: Responses to the user regarding contract analysis.
     """
-    clause = user_input.replace("contract", "").strip()
+    clause = strip_keyword(user_input, keyword)
     if not clause:
         raise BotError("Please provide a contract clause to analyze.")
 
     yield fp.PartialResponse(text="Analyzing the contract clause...\n\n")
     logger.info("Starting contract clause analysis")
 
+    # The breakdown, legal and sentiment stages don't depend on each other or
+    # on the initial analysis. In concurrent mode they all start now and their
+    # buffered results are shown in section order once the initial analysis
+    # has streamed; otherwise each starts when its section is reached.
+    stage_calls = (
+        lambda: get_detailed_breakdown(request, clause),
+        lambda: get_legal_implications(request, clause),
+        lambda: get_sentiment_analysis(request, clause),
+    )
+    if CONTRACT_ANALYSIS_CONCURRENT:
+        tasks = [asyncio.ensure_future(call()) for call in stage_calls]
+        stages = iter(tasks)
+    else:
+        tasks = []
+        stages = (call() for call in stage_calls)
+
     try:
         # Perform initial analysis of the contract clause
         request.query.append(
@@ -40,23 +70,25 @@ async def handle_contract_analysis(
                 content=create_prompt("contract_analysis", topic=clause), role="user"
             )
         )
-        async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+        async for msg in stream_request(
+            request, "GPT-4", request.access_key, handler=HANDLER
+        ):
             yield fp.PartialResponse(text=msg.text)
 
         # Provide a detailed breakdown of the clause
         yield fp.PartialResponse(text="\n\nProviding a detailed breakdown:\n\n")
-        breakdown = await get_detailed_breakdown(request, clause)
+        breakdown = await next(stages)
         for section, analysis in breakdown.items():
             yield fp.PartialResponse(text=f"{section}: \n{analysis}\n\n")
 
         # Analyze potential legal implications of the clause
         yield fp.PartialResponse(text="Potential legal implications:\n\n")
-        legal_analysis = await get_legal_implications(request, clause)
+        legal_analysis = await next(stages)
         yield fp.PartialResponse(text=legal_analysis)
 
         # Provide sentiment analysis of the clause
         yield fp.PartialResponse(text="Sentiment analysis of the clause:\n\n")
-        sentiment = await get_sentiment_analysis(request, clause)
+        sentiment = await next(stages)
         yield fp.PartialResponse(text=sentiment)
 
         yield fp.PartialResponse(
@@ -82,6 +114,10 @@ async def handle_contract_analysis(
         yield fp.PartialResponse(
             text="An error occurred during the analysis. Please try again later."
         )
+    finally:
+        # Stops stages still running after an error or a client disconnect
+        for task in tasks:
+            task.cancel()
 
 
 async def get_detailed_breakdown(
@@ -99,13 +135,18 @@ async def get_detailed_breakdown(
     """
     breakdown = {}
     try:
-        request.query.append(
-            fp.ProtocolMessage(
-                content=create_prompt("contract_analysis", topic=contract_clause),
-                role="user",
-            )
+        stage_request = fork_request(
+            request,
+            [
+                fp.ProtocolMessage(
+                    content=create_prompt("contract_breakdown", topic=contract_clause),
+                    role="user",
+                )
+            ],
         )
-        async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+        async for msg in stream_request(
+            stage_request, "GPT-4", request.access_key, handler=HANDLER
+        ):
             sections = msg.text.split('\n\n')
             for section in sections:
                 if ':' in section:
@@ -129,16 +170,19 @@ async def get_legal_implications(request: fp.QueryRequest, contract_clause: str)
     """
     legal_analysis = ""
     try:
-        request.query.append(
-            fp.ProtocolMessage(
-                content=create_prompt("contract_analysis", topic=contract_clause),
-                role="user",
-            )
-        )
-        async for msg in fp.stream_request(
+        stage_request = fork_request(
             request,
-            "Claude-instant",
-            request.access_key,
+            [
+                fp.ProtocolMessage(
+                    content=create_prompt(
+                        "contract_legal_implications", topic=contract_clause
+                    ),
+                    role="user",
+                )
+            ],
+        )
+        async for msg in stream_request(
+            stage_request, "Claude-instant", request.access_key, handler=HANDLER
         ):
             legal_analysis += msg.text
     except Exception as e:
@@ -167,7 +211,9 @@ async def suggest_improvements(
                 role="user",
             )
         )
-        async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+        async for msg in stream_request(
+            request, "GPT-4", request.access_key, handler=HANDLER
+        ):
             yield fp.PartialResponse(text=msg.text)
     except Exception as e:
         logger.error(f"Error during suggestions for improvements: {e}")
@@ -186,13 +232,18 @@ async def get_sentiment_analysis(request: fp.QueryRequest, contract_clause: str)
     """
     sentiment_analysis = ""
     try:
-        request.query.append(
-            fp.ProtocolMessage(
-                content=create_prompt("contract_analysis", topic=contract_clause),
-                role="user",
-            )
+        stage_request = fork_request(
+            request,
+            [
+                fp.ProtocolMessage(
+                    content=create_prompt("contract_sentiment", topic=contract_clause),
+                    role="user",
+                )
+            ],
         )
-        async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+        async for msg in stream_request(
+            stage_request, "GPT-4", request.access_key, handler=HANDLER
+        ):
             sentiment_analysis += msg.text
     except Exception as e:
         logger.error(f"Error during sentiment analysis: {e}")
@@ -1,6 +1,8 @@
 from typing import AsyncIterable
 import fastapi_poe as fp
 from utils.prompt_engineering import create_prompt
+from utils.intent_router import strip_keyword
+from utils.upstream import stream_request
 from fastapi_poe.client import BotError
 import logging
 
@@ -8,9 +10,12 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Name under which upstream responses are cached (see utils.llm_cache)
+HANDLER = "debate"
+
 
 async def handle_debate(
-    request: fp.QueryRequest, user_input: str
+    request: fp.QueryRequest, user_input: str, keyword: str = "debate"
 ) -> AsyncIterable[fp.PartialResponse]:
     """
     Handles user requests for generating debates.
@@ -18,11 +23,12 @@ async def handle_debate(
     Parameters:
         request (fp.QueryRequest): The request object containing user input and context.
         user_input (str): The user's input indicating the debate topic.
+        keyword (str): The keyword the message was routed on, removed from the input.
 
     Yields:
         AsyncIterable[fp.PartialResponse]: Responses to the user regarding the debate.
     """
-    topic = user_input.replace("debate", "").strip()  # Extract the topic
+    topic = strip_keyword(user_input, keyword)  # Extract the topic
     if not topic:
         raise BotError("Please provide a debate topic.")
 
@@ -30,7 +36,9 @@ async def handle_debate(
         fp.ProtocolMessage(content=create_prompt("debate", topic=topic), role="user")
     )
 
-    async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+    async for msg in stream_request(
+        request, "GPT-4", request.access_key, handler=HANDLER
+    ):
         yield msg  # Send the generated response to the user for the debate topic prompt
 
     yield fp.PartialResponse(
@@ -57,7 +65,9 @@ async def handle_debate(
             role="user",
         )
     )
-    async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+    async for msg in stream_request(
+        request, "GPT-4", request.access_key, handler=HANDLER
+    ):
         yield fp.PartialResponse(text=msg.text)
 
     yield fp.PartialResponse(
@@ -98,5 +108,7 @@ async def generate_counterarguments(
             role="user",
         )
     )
-    async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+    async for msg in stream_request(
+        request, "GPT-4", request.access_key, handler=HANDLER
+    ):
         yield fp.PartialResponse(text=msg.text)
@@ -1,13 +1,68 @@
+import asyncio
+import os
 from typing import AsyncIterable
 import fastapi_poe as fp
 from fastapi_poe import BotError, PartialResponse, QueryRequest
 import logging
+from utils.intent_router import strip_keyword
+from utils.metrics import register_metrics
+from utils.near_duplicates import NearDuplicateIndex
 from utils.prompt_engineering import create_prompt
+from utils.upstream import stream_request
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Name under which upstream responses are cached (see utils.llm_cache)
+HANDLER = "fact_check"
+
+# Reuse the result of an earlier statement worded almost the same way
+FACT_CHECK_NEAR_DUPLICATES = os.environ.get(
+    "FACT_CHECK_NEAR_DUPLICATES", "true"
+).lower() in ("1", "true", "yes")
+# Minimum estimated Jaccard similarity (of character shingles) for reuse; the
+# statements' numbers and negation words must also be the same
+FACT_CHECK_SIMILARITY = float(os.environ.get("FACT_CHECK_SIMILARITY", "0.8"))
+FACT_CHECK_INDEX_PATH = os.environ.get(
+    "FACT_CHECK_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "fact_check_index.npz"),
+)
+# The index is saved after this many new statements, and at shutdown
+FACT_CHECK_INDEX_SAVE_EVERY = int(os.environ.get("FACT_CHECK_INDEX_SAVE_EVERY", "50"))
+
+
+def load_fact_check_index() -> NearDuplicateIndex:
+    """Loads the saved near-duplicate index, or starts an empty one."""
+    if os.path.exists(FACT_CHECK_INDEX_PATH):
+        try:
+            return NearDuplicateIndex.load(
+                FACT_CHECK_INDEX_PATH, threshold=FACT_CHECK_SIMILARITY
+            )
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading {FACT_CHECK_INDEX_PATH}: {e}")
+    return NearDuplicateIndex(threshold=FACT_CHECK_SIMILARITY)
+
+
+async def save_fact_check_index() -> None:
+    """Writes the near-duplicate index to FACT_CHECK_INDEX_PATH."""
+    global _unsaved
+    if not _unsaved:
+        return
+    _unsaved = 0
+    try:
+        await asyncio.to_thread(fact_check_index.save, FACT_CHECK_INDEX_PATH)
+    except OSError as e:
+        logger.error(f"Error saving {FACT_CHECK_INDEX_PATH}: {e}")
+
+
+fact_check_index = load_fact_check_index()
+_unsaved = 0
+_index_stats = {"hits": 0, "misses": 0}
+register_metrics(
+    "fact_check_index", lambda: {"size": len(fact_check_index), **_index_stats}
+)
+
 
 async def fact_check(
     statement: str, request: QueryRequest
@@ -15,22 +70,41 @@ async def fact_check(
     """
     Suggest related facts or context for further exploration based on this statement.
     """
+    global _unsaved
+    if FACT_CHECK_NEAR_DUPLICATES:
+        previous = fact_check_index.lookup(statement)
+        if previous is not None:
+            _index_stats["hits"] += 1
+            yield PartialResponse(text=previous)
+            return
+        _index_stats["misses"] += 1
+
     request.query.append(
         fp.ProtocolMessage(
             content=create_prompt("fact-check", topic=statement), role="user"
         )
     )
-    async for msg in fp.stream_request(request, "GPT-3.5-Turbo", request.access_key):
+    response = ""
+    async for msg in stream_request(
+        request, "GPT-3.5-Turbo", request.access_key, handler=HANDLER
+    ):
+        response += msg.text
         yield PartialResponse(text=msg.text)
 
+    if FACT_CHECK_NEAR_DUPLICATES and response:
+        fact_check_index.add(statement, response)
+        _unsaved += 1
+        if _unsaved >= FACT_CHECK_INDEX_SAVE_EVERY:
+            await save_fact_check_index()
+
 
 async def handle_fact_check(
-    request: fp.QueryRequest, user_input: str
+    request: fp.QueryRequest, user_input: str, keyword: str = "fact-check"
 ) -> AsyncIterable[fp.PartialResponse]:
     """
     Handle the fact-checking process.
     """
-    statement = user_input.replace("fact-check", "").strip()
+    statement = strip_keyword(user_input, keyword)
     if not statement:
         raise BotError("Please provide a statement to fact-check.")
 
@@ -57,7 +131,9 @@ async def handle_fact_check(
                 content=create_prompt("fact-check", topic=statement), role="user"
             )
         )
-        async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+        async for msg in stream_request(
+            request, "GPT-4", request.access_key, handler=HANDLER
+        ):
             yield fp.PartialResponse(text=msg.text)
     elif "2" in user_choice or "fact-check" in user_choice:
         yield fp.PartialResponse(text="Okay, please provide the new statement.")
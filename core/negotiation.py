@@ -1,36 +1,71 @@
+import os
 import fastapi_poe as fp
-from typing import AsyncIterable
+from typing import AsyncIterable, List, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils.prompt_engineering import create_prompt
+from utils.intent_router import strip_keyword
 from fastapi_poe.client import BotError
 from utils.helpers import analyze_sentiment
 from utils.database import (
-    NegotiationScenario,
+    NegotiationTurn,
     get_db,
     create_negotiation_scenario,
     get_negotiation_scenario_by_id,
-    update_negotiation_scenario,
+    get_recent_negotiation_turns,
 )
+from utils.persistence import TurnRecord, persistence_worker
+from utils.upstream import stream_request
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Name under which upstream responses are cached (see utils.llm_cache)
+HANDLER = "negotiation"
+
+# Number of previous turns included in negotiation prompts
+HISTORY_TURNS = int(os.environ.get("NEGOTIATION_HISTORY_TURNS", "10"))
+
+
+def split_history(history: Sequence[NegotiationTurn]) -> Tuple[List[str], List[str]]:
+    """Splits negotiation turns into the user's offers and the bot's responses."""
+    return (
+        [turn.user_offer for turn in history],
+        [turn.bot_response for turn in history],
+    )
+
 
 async def handle_negotiation(
-    request: fp.QueryRequest, user_input: str
+    request: fp.QueryRequest, user_input: str, keyword: str = "negotiation"
 ) -> AsyncIterable[fp.PartialResponse]:
     """Handles user requests for generating negotiation scenarios."""
 
-    scenario = user_input.replace("negotiation", "").strip()
+    scenario = strip_keyword(user_input, keyword)
     if not scenario:
         raise BotError("Please provide a negotiation scenario.")
 
-    db = await get_db().__anext__()
+    async with get_db() as db:
+        async for msg in _negotiate(request, scenario, db):
+            yield msg
+
+
+async def _negotiate(
+    request: fp.QueryRequest, scenario: str, db: AsyncSession
+) -> AsyncIterable[fp.PartialResponse]:
+    """Runs one negotiation turn inside the request's database session."""
+
     scenario_id = int(scenario)
     negotiation_scenario = await get_negotiation_scenario_by_id(db, int(scenario_id))
     if not negotiation_scenario:
         negotiation_scenario = await create_negotiation_scenario(db, scenario)
+    history = await get_recent_negotiation_turns(
+        db, negotiation_scenario.id, limit=HISTORY_TURNS
+    )
+    user_offers, bot_responses = split_history(history)
+    # End the read transaction so the pooled connection is not held while the
+    # upstream bots stream.
+    await db.commit()
 
     # Generate negotiation scenario
     request.query.append(
@@ -38,10 +73,8 @@ async def handle_negotiation(
             content=create_prompt("negotiation", topic=scenario), role="user"
         )
     )
-    async for msg in fp.stream_request(
-        request,
-        "GPT-4",
-        request.access_key,
+    async for msg in stream_request(
+        request, "GPT-4", request.access_key, handler=HANDLER
     ):
         yield fp.PartialResponse(text=msg.text)
 
@@ -49,13 +82,12 @@ async def handle_negotiation(
 
     # Handle user's opening offer or position and continue the negotiation.
     user_offer = request.query[-1].content
-    db = await get_db().__anext__()
 
     # Analyze the offer and provide feedback
     analysis_prompt = (
         f"Analyze this opening offer in the context of the negotiation: {user_offer}"
-        f"\n\nPrevious offers: {negotiation_scenario.user_offers}"
-        f"\n\nPrevious bot responses: {negotiation_scenario.bot_responses}"
+        f"\n\nPrevious offers: {user_offers}"
+        f"\n\nPrevious bot responses: {bot_responses}"
     )
 
     async for msg in analyze_offer(
@@ -63,26 +95,15 @@ async def handle_negotiation(
         analysis_prompt=analysis_prompt,
         scenario=scenario,
         user_offer=user_offer,
+        history=history,
     ):
         yield msg
 
     # Generate bot response based on user offer and previous interactions
-    bot_response = await generate_bot_response(
-        request, scenario, user_offer, negotiation_scenario
+    bot_response = await generate_bot_response(request, scenario, user_offer, history)
+    persistence_worker.enqueue(
+        TurnRecord(negotiation_scenario.id, user_offer, bot_response)
     )
-    db = await get_db().__anext__()
-    negotiation_scenario = await get_negotiation_scenario_by_id(
-        db, negotiation_scenario.id.value
-    )
-    if negotiation_scenario:
-        negotiation_scenario.user_offers.append(user_offer)
-        negotiation_scenario.bot_responses.append(bot_response)
-        await update_negotiation_scenario(
-            db,
-            negotiation_scenario.id,
-            negotiation_scenario.user_offers,
-            negotiation_scenario.bot_responses,
-        )
 
     yield fp.PartialResponse(text=f"\n\n{bot_response}")
 
@@ -98,7 +119,9 @@ async def handle_negotiation(
     if "1" in user_choice or "continue" in user_choice.lower():
         yield fp.PartialResponse(text="Okay, what's your next move or counter-offer?")
         # Handle continued negotiation - manage negotiation state
-        async for msg in continue_negotiation(request, scenario, user_offer):
+        async for msg in continue_negotiation(
+            request, scenario, user_offer, history=history
+        ):
             yield msg
     elif "2" in user_choice or "advice" in user_choice.lower():
         async for msg in provide_negotiation_tactics(request, scenario):
@@ -109,38 +132,36 @@ async def handle_negotiation(
 
 
 async def analyze_offer(
-    request: fp.QueryRequest, analysis_prompt: str, scenario: str, user_offer: str
+    request: fp.QueryRequest,
+    analysis_prompt: str,
+    scenario: str,
+    user_offer: str,
+    history: Sequence[NegotiationTurn] = (),
 ) -> AsyncIterable[fp.PartialResponse]:
+    """Analyzes the user's offer against the already loaded history."""
     try:
-        db = await get_db().__anext__()
-        scenario_id = int(scenario)
-        negotiation_scenario = await get_negotiation_scenario_by_id(db, scenario_id)
-        if negotiation_scenario:
-            request.query.append(
-                fp.ProtocolMessage(
-                    content=create_prompt(
-                        "continue_negotiation",
-                        topic=scenario,
-                        user_offer=user_offer,
-                        user_offers=negotiation_scenario.user_offers,
-                        bot_responses=negotiation_scenario.bot_responses,
-                    ),
-                    role="user",
-                )
+        user_offers, bot_responses = split_history(history)
+        request.query.append(
+            fp.ProtocolMessage(
+                content=create_prompt(
+                    "continue_negotiation",
+                    topic=scenario,
+                    user_offer=user_offer,
+                    user_offers=user_offers,
+                    bot_responses=bot_responses,
+                ),
+                role="user",
             )
-            async for msg in fp.stream_request(
-                request,
-                "GPT-4",
-                request.access_key,
-            ):
-                yield fp.PartialResponse(text=msg.text)
-            request.query.append(
-                fp.ProtocolMessage(content=analysis_prompt, role="user")
-            )
-            async for msg in fp.stream_request(
-                request, "GPT-3.5-Turbo", request.access_key
-            ):
-                yield fp.PartialResponse(text=msg.text)
+        )
+        async for msg in stream_request(
+            request, "GPT-4", request.access_key, handler=HANDLER
+        ):
+            yield fp.PartialResponse(text=msg.text)
+        request.query.append(fp.ProtocolMessage(content=analysis_prompt, role="user"))
+        async for msg in stream_request(
+            request, "GPT-3.5-Turbo", request.access_key, handler=HANDLER
+        ):
+            yield fp.PartialResponse(text=msg.text)
     except Exception as e:
         logger.error(f"Error occurred: {str(e)}")
         yield fp.PartialResponse(text=f"Error analyzing offer: {str(e)}")
@@ -152,8 +173,8 @@ async def provide_negotiation_tactics(
     prompt = f"Provide advanced negotiation tactics and strategies for the following scenario: {scenario}"
     try:
         request.query.append(fp.ProtocolMessage(content=prompt, role="user"))
-        async for msg in fp.stream_request(
-            request, "Claude-instant", request.access_key
+        async for msg in stream_request(
+            request, "Claude-instant", request.access_key, handler=HANDLER
         ):
             yield fp.PartialResponse(text=msg.text)
     except Exception as e:
@@ -161,32 +182,36 @@ async def provide_negotiation_tactics(
 
 
 async def continue_negotiation(
-    request: fp.QueryRequest, scenario: str, user_offer: str
+    request: fp.QueryRequest,
+    scenario: str,
+    user_offer: str,
+    history: Sequence[NegotiationTurn] = (),
 ) -> AsyncIterable[fp.PartialResponse]:
-    """Handles continued negotiation based on user's offer and scenario."""
+    """
+    Handles continued negotiation based on user's offer and scenario.
+
+    The history is the one already loaded for the turn, so no database
+    connection is held while the upstream bot streams.
+    """
 
     try:
-        db = await get_db().__anext__()
-        negotiation_scenario = await get_negotiation_scenario_by_id(db, int(scenario))
-        if negotiation_scenario:
-            request.query.append(
-                fp.ProtocolMessage(
-                    content=create_prompt(
-                        "continue_negotiation",
-                        topic=scenario,
-                        user_offer=user_offer,
-                        user_offers=negotiation_scenario.user_offers,
-                        bot_responses=negotiation_scenario.bot_responses,
-                    ),
-                    role="user",
-                )
+        user_offers, bot_responses = split_history(history)
+        request.query.append(
+            fp.ProtocolMessage(
+                content=create_prompt(
+                    "continue_negotiation",
+                    topic=scenario,
+                    user_offer=user_offer,
+                    user_offers=user_offers,
+                    bot_responses=bot_responses,
+                ),
+                role="user",
             )
-            async for msg in fp.stream_request(
-                request,
-                "GPT-4",
-                request.access_key,
-            ):
-                yield fp.PartialResponse(text=msg.text)
+        )
+        async for msg in stream_request(
+            request, "GPT-4", request.access_key, handler=HANDLER
+        ):
+            yield fp.PartialResponse(text=msg.text)
     except Exception as e:
         yield fp.PartialResponse(text=f"Error continuing negotiation: {str(e)}")
 
@@ -195,19 +220,22 @@ async def generate_bot_response(
     request: fp.QueryRequest,
     scenario: str,
     user_offer: str,
-    negotiation_scenario: NegotiationScenario,
+    history: Sequence[NegotiationTurn],
 ) -> str:
-    """Generates a bot response based on the user's offer and negotiation state."""
+    """Generates a bot response based on the user's offer and negotiation history."""
+    user_offers, bot_responses = split_history(history)
     prompt = (
         f"You are negotiating in the following scenario: {scenario}\n\n"
         f"The user has made the following offer: {user_offer}\n\n"
-        f"Previous offers: {negotiation_scenario.user_offers}\n\n"
-        f"Previous bot responses: {negotiation_scenario.bot_responses}\n\n"
+        f"Previous offers: {user_offers}\n\n"
+        f"Previous bot responses: {bot_responses}\n\n"
         f"Generate a realistic and strategic response to the user's offer."
     )
     try:
         request.query.append(fp.ProtocolMessage(content=prompt, role="user"))
-        async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+        async for msg in stream_request(
+            request, "GPT-4", request.access_key, handler=HANDLER
+        ):
             response = msg.text
             sentiment = analyze_sentiment(response)
             return f"{response}\n\n(Sentiment: {sentiment})"
@@ -0,0 +1,159 @@
+"""Registry of feature handlers, imported on first use.
+
+Importing every handler module at startup pulls in NLTK, NumPy and the
+upstream clients before the server can answer its first request. The registry
+only records where each handler lives; a handler's module is imported the
+first time a message is routed to it, or by :meth:`HandlerRegistry.start_prewarm`
+in the background once the server is up.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import sys
+import time
+from typing import Any, AsyncIterable, Callable, Dict, NamedTuple, Optional
+
+import fastapi_poe as fp
+
+from utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+HANDLER_PREWARM = os.environ.get("HANDLER_PREWARM", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Seconds to wait after startup before prewarming, so the server is listening
+HANDLER_PREWARM_DELAY = float(os.environ.get("HANDLER_PREWARM_DELAY", "1"))
+
+# Handlers take the request, the lowercased message and the keyword it was
+# routed on (see utils.intent_router.Route)
+Handler = Callable[[fp.QueryRequest, str, str], AsyncIterable[fp.PartialResponse]]
+
+
+class HandlerSpec(NamedTuple):
+    """Where a handler lives: ``module:attribute``, plus an optional coroutine
+    function in the same module to await at shutdown if the module was loaded."""
+
+    target: str
+    shutdown: Optional[str] = None
+
+
+class HandlerRegistry:
+    """
+    Maps intents to handlers, importing each handler's module lazily.
+
+    Example:
+        registry = HandlerRegistry({"debate": HandlerSpec("core.debate:handle_debate")})
+        handler = await registry.get("debate")  # imports core.debate
+    """
+
+    def __init__(self, specs: Dict[str, HandlerSpec]):
+        self._specs = dict(specs)
+        self._handlers: Dict[str, Handler] = {}
+        self._load_times: Dict[str, float] = {}
+        self._prewarm_task: Optional[asyncio.Task] = None
+
+    def __contains__(self, intent: str) -> bool:
+        return intent in self._specs
+
+    def resolve(self, intent: str) -> Handler:
+        """
+        Returns the handler for an intent, importing its module if needed.
+
+        Parameters:
+            intent (str): The intent, e.g. "debate".
+
+        Returns:
+            Handler: The handler function.
+
+        Raises:
+            KeyError: If no handler is registered for the intent.
+        """
+        handler = self._handlers.get(intent)
+        if handler is None:
+            module_name, attribute = self._specs[intent].target.split(":")
+            start = time.perf_counter()
+            module = importlib.import_module(module_name)
+            handler = self._handlers[intent] = getattr(module, attribute)
+            self._load_times[intent] = time.perf_counter() - start
+            logger.info(
+                f"Loaded {intent} handler in {self._load_times[intent] * 1000:.0f} ms"
+            )
+        return handler
+
+    async def get(self, intent: str) -> Handler:
+        """
+        Returns the handler for an intent, importing its module in a worker
+        thread the first time so the event loop keeps serving other requests.
+        """
+        handler = self._handlers.get(intent)
+        if handler is None:
+            handler = await asyncio.to_thread(self.resolve, intent)
+        return handler
+
+    async def prewarm(self, delay: float = 0) -> None:
+        """Imports every handler module, one at a time, after ``delay`` seconds."""
+        await asyncio.sleep(delay)
+        for intent in self._specs:
+            try:
+                await self.get(intent)
+            except Exception as e:
+                logger.error(f"Error prewarming {intent} handler: {e}")
+
+    def start_prewarm(self) -> None:
+        """Starts prewarming in the background if HANDLER_PREWARM is set."""
+        if HANDLER_PREWARM and self._prewarm_task is None:
+            self._prewarm_task = asyncio.create_task(
+                self.prewarm(HANDLER_PREWARM_DELAY)
+            )
+
+    async def shutdown(self) -> None:
+        """Stops prewarming and runs the shutdown hooks of loaded handler modules."""
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+            try:
+                await self._prewarm_task
+            except asyncio.CancelledError:
+                pass
+            self._prewarm_task = None
+        for intent, spec in self._specs.items():
+            module = sys.modules.get(spec.target.split(":")[0])
+            if spec.shutdown and module is not None:
+                try:
+                    await getattr(module, spec.shutdown)()
+                except Exception as e:
+                    logger.error(f"Error shutting down {intent} handler: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Returns which handlers are loaded and how long each took to import."""
+        return {
+            intent: {
+                "loaded": intent in self._handlers,
+                "load_ms": round(self._load_times.get(intent, 0) * 1000, 1),
+            }
+            for intent in self._specs
+        }
+
+
+# Handlers for the intents of utils.intent_router
+handler_registry = HandlerRegistry(
+    {
+        "debate": HandlerSpec("core.debate:handle_debate"),
+        "negotiation": HandlerSpec("core.negotiation:handle_negotiation"),
+        "fact_check": HandlerSpec(
+            "core.fact_check:handle_fact_check", shutdown="save_fact_check_index"
+        ),
+        "bias_detection": HandlerSpec("core.bias_detection:handle_bias_detection"),
+        "contract_analysis": HandlerSpec(
+            "core.contract_analysis:handle_contract_analysis"
+        ),
+        "salary_negotiation": HandlerSpec(
+            "core.salary_negotiation:handle_salary_negotiation"
+        ),
+    }
+)
+register_metrics("handlers", handler_registry.metrics)
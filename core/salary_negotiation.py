@@ -1,94 +1,24 @@
 import logging
 from typing import AsyncIterable
 
-import os
 import fastapi_poe as fp
-import aiohttp
-from cachetools import cached, TTLCache
 from fastapi_poe import BotError
-from modal import Secret
 
+from utils.external_api import fetch_salary_data
 from utils.helpers import extract_job_details, format_salary_data
 from utils.prompt_engineering import create_prompt
+from utils.upstream import stream_request
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Adzuna API credentials from Modal secrets
-ADZUNA_API_ID = os.environ.get("ADZUNA_API_ID", Secret.from_name("ADZUNA_API_ID"))
-ADZUNA_API_KEY = os.environ.get("ADZUNA_API_KEY", Secret.from_name("ADZUNA_API_KEY"))
-
-
-# Cache for API responses
-cache = TTLCache(maxsize=100, ttl=300)
-
-
-@cached(cache)
-async def fetch_salary_data(job_title: str, location: str) -> dict:
-    """
-    Fetches salary data from the Adzuna API.
-
-    Parameters:
-        job_title (str): The job title for which to fetch salary data.
-        location (str): The location where the job is based.
-
-    Returns:
-        dict: A dictionary containing the average salary and currency, or an error message.
-
-    Raises:
-        RuntimeError: If the API request fails.
-        ValueError: If the API response is invalid or no salary data is found.
-    """
-    base_url = "https://api.adzuna.com/v1/api/jobs/us/search/1"  # US endpoint
-
-    params = {
-        "app_id": ADZUNA_API_ID,
-        "app_key": ADZUNA_API_KEY,
-        "results_per_page": 10,  # Get up to 10 results for averaging
-        "what": job_title,
-        "where": location,
-        "content-type": "application/json",
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(base_url, params=params) as response:
-            if response.status == 200:
-                data = await response.json()
-                salaries = [
-                    (result.get("salary_min", 0) + result.get("salary_max", 0)) / 2
-                    for result in data["results"]
-                    if result.get("salary_min") is not None
-                    and result.get("salary_max") is not None
-                ]
-
-                if salaries:
-                    average_salary = sum(salaries) / len(salaries)
-                    currency = (
-                        data["results"][0].get("currency")
-                        if data["results"] and "currency" in data["results"][0]
-                        else "USD"
-                    )
-                    return {
-                        "average_salary": int(average_salary),  # Return as an integer
-                        "currency": currency,  # Default to USD if currency is not present
-                    }
-                else:
-                    raise ValueError("No salary data found for this job and location.")
-            elif response.status == 400:
-                raise ValueError("Invalid request parameters.")
-            elif response.status == 401:
-                raise ValueError("Invalid API credentials.")
-            elif response.status == 429:
-                raise ValueError("Too many requests.")
-            else:
-                raise RuntimeError(
-                    f"Adzuna API request failed: {response.status}, {response.text}"
-                )
+# Name under which upstream responses are cached (see utils.llm_cache)
+HANDLER = "salary_negotiation"
 
 
 async def handle_salary_negotiation(
-    request: fp.QueryRequest, user_input: str
+    request: fp.QueryRequest, user_input: str, keyword: str = "salary"
 ) -> AsyncIterable[fp.PartialResponse]:
     """
     Handles user requests for salary negotiation advice.
@@ -96,6 +26,8 @@ async def handle_salary_negotiation(
     Parameters:
         request (fp.QueryRequest): The request object containing user input and context.
         user_input (str): The user's input describing their job details.
+        keyword (str): The keyword the message was routed on. Job details are
+            extracted from the whole message, so it is kept.
 
     Yields:
         AsyncIterable[fp.PartialResponse]: Responses to the user regarding salary negotiation.
@@ -129,7 +61,9 @@ async def handle_salary_negotiation(
                 role="user",
             )
         )
-        async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+        async for msg in stream_request(
+            request, "GPT-4", request.access_key, handler=HANDLER
+        ):
             yield fp.PartialResponse(text=msg.text)
 
         yield fp.PartialResponse(
@@ -152,7 +86,9 @@ async def handle_salary_negotiation(
                     role="user",
                 )
             )
-            async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+            async for msg in stream_request(
+                request, "GPT-4", request.access_key, handler=HANDLER
+            ):
                 yield fp.PartialResponse(text=msg.text)
         elif "2" in user_choice or "counter" in user_choice:
             yield fp.PartialResponse(
@@ -167,7 +103,9 @@ async def handle_salary_negotiation(
                     role="user",
                 )
             )
-            async for msg in fp.stream_request(request, "GPT-4", request.access_key):
+            async for msg in stream_request(
+                request, "GPT-4", request.access_key, handler=HANDLER
+            ):
                 yield fp.PartialResponse(text=msg.text)
         else:
             yield fp.PartialResponse(text="Alright, what else would you like to do?")
@@ -1,19 +1,22 @@
 import logging
+import os
 
 import fastapi_poe as fp
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
-from modal import Image, Secret, Stub, asgi_app
-
-from core import (
-    handle_bias_detection,
-    handle_contract_analysis,
-    handle_debate,
-    handle_fact_check,
-    handle_negotiation,
-    handle_salary_negotiation,
-)
+from modal import App, Image, Secret, asgi_app
+
+from core.registry import handler_registry
+from utils.database import dispose_engine, init_db
 from utils.error_handling import handle_error
+from utils.external_api import close_http_session, get_http_session
+from utils.intent_router import INTENT_MIN_CONFIDENCE, intent_router
+from utils.llm_cache import response_cache
+from utils.metrics import collect_metrics
+from utils.model_selection import SERVER_BOT_DEPENDENCIES
+from utils.persistence import persistence_worker
+from utils.salary_cache import salary_cache
+from utils.streaming import coalesce_chunks
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,20 +31,18 @@ class ArgumentNegotiationBot(fp.PoeBot):
     async def get_response(self, request: fp.QueryRequest):
         user_input = request.query[-1].content.lower()
 
-        functionality_map = {
-            "debate": handle_debate,
-            "negotiation": handle_negotiation,
-            "fact-check": handle_fact_check,
-            "cognitive bias": handle_bias_detection,
-            "contract": handle_contract_analysis,
-            "salary": handle_salary_negotiation,
-        }
-
-        for key, handler in functionality_map.items():
-            if key in user_input:
-                async for msg in handler(request, user_input):
-                    yield msg
-                return
+        route = intent_router.route(user_input)
+        if route is not None and route.confidence >= INTENT_MIN_CONFIDENCE:
+            logger.debug(
+                f"Routing to {route.intent} on '{route.keyword}' "
+                f"(confidence {route.confidence})"
+            )
+            handler = await handler_registry.get(route.intent)
+            async for msg in coalesce_chunks(
+                handler(request, user_input, route.keyword)
+            ):
+                yield msg
+            return
 
         yield fp.PartialResponse(
             text="I'm sorry, I didn't understand your request. Can you specify which feature you'd like to use?"
@@ -49,11 +50,7 @@ class ArgumentNegotiationBot(fp.PoeBot):
 
     async def get_settings(self, setting: fp.SettingsRequest):
         return fp.SettingsResponse(
-            server_bot_dependencies={
-                "GPT-3.5-Turbo": 5,
-                "Claude-instant": 3,
-                "GPT-4": 2,
-            },
+            server_bot_dependencies=SERVER_BOT_DEPENDENCIES,
             allow_attachments=True,
             expand_text_attachments=True,
             enable_image_comprehension=False,
@@ -62,21 +59,73 @@ class ArgumentNegotiationBot(fp.PoeBot):
         )
 
 
+async def metrics_endpoint():
+    """Reports the in-process metrics of every registered component."""
+    return collect_metrics()
+
+
+def configure_app(app: FastAPI) -> None:
+    """Registers the startup/shutdown hooks and the metrics route."""
+    app.router.on_startup.append(init_db)
+    app.router.on_startup.append(get_http_session)
+    app.router.on_startup.append(persistence_worker.start)
+    app.router.on_startup.append(handler_registry.start_prewarm)
+    app.router.on_shutdown.append(persistence_worker.stop)
+    app.router.on_shutdown.append(salary_cache.stop)
+    app.router.on_shutdown.append(handler_registry.shutdown)
+    app.router.on_shutdown.append(close_http_session)
+    app.router.on_shutdown.append(dispose_engine)
+    app.router.on_shutdown.append(response_cache.close)
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"])
+
+
 # Define a deployment-ready function
 REQUIREMENTS = [
     "fastapi-poe==0.0.47",
-    "sqlalchemy",
+    "sqlalchemy[asyncio]",
+    "asyncpg",
+    "aiosqlite",
     "pydantic",
     "requests",
     "cachetools",
     "aiohttp",
     "nltk",
+    "numpy",
+]
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Modal runs the app from /root
+REMOTE_DIR = "/root"
+NLTK_BUILD_FILES = [
+    "utils/__init__.py",
+    "utils/nltk_data.py",
+    "scripts/build_nltk_data.py",
 ]
 image = Image.debian_slim().pip_install(*REQUIREMENTS)
-stub = Stub("argument-negotiation-bot")
+# Packages the NLTK models into data/nltk_data.pickle while the image is built
+for path in NLTK_BUILD_FILES:
+    image = image.add_local_file(
+        os.path.join(PROJECT_DIR, path), f"{REMOTE_DIR}/{path}", copy=True
+    )
+image = image.run_commands(
+    f"cd {REMOTE_DIR} && python scripts/build_nltk_data.py --download"
+)
+image = image.add_local_file(
+    os.path.join(PROJECT_DIR, "data", "job_gazetteer.json"),
+    f"{REMOTE_DIR}/data/job_gazetteer.json",
+)
+# The salary index is built locally (see scripts/build_salary_index.py); without
+# it salary lookups go to the Adzuna API
+SALARY_INDEX_FILE = os.path.join(PROJECT_DIR, "data", "salary_index.bin")
+if os.path.exists(SALARY_INDEX_FILE):
+    image = image.add_local_file(
+        SALARY_INDEX_FILE, f"{REMOTE_DIR}/data/salary_index.bin"
+    )
+# Modal 1.x no longer mounts local packages automatically
+image = image.add_local_python_source("core", "utils")
+modal_app = App("argument-negotiation-bot")
 
 
-@stub.function(
+@modal_app.function(
     image=image,
     secrets=[
         Secret.from_name("ADZUNA_API_ID"),
@@ -88,6 +137,7 @@ stub = Stub("argument-negotiation-bot")
 def fastapi_app():
     bot = ArgumentNegotiationBot()
     app = fp.make_app(bot, allow_without_key=True)
+    configure_app(app)
     return app
 
 
@@ -105,4 +155,5 @@ async def exception_handler(request: Request, exc: Exception):
 if __name__ == "__main__":
     import uvicorn
 
+    configure_app(app)
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,71 @@
+"""Compares the compiled bias matcher with the per-chunk substring loop it
+replaced, over a synthetic streamed response.
+
+Usage:
+    python scripts/bench_bias_matcher.py [--chunks 2000] [--chunk-size 24]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bias_detection import BIAS_MATCHER, COMMON_BIASES  # noqa: E402
+
+
+def legacy_scan(chunks):
+    """The previous implementation: every bias name against every chunk."""
+    detected_biases = []
+    for chunk in chunks:
+        for bias in COMMON_BIASES:
+            if bias.lower() in chunk.lower():
+                detected_biases.append(bias)
+    return detected_biases
+
+
+def automaton_scan(chunks):
+    scanner = BIAS_MATCHER.scanner()
+    for chunk in chunks:
+        scanner.feed(chunk)
+    return scanner.patterns
+
+
+def make_chunks(count: int, size: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = "the argument assumes that past results guarantee future outcomes".split()
+    parts = []
+    while sum(map(len, parts)) < count * size:
+        parts.append(" ".join(rng.choices(words, k=12)))
+        if rng.random() < 0.2:
+            parts.append(rng.choice(COMMON_BIASES))
+    text = " ".join(parts)
+    return [text[i : i + size] for i in range(0, count * size, size)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.chunk_size)
+    legacy = legacy_scan(chunks)
+    automaton = automaton_scan(chunks)
+    print(
+        f"{len(chunks)} chunks of {args.chunk_size} chars: legacy loop found "
+        f"{len(legacy)} matches ({len(set(legacy))} distinct), automaton found "
+        f"{len(automaton)} distinct"
+    )
+    for name, func in (("legacy loop", legacy_scan), ("automaton", automaton_scan)):
+        best = min(timeit.repeat(lambda: func(chunks), number=1, repeat=args.repeat))
+        print(
+            f"{name:>12}: {best * 1000:8.2f} ms ({best / len(chunks) * 1e6:.2f} us/chunk)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Simulates upstream calls with occasional slow starts and reports time to
+first token with and without hedging.
+
+Usage:
+    python scripts/bench_hedging.py [--calls 2000] [--slow-share 0.02]
+
+Most calls start after 50-200 ms; a share of them takes ``--slow-seconds``.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from unittest.mock import patch
+
+import fastapi_poe as fp
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import hedging, upstream  # noqa: E402
+from utils.hedging import HedgePolicy  # noqa: E402
+from utils.upstream import stream_request  # noqa: E402
+
+
+def fake_upstream(rng: random.Random, slow_share: float, slow_seconds: float):
+    async def stream(request, bot_name, *args, **kwargs):
+        slow = rng.random() < slow_share
+        await asyncio.sleep(slow_seconds if slow else rng.uniform(0.05, 0.2))
+        yield fp.PartialResponse(text="ok")
+
+    return stream
+
+
+async def run(policy: HedgePolicy, args) -> np.ndarray:
+    rng = random.Random(0)
+    stream = fake_upstream(rng, args.slow_share, args.slow_seconds)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        request = fp.QueryRequest(
+            version="1.0",
+            type="query",
+            query=[fp.ProtocolMessage(role="user", content="Debate: remote work")],
+            user_id="u",
+            conversation_id="c",
+            message_id=f"m{i}",
+            access_key="k",
+        )
+        async with semaphore:
+            start = time.perf_counter()
+            async for _ in stream_request(request, "GPT-3.5-Turbo", "k"):
+                return time.perf_counter() - start
+
+    with patch("utils.upstream.fp.stream_request", stream), patch.object(
+        hedging, "hedge_policy", policy
+    ), patch.object(upstream, "hedge_policy", policy):
+        return np.array(await asyncio.gather(*(one(i) for i in range(args.calls))))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--slow-share", type=float, default=0.02)
+    parser.add_argument("--slow-seconds", type=float, default=2.0)
+    parser.add_argument("--max-rate", type=float, default=hedging.HEDGE_MAX_RATE)
+    args = parser.parse_args()
+
+    for name, policy in (
+        ("no hedging", HedgePolicy(enabled=False)),
+        ("hedged", HedgePolicy(enabled=True, max_rate=args.max_rate)),
+    ):
+        seconds = asyncio.run(run(policy, args)) * 1000
+        stats = policy.metrics()
+        print(
+            f"{name:>10}: p50 {np.percentile(seconds, 50):.0f} ms, "
+            f"p99 {np.percentile(seconds, 99):.0f} ms, "
+            f"max {seconds.max():.0f} ms; {stats['hedges']} hedges "
+            f"({stats['hedges_won']} won) for {args.calls} calls"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Reports the import cost of the bot's modules, using ``python -X importtime``.
+
+Each module is imported in a fresh interpreter, so the numbers are what a cold
+start pays. For each module the total import time is printed, followed by the
+top-level packages (``nltk``, ``numpy``, ``sqlalchemy``...) that cost the most.
+
+Usage:
+    python scripts/bench_imports.py [--top 8] [module ...]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a cold start imports (main.py itself also needs Modal), then each
+# handler module as the registry loads it on first use.
+DEFAULT_MODULES = [
+    "core.registry",
+    "utils.intent_router",
+    "utils.database",
+    "utils.external_api",
+    "utils.llm_cache",
+    "utils.persistence",
+    "core.debate",
+    "core.negotiation",
+    "core.fact_check",
+    "core.bias_detection",
+    "core.contract_analysis",
+    "core.salary_negotiation",
+]
+
+
+def import_times(module: str) -> Tuple[int, Dict[str, int]]:
+    """
+    Imports a module in a fresh interpreter.
+
+    Parameters:
+        module (str): The module to import.
+
+    Returns:
+        Tuple[int, Dict[str, int]]: The module's cumulative import time, and the
+        time spent importing each top-level package it pulled in (summed self
+        times), both in microseconds.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    # Nested imports are listed (indented) before the module that triggered
+    # them, so the rows since the previous top-level import are the module's.
+    subtree: List[Tuple[int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if name.startswith("  "):
+            subtree.append((int(self_us), name.strip()))
+        elif name.strip() == module:
+            packages: Dict[str, int] = defaultdict(int)
+            for row_self_us, row_name in subtree + [(int(self_us), module)]:
+                packages[row_name.split(".")[0]] += row_self_us
+            return int(cumulative_us), packages
+        else:
+            subtree = []
+    raise RuntimeError(f"{module} not found in the import times")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            total, packages = import_times(module)
+        except RuntimeError as e:
+            print(f"{module}: import failed ({e})")
+            continue
+        print(f"{module}: {total / 1000:.1f} ms")
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        for package, self_us in heaviest[: args.top]:
+            print(f"    {self_us / 1000:8.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    main()
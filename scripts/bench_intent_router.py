@@ -0,0 +1,90 @@
+"""Compares the compiled intent router with the substring scan it replaced,
+for routing accuracy and per-message cost over a labelled corpus.
+
+Usage:
+    python scripts/bench_intent_router.py [--corpus scripts/intent_corpus.jsonl]
+
+Each corpus line is a JSON object with ``text`` and ``intent`` (null for
+messages no feature should handle).
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.intent_router import INTENT_MIN_CONFIDENCE, IntentRouter  # noqa: E402
+
+# The keyword map main.get_response used to scan in order
+LEGACY_MAP = {
+    "debate": "debate",
+    "negotiation": "negotiation",
+    "fact-check": "fact_check",
+    "cognitive bias": "bias_detection",
+    "contract": "contract_analysis",
+    "salary": "salary_negotiation",
+}
+
+
+def legacy_route(text):
+    user_input = text.lower()
+    for key, intent in LEGACY_MAP.items():
+        if key in user_input:
+            return intent
+    return None
+
+
+def router_route(router):
+    def route(text):
+        result = router.route(text)
+        if result is None or result.confidence < INTENT_MIN_CONFIDENCE:
+            return None
+        return result.intent
+
+    return route
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--corpus",
+        default=os.path.join(os.path.dirname(__file__), "intent_corpus.jsonl"),
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    texts = [row["text"] for row in corpus]
+
+    routers = (
+        ("legacy scan", legacy_route),
+        ("router", router_route(IntentRouter())),
+        ("router, exact", router_route(IntentRouter(fuzzy=False))),
+    )
+    for name, route in routers:
+        errors = [
+            (row["text"], row["intent"], route(row["text"]))
+            for row in corpus
+            if route(row["text"]) != row["intent"]
+        ]
+        best = min(
+            timeit.repeat(
+                lambda: [route(text) for text in texts], number=1, repeat=args.repeat
+            )
+        )
+        print(
+            f"{name:>14}: {len(corpus) - len(errors)}/{len(corpus)} correct, "
+            f"{best / len(texts) * 1e6:.2f} us/message"
+        )
+        if args.show_errors:
+            for text, expected, got in errors:
+                print(f"{'':>16}{text!r}: expected {expected}, got {got}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Compares the gazetteer job details extractor with the regular expressions it
+replaced, for per-message cost and the keys each gives.
+
+Usage:
+    python scripts/bench_job_details.py [--repeat 5]
+
+Salary data is cached per (job title, location), so the fewer distinct keys the
+same jobs produce, the more often the caches hit.
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.job_details import JobDetailsExtractor, JOB_GAZETTEER_PATH  # noqa: E402
+
+MESSAGES = [
+    "Software Engineer in San Francisco",
+    "I'm a software developer in SF, how much should I ask for?",
+    "I'm a swe in the bay area and got an offer",
+    "I'm looking for a data scientist job in New York City",
+    "I'm looking for a data science job in NYC",
+    "salary for a registered nurse in Chicago, IL",
+    "I'm a nurse in chicago. Is 80k fair?",
+    "I'm a product manager based in Seattle, WA",
+    "I'm a pm in seattle and want a raise",
+    "I'm a beekeeper in Boise",
+    "What should a web developer in Austin, Texas make?",
+    "I'm a marine biologist working remotely",
+]
+
+
+def legacy_extract(text):
+    """The four searches extract_job_details used to run."""
+    job_title = None
+    location = None
+    job_title_match = re.search(r"I'm looking for a (.*) job", text, re.IGNORECASE)
+    if job_title_match:
+        job_title = job_title_match.group(1).strip()
+    else:
+        job_title_match = re.search(r"I'm a (.*)", text, re.IGNORECASE)
+        if job_title_match:
+            job_title = job_title_match.group(1).strip()
+    location_match = re.search(r"in (.*)", text, re.IGNORECASE)
+    if location_match:
+        location = location_match.group(1).strip()
+    else:
+        location_match = re.search(r"in the (.*)", text, re.IGNORECASE)
+        if location_match:
+            location = location_match.group(1).strip()
+    return {"job_title": job_title, "location": location}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--gazetteer", default=JOB_GAZETTEER_PATH)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--show-keys", action="store_true")
+    args = parser.parse_args()
+
+    extractor = JobDetailsExtractor.from_file(args.gazetteer)
+    extractors = (("legacy regex", legacy_extract), ("gazetteer", extractor.extract))
+    for name, extract in extractors:
+        best = min(
+            timeit.repeat(
+                lambda: [extract(text) for text in MESSAGES],
+                number=args.number,
+                repeat=args.repeat,
+            )
+        )
+        keys = [extract(text) for text in MESSAGES]
+        distinct = {(key["job_title"], key["location"]) for key in keys}
+        print(
+            f"{name:>13}: {best / args.number / len(MESSAGES) * 1e6:.2f} us/message, "
+            f"{len(distinct)} distinct keys for {len(MESSAGES)} messages"
+        )
+        if args.show_keys:
+            for text, key in zip(MESSAGES, keys):
+                print(f"{'':>15}{text!r}: {key['job_title']!r}, {key['location']!r}")
+
+
+if __name__ == "__main__":
+    main()
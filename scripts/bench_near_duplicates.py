@@ -0,0 +1,94 @@
+"""Measures near-duplicate index lookup latency with many cached statements.
+
+Usage:
+    python scripts/bench_near_duplicates.py [--entries 100000] [--lookups 1000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.near_duplicates import NearDuplicateIndex  # noqa: E402
+
+WORDS = (
+    "the government economy climate vaccine study percent city population "
+    "record highest lowest country world average annual report claims "
+    "scientists found increase decrease since million billion water energy"
+).split()
+
+
+def make_statements(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        f"{' '.join(rng.choices(WORDS, k=10))} {rng.randint(1900, 2024)} {i}"
+        for i in range(count)
+    ]
+
+
+def reword(statement: str) -> str:
+    return statement.upper().replace(" ", "  ") + "!"
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (
+        statistics.median(samples) * 1000,
+        samples[int(len(samples) * 0.99) - 1] * 1000,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    statements = make_statements(args.entries)
+    index = NearDuplicateIndex(threshold=0.8)
+    start = time.perf_counter()
+    for i, statement in enumerate(statements):
+        index.add(statement, f"result {i}")
+    print(f"added {args.entries} statements in {time.perf_counter() - start:.1f} s")
+
+    rng = random.Random(1)
+    queries = {
+        "near-duplicate": [reword(s) for s in rng.sample(statements, args.lookups)],
+        "unseen": make_statements(args.lookups, seed=99),
+    }
+    bench_lookups("in memory", index, queries)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.npz")
+        start = time.perf_counter()
+        index.save(path)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = NearDuplicateIndex.load(path)
+        load_time = time.perf_counter() - start
+        size = os.path.getsize(path) / 1e6
+    print(f"save {saved:.2f} s, load {load_time:.2f} s, {size:.1f} MB on disk")
+    bench_lookups("after load", loaded, queries)
+
+
+def bench_lookups(label, index, queries) -> None:
+    for name, texts in queries.items():
+        timings, hits = [], 0
+        for text in texts:
+            start = time.perf_counter()
+            hits += index.lookup(text) is not None
+            timings.append(time.perf_counter() - start)
+        p50, p99 = percentiles(timings)
+        print(
+            f"{label:>10}, {name:>14} lookups: p50 {p50:.3f} ms, "
+            f"p99 {p99:.3f} ms, {hits}/{len(texts)} hits"
+        )
+
+
+if __name__ == "__main__":
+    main()
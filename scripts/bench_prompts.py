@@ -0,0 +1,106 @@
+"""Compares create_prompt with the version it replaced, for render cost and
+log volume, with logging configured as the bot configures it (INFO).
+
+Usage:
+    python scripts/bench_prompts.py [--number 2000] [--level INFO]
+
+The old version logged every call's arguments and rendered prompt at INFO; a
+contract clause or negotiation history was written out twice per prompt.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.prompt_engineering import PROMPT_TEMPLATES, create_prompt  # noqa: E402
+
+CLAUSE = (
+    "The Employee shall not, during employment and for a period of twenty-four "
+    "months thereafter, directly or indirectly engage in any business that "
+    "competes with the Company within the United States. "
+) * 10
+CALLS = [
+    ("debate", {"topic": "Should salaries be public?"}),
+    ("contract_analysis", {"topic": CLAUSE}),
+    (
+        "continue_negotiation",
+        {
+            "topic": "Salary increase for a senior engineer",
+            "user_offer": "150,000 USD",
+            "user_offers": [f"{120 + i},000 USD" for i in range(20)],
+            "bot_responses": [f"We can offer {110 + i},000 USD" for i in range(20)],
+        },
+    ),
+]
+
+
+def legacy_create_prompt(functionality, **kwargs):
+    """The create_prompt this module used to have."""
+    logging.info(
+        f"Creating prompt for functionality: {functionality} with arguments: {kwargs}"
+    )
+    if not isinstance(functionality, str):
+        raise TypeError("Functionality must be a string.")
+    if functionality not in PROMPT_TEMPLATES:
+        raise ValueError(f"No prompt template found for: {functionality}.")
+    try:
+        prompt = PROMPT_TEMPLATES[functionality].format(**kwargs)
+        logging.info(f"Prompt created successfully: {prompt}")
+        return prompt
+    except KeyError as e:
+        raise KeyError(f"Missing required argument: {e.args[0]}")
+
+
+class CountingHandler(logging.Handler):
+    """Formats records as a stream handler would and counts the bytes."""
+
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        self.records = 0
+        self.bytes = 0
+
+    def emit(self, record):
+        self.records += 1
+        self.bytes += len(self.format(record).encode()) + 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--level", default="INFO")
+    args = parser.parse_args()
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    handler = CountingHandler()
+    root.addHandler(handler)
+    root.setLevel(args.level)
+
+    for name, create in (
+        ("legacy", legacy_create_prompt),
+        ("templates", create_prompt),
+    ):
+
+        def render():
+            for functionality, kwargs in CALLS:
+                create(functionality, **kwargs)
+
+        handler.records = handler.bytes = 0
+        best = min(timeit.repeat(render, number=args.number, repeat=args.repeat))
+        prompts = args.number * args.repeat * len(CALLS)
+        print(
+            f"{name:>10}: {best / args.number / len(CALLS) * 1e6:.2f} us/prompt, "
+            f"{handler.records / prompts:.3f} log records and "
+            f"{handler.bytes / prompts:.0f} bytes logged/prompt"
+        )
+
+
+if __name__ == "__main__":
+    main()
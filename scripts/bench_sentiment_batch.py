@@ -0,0 +1,68 @@
+"""Compares batched sentiment labelling with one analyze_sentiment call per
+text, over synthetic bot responses.
+
+Usage:
+    python scripts/bench_sentiment_batch.py [--counts 1000 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.helpers import analyze_sentiment, analyze_sentiment_batch  # noqa: E402
+from utils.nltk_data import get_sentiment_analyzer  # noqa: E402
+
+FILLER = (
+    "the offer contract salary terms we they you our their counterpart clause "
+    "agreement proposal market rate employer candidate role team a an to of "
+    "and in for on with about that is are was will should could"
+).split()
+MODIFIERS = ["not", "very", "but", "really", "never", "NOT", "kind of"]
+
+
+def make_texts(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    lexicon = list(get_sentiment_analyzer().lexicon)
+    texts = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(8, 40)):
+            roll = rng.random()
+            if roll < 0.12:
+                words.append(rng.choice(lexicon))
+            elif roll < 0.13:
+                words.append(rng.choice(MODIFIERS))
+            else:
+                words.append(rng.choice(FILLER))
+        texts.append(" ".join(words) + rng.choice([".", ".", "!", "?"]))
+    return texts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 100000])
+    args = parser.parse_args()
+
+    analyze_sentiment_batch(["warm up"])
+    for count in args.counts:
+        texts = make_texts(count)
+        start = time.perf_counter()
+        expected = [analyze_sentiment(text) for text in texts]
+        scalar_time = time.perf_counter() - start
+        start = time.perf_counter()
+        labels = analyze_sentiment_batch(texts)
+        batch_time = time.perf_counter() - start
+        mismatches = sum(a != b for a, b in zip(expected, labels))
+        print(
+            f"{count:>7} texts: one by one {scalar_time * 1000:9.1f} ms, "
+            f"batch {batch_time * 1000:9.1f} ms "
+            f"({scalar_time / batch_time:.1f}x), {mismatches} label mismatches"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Measures what coalescing streamed chunks saves: server-sent events written
+and CPU time per response, with many responses streaming at once.
+
+Usage:
+    python scripts/bench_streaming.py [--streams 200] [--chunks 500]
+
+Each simulated response streams ``--chunks`` small text chunks, as upstream
+bots do, through the same event encoding as fastapi_poe (JSON in an SSE frame), written
+to a local socket.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+
+import fastapi_poe as fp
+from sse_starlette.sse import ServerSentEvent
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.streaming import (  # noqa: E402
+    STREAM_COALESCE_BYTES,
+    STREAM_COALESCE_INTERVAL,
+    coalesce_chunks,
+)
+
+TOKENS = ["The", " other", " party", "'s", " offer", " is", " fair", ",", " but"]
+
+
+async def upstream(chunks: int, delay: float):
+    for i in range(chunks):
+        yield fp.PartialResponse(text=TOKENS[i % len(TOKENS)])
+        await asyncio.sleep(delay)
+
+
+async def serve(messages) -> int:
+    """
+    Writes each message to a socket as fastapi_poe's text event, draining after
+    each as the server does; returns the bytes written.
+    """
+    server, client = socket.socketpair()
+    reader, client_writer = await asyncio.open_connection(sock=client)
+    _, writer = await asyncio.open_connection(sock=server)
+
+    async def drain_client():
+        while await reader.read(65536):
+            pass
+
+    draining = asyncio.create_task(drain_client())
+    written = 0
+    async for msg in messages:
+        event = ServerSentEvent(data=json.dumps({"text": msg.text}), event="text")
+        data = event.encode()
+        writer.write(data)
+        await writer.drain()
+        written += len(data)
+    writer.close()
+    await draining
+    client_writer.close()
+    return written
+
+
+async def run(streams: int, chunks: int, delay: float, coalesce: bool):
+    counted = []
+
+    async def counting(messages):
+        async for msg in messages:
+            counted.append(msg)
+            yield msg
+
+    async def one():
+        messages = upstream(chunks, delay)
+        if coalesce:
+            messages = coalesce_chunks(messages)
+        return await serve(counting(messages))
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    written = sum(await asyncio.gather(*(one() for _ in range(streams))))
+    return (
+        len(counted),
+        written,
+        time.process_time() - cpu,
+        time.perf_counter() - wall,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument(
+        "--delay", type=float, default=0.001, help="Seconds between chunks"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{args.streams} streams x {args.chunks} chunks, "
+        f"coalescing at {STREAM_COALESCE_BYTES} bytes / "
+        f"{STREAM_COALESCE_INTERVAL * 1000:.0f} ms"
+    )
+    for name, coalesce in (("per chunk", False), ("coalesced", True)):
+        events, written, cpu, wall = asyncio.run(
+            run(args.streams, args.chunks, args.delay, coalesce)
+        )
+        print(
+            f"{name:>10}: {events / args.streams:.0f} events/response, "
+            f"{written / args.streams / 1024:.1f} KiB/response, "
+            f"{cpu:.2f} s CPU, {wall:.2f} s wall"
+        )
+
+
+if __name__ == "__main__":
+    main()
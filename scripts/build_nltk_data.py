@@ -0,0 +1,57 @@
+"""Packages the NLTK models the bot uses into one file loaded at run time.
+
+Usage:
+    python scripts/build_nltk_data.py [--download] [-o data/nltk_data.pickle]
+
+The VADER lexicon and the perceptron part-of-speech tagger are read from
+NLTK's data directories; with ``--download`` any that are missing are
+downloaded first. Run this when building the image, not at startup.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.nltk_data import (  # noqa: E402
+    NLTK_DATA_PATH,
+    TAGGER_RESOURCE,
+    build_nltk_data,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=NLTK_DATA_PATH,
+        help="File to write (default: NLTK_DATA_PATH or %(default)s)",
+    )
+    parser.add_argument(
+        "--download",
+        action="store_true",
+        help="Download missing NLTK resources first",
+    )
+    args = parser.parse_args()
+
+    if args.download:
+        import nltk
+
+        for resource in ("vader_lexicon", TAGGER_RESOURCE):
+            if not nltk.download(resource, quiet=True):
+                sys.exit(f"Could not download the NLTK resource {resource}")
+
+    start = time.perf_counter()
+    data = build_nltk_data(args.output)
+    print(
+        f"Wrote {len(data['vader_lexicon'])} lexicon entries and "
+        f"{len(data['tagger']['weights'])} tagger features to {args.output} "
+        f"in {time.perf_counter() - start:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
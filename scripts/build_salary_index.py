@@ -0,0 +1,45 @@
+"""Compiles a salary dataset into the offline salary index.
+
+Usage:
+    python scripts/build_salary_index.py salaries.csv [more.jsonl ...] \
+        -o data/salary_index.bin
+
+Input rows need ``job_title`` and ``location``, an optional ``currency`` and
+either ``salary`` (one observation per row) or ``salary_min``,
+``salary_median`` and ``salary_max``. See utils/salary_index.py for the format.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from utils.salary_index import build_salary_index, read_salary_rows  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("datasets", nargs="+", help="CSV or JSON Lines files")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=os.environ.get(
+            "SALARY_INDEX_PATH", os.path.join(PROJECT_DIR, "data", "salary_index.bin")
+        ),
+        help="Index file to write (default: SALARY_INDEX_PATH or data/salary_index.bin)",
+    )
+    args = parser.parse_args()
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    rows = itertools.chain.from_iterable(read_salary_rows(p) for p in args.datasets)
+    count = build_salary_index(rows, args.output)
+    print(f"Wrote {count} salary entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
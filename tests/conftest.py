@@ -0,0 +1,56 @@
+# File: tests/conftest.py
+
+from collections import OrderedDict
+from unittest.mock import patch
+
+import pytest
+from core import fact_check
+from utils import upstream
+from utils.hedging import hedge_policy
+from utils.llm_cache import response_cache
+from utils.model_selection import model_selector, request_calls
+from utils.resilience import UpstreamGuards
+
+
+@pytest.fixture(autouse=True)
+def no_llm_cache():
+    """Tests stub the upstream bots; replaying responses cached on disk by an
+    earlier run would bypass the stubs."""
+    with patch.object(response_cache, "enabled", False):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def no_fact_check_reuse():
+    """Keeps fact-check results from one test being reused by another."""
+    with patch.object(fact_check, "FACT_CHECK_NEAR_DUPLICATES", False):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def no_model_selection():
+    """Keeps upstream calls on the bot each call site names."""
+    with patch.object(model_selector, "enabled", False):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def no_hedging():
+    """Keeps stubbed upstream calls from being duplicated."""
+    with patch.object(hedge_policy, "enabled", False):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def fresh_upstream_guards():
+    """Keeps stubbed upstream failures in one test from opening a breaker in
+    another."""
+    with patch.object(upstream, "upstream_guards", UpstreamGuards()):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def fresh_request_calls():
+    """Keeps one test's upstream calls from using up another's call budgets."""
+    with patch.object(request_calls, "_calls", OrderedDict()):
+        yield
@@ -1,8 +1,15 @@
 # File: tests/test_bias_detection.py
 
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from core.bias_detection import handle_bias_detection, bias_cache
+from core.bias_detection import (
+    detect_specific_biases,
+    explain_bias,
+    handle_bias_detection,
+    bias_cache,
+)
 import fastapi_poe as fp
 
 
@@ -251,6 +258,85 @@ class TestHandleBiasDetection:
         assert "An error occurred while processing your request" in responses[-1].text
 
 
+@pytest.mark.asyncio
+class TestDetectSpecificBiases:
+    async def test_detects_biases_split_across_chunks(self):
+        chunks = [
+            "This shows confirmation bi",
+            "as and the Halo ",
+            "Effect. Again, confirmation bias.",
+        ]
+
+        async def stream(*args, **kwargs):
+            for chunk in chunks:
+                yield fp.PartialResponse(text=chunk)
+
+        with patch('core.bias_detection.fp.stream_request', stream), patch(
+            'core.bias_detection.create_prompt', return_value="prompt"
+        ):
+            biases = await detect_specific_biases(MagicMock(), "An argument")
+
+        assert biases == ["Confirmation Bias", "Halo Effect"]
+
+
+@pytest.mark.asyncio
+class TestExplainBias:
+    async def test_does_not_modify_shared_request(self):
+        request = fp.QueryRequest(
+            version="1.0",
+            type="query",
+            query=[fp.ProtocolMessage(role="user", content="Argument")],
+            user_id="u",
+            conversation_id="c",
+            message_id="m",
+            access_key="k",
+        )
+        seen_queries = []
+
+        async def stream(req, *args, **kwargs):
+            seen_queries.append([m.content for m in req.query])
+            yield fp.PartialResponse(text="Explanation")
+
+        with patch('core.bias_detection.fp.stream_request', stream):
+            explanation = await explain_bias(request, "Halo Effect", "Argument")
+
+        assert explanation == "Explanation"
+        assert len(request.query) == 1
+        assert seen_queries[0][0] == "Argument"
+        assert "Halo Effect" in seen_queries[0][1]
+
+    async def test_explanations_stream_in_detection_order(self):
+        delays = {"Anchoring Bias": 0.03, "Halo Effect": 0.0, "Recency Bias": 0.01}
+
+        async def explain(request, bias, argument):
+            await asyncio.sleep(delays[bias])
+            return f"Why {bias}"
+
+        async def stream(*args, **kwargs):
+            yield fp.PartialResponse(text="Initial analysis")
+
+        with patch('core.bias_detection.fp.stream_request', stream), patch(
+            'core.bias_detection.create_prompt', return_value="prompt"
+        ), patch(
+            'core.bias_detection.detect_specific_biases',
+            AsyncMock(return_value=list(delays)),
+        ), patch(
+            'core.bias_detection.explain_bias', explain
+        ):
+            request = MagicMock()
+            request.query = [fp.ProtocolMessage(role="user", content="3")]
+            responses = [
+                r.text
+                async for r in handle_bias_detection(request, "A streamed argument")
+            ]
+
+        assert responses[3:6] == [
+            "Anchoring Bias: \nWhy Anchoring Bias\n\n",
+            "Halo Effect: \nWhy Halo Effect\n\n",
+            "Recency Bias: \nWhy Recency Bias\n\n",
+        ]
+
+
 async def test_bias_cache(
     self,
     mock_request: AsyncMock,
@@ -0,0 +1,166 @@
+# File: tests/test_caching.py
+
+import asyncio
+
+import pytest
+from utils.caching import BoundedCache, async_cached, normalize_text_key
+
+
+@pytest.mark.asyncio
+class TestAsyncCached:
+    async def test_caches_results(self):
+        calls = []
+
+        @async_cached(ttl=60)
+        async def lookup(job_title, location):
+            calls.append((job_title, location))
+            return {"average_salary": 100000, "currency": "USD"}
+
+        first = await lookup("Nurse", "Denver")
+        second = await lookup("Nurse", "Denver")
+
+        assert first == second == {"average_salary": 100000, "currency": "USD"}
+        assert calls == [("Nurse", "Denver")]
+        info = lookup.cache_info()
+        assert info["hits"] == 1
+        assert info["misses"] == 1
+
+    async def test_coalesces_concurrent_misses(self):
+        calls = 0
+
+        @async_cached(ttl=60)
+        async def lookup(job_title, location):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(lookup("Nurse", "Denver") for _ in range(5)))
+
+        assert results == [1, 1, 1, 1, 1]
+        assert calls == 1
+        info = lookup.cache_info()
+        assert info["misses"] == 1
+        assert info["coalesced"] == 4
+        assert info["in_flight"] == 0
+
+    async def test_caches_negative_results(self):
+        calls = 0
+
+        @async_cached(ttl=60, negative_ttl=60)
+        async def lookup(job_title, location):
+            nonlocal calls
+            calls += 1
+            raise ValueError("No salary data found for this job and location.")
+
+        for _ in range(3):
+            with pytest.raises(ValueError, match="No salary data found"):
+                await lookup("Astronaut", "Nowhere")
+
+        assert calls == 1
+        assert lookup.cache_info()["negative_hits"] == 2
+
+    async def test_negative_results_expire(self):
+        calls = 0
+
+        @async_cached(ttl=60, negative_ttl=0.01)
+        async def lookup(job_title, location):
+            nonlocal calls
+            calls += 1
+            raise ValueError("Too many requests.")
+
+        with pytest.raises(ValueError):
+            await lookup("Nurse", "Denver")
+        await asyncio.sleep(0.02)
+        with pytest.raises(ValueError):
+            await lookup("Nurse", "Denver")
+
+        assert calls == 2
+
+    async def test_does_not_cache_other_errors(self):
+        calls = 0
+
+        @async_cached(ttl=60)
+        async def lookup(job_title, location):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("Adzuna API request failed: 503")
+            return "ok"
+
+        with pytest.raises(RuntimeError):
+            await lookup("Nurse", "Denver")
+        assert await lookup("Nurse", "Denver") == "ok"
+        assert calls == 2
+
+    async def test_cancelled_caller_does_not_cancel_shared_call(self):
+        @async_cached(ttl=60)
+        async def lookup(job_title, location):
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        first = asyncio.ensure_future(lookup("Nurse", "Denver"))
+        second = asyncio.ensure_future(lookup("Nurse", "Denver"))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "ok"
+        assert await lookup("Nurse", "Denver") == "ok"
+        assert lookup.cache_info()["hits"] == 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBoundedCache:
+    def test_normalized_keys(self):
+        cache = BoundedCache()
+        cache["Taxes are BAD!"] = ["Framing Effect"]
+        assert "taxes are   bad" in cache
+        assert cache["  Taxes, are bad."] == ["Framing Effect"]
+        assert "Taxes are good" not in cache
+        assert normalize_text_key("a  b") == normalize_text_key("A, b!")
+
+    def test_evicts_least_recently_used(self):
+        cache = BoundedCache(maxsize=2)
+        cache["one"] = 1
+        cache["two"] = 2
+        assert cache["one"] == 1
+        cache["three"] = 3
+
+        assert "two" not in cache
+        assert cache.get("one") == 1
+        assert cache.get("three") == 3
+        assert cache.metrics()["evictions"] == 1
+
+    def test_byte_budget(self):
+        cache = BoundedCache(maxsize=100, max_bytes=100, sizeof=len)
+        cache["a"] = "x" * 60
+        cache["b"] = "y" * 30
+        cache["c"] = "z" * 30
+        assert "a" not in cache
+        assert len(cache) == 2
+        assert cache.metrics()["bytes"] == 60
+
+        cache["d"] = "w" * 101  # Larger than the whole budget: not cached
+        assert "d" not in cache
+        assert len(cache) == 2
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = BoundedCache(ttl=10, clock=clock)
+        cache["argument"] = ["Halo Effect"]
+        clock.now = 9
+        assert cache.get("argument") == ["Halo Effect"]
+        clock.now = 10
+        assert cache.get("argument") is None
+        metrics = cache.metrics()
+        assert metrics["expirations"] == 1
+        assert metrics["size"] == metrics["bytes"] == 0
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 1
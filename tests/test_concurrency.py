@@ -0,0 +1,67 @@
+# File: tests/test_concurrency.py
+
+import asyncio
+
+import pytest
+from utils.concurrency import ordered_concurrently
+
+
+@pytest.mark.asyncio
+class TestOrderedConcurrently:
+    async def test_yields_in_order_with_bounded_parallelism(self):
+        running = 0
+        peak = 0
+        finished = []
+
+        async def call(i, delay):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(delay)
+            running -= 1
+            finished.append(i)
+            return i
+
+        delays = [0.03, 0.01, 0.02, 0.01]
+        results = [
+            result
+            async for result in ordered_concurrently(
+                (call(i, d) for i, d in enumerate(delays)), limit=2
+            )
+        ]
+
+        assert results == [0, 1, 2, 3]
+        assert peak == 2
+        assert finished != sorted(finished)  # They did not run one by one
+
+    async def test_runs_concurrently(self):
+        async def call(i):
+            await asyncio.sleep(0.05)
+            return i
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = [
+            r async for r in ordered_concurrently((call(i) for i in range(5)), 5)
+        ]
+        assert results == list(range(5))
+        assert loop.time() - start < 0.2
+
+    async def test_closing_cancels_pending_calls(self):
+        cancelled = []
+
+        async def call(i):
+            try:
+                await asyncio.sleep(0 if i == 0 else 10)
+                return i
+            except asyncio.CancelledError:
+                cancelled.append(i)
+                raise
+
+        results = ordered_concurrently((call(i) for i in range(4)), limit=2)
+        assert await anext(results) == 0
+        await results.aclose()
+        await asyncio.sleep(0)
+
+        # Calls 1 and 2 were running; call 3 never got a slot
+        assert sorted(cancelled) == [1, 2]
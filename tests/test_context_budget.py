@@ -0,0 +1,104 @@
+# File: tests/test_context_budget.py
+
+from unittest.mock import patch
+
+import fastapi_poe as fp
+import pytest
+from utils import context_budget
+from utils.context_budget import (
+    estimate_tokens,
+    fit_query,
+    fit_to_budget,
+    message_tokens,
+    token_budget,
+)
+from utils.upstream import stream_request
+
+
+def user(content, message_id="m1"):
+    return fp.ProtocolMessage(role="user", content=content, message_id=message_id)
+
+
+def internal(content):
+    return fp.ProtocolMessage(role="user", content=content)
+
+
+def make_request(query):
+    return fp.QueryRequest(
+        version="1.0",
+        type="query",
+        query=query,
+        user_id="u",
+        conversation_id="c",
+        message_id="m",
+        access_key="k",
+    )
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hello, world!") == 4
+    assert estimate_tokens("internationalization") == 5
+
+
+def test_token_budget_env_override(monkeypatch):
+    assert token_budget("GPT-4") == 6000
+    monkeypatch.setenv("TOKEN_BUDGET_GPT_4", "100")
+    assert token_budget("GPT-4") == 100
+    assert token_budget("Unknown-Bot") == context_budget.DEFAULT_TOKEN_BUDGET
+
+
+def test_collapses_repeated_internal_prompts():
+    query = [
+        user("Argument"),
+        internal("Analyze the bias"),
+        internal("Explain Halo Effect"),
+        internal("Analyze the bias"),
+        internal("Explain Halo Effect"),
+    ]
+    assert fit_query(query, 10000) == [query[0], query[3], query[4]]
+
+
+def test_keeps_repeated_user_messages():
+    query = [user("yes", "m1"), user("yes", "m2"), internal("Continue")]
+    assert fit_query(query, 10000) == query
+
+
+def test_drops_oldest_internal_prompts_over_budget():
+    query = [
+        internal("old prompt " * 20),
+        user("User message"),
+        internal("recent prompt " * 20),
+        internal("Current prompt"),
+    ]
+    budget = sum(message_tokens(m) for m in query[1:])
+    assert fit_query(query, budget) == query[1:]
+    # User messages and the current prompt are never dropped
+    assert fit_query(query, 1) == [query[1], query[3]]
+
+
+def test_fit_to_budget_leaves_request_unchanged():
+    query = [user("Argument"), internal("Prompt"), internal("Prompt")]
+    request = make_request(query)
+    fitted = fit_to_budget(request, "GPT-4")
+    assert fitted.query == [query[0], query[2]]
+    assert request.query == query
+    assert fit_to_budget(fitted, "GPT-4") is fitted
+    assert context_budget._stats["GPT-4"]["tokens_saved"] > 0
+
+
+@pytest.mark.asyncio
+class TestStreamRequestBudget:
+    async def test_sends_trimmed_query(self):
+        sent = []
+
+        async def stream(request, *args, **kwargs):
+            sent.append(request.query)
+            yield fp.PartialResponse(text="ok")
+
+        query = [user("Argument"), internal("Prompt"), internal("Prompt")]
+        with patch('utils.upstream.fp.stream_request', stream):
+            async for _ in stream_request(make_request(query), "GPT-4"):
+                pass
+
+        assert sent == [[query[0], query[2]]]
@@ -1,4 +1,5 @@
 # File: tests/test_contract_analysis.py
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 import fastapi_poe as fp
@@ -178,3 +179,79 @@ class TestHandleContractAnalysis:
             responses[1].text
             == "\n\nWould you like to: \n1. Analyze another clause?\n2. Do something else?"
         )
+
+
+@pytest.mark.asyncio
+class TestContractAnalysisStages:
+    async def _run(self, concurrent: bool):
+        started = []
+
+        async def stage(name, delay, result):
+            started.append(name)
+            await asyncio.sleep(delay)
+            return result
+
+        async def stream(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            yield fp.PartialResponse(text="Initial analysis")
+
+        request = MagicMock()
+        request.query = [fp.ProtocolMessage(role="user", content="3")]
+        with patch('core.contract_analysis.fp.stream_request', stream), patch(
+            'core.contract_analysis.create_prompt', return_value="prompt"
+        ), patch(
+            'core.contract_analysis.get_detailed_breakdown',
+            lambda r, c: stage("breakdown", 0.05, {"Scope": "Narrow"}),
+        ), patch(
+            'core.contract_analysis.get_legal_implications',
+            lambda r, c: stage("legal", 0.02, "Low risk"),
+        ), patch(
+            'core.contract_analysis.get_sentiment_analysis',
+            lambda r, c: stage("sentiment", 0.01, "Neutral"),
+        ), patch(
+            'core.contract_analysis.CONTRACT_ANALYSIS_CONCURRENT', concurrent
+        ):
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            responses = [
+                r.text
+                async for r in handle_contract_analysis(request, "contract A clause")
+            ]
+            elapsed = loop.time() - start
+        return responses, elapsed
+
+    async def test_concurrent_mode_keeps_section_order(self):
+        responses, elapsed = await self._run(concurrent=True)
+        serial_responses, serial_elapsed = await self._run(concurrent=False)
+
+        assert responses == serial_responses
+        assert responses[1:8] == [
+            "Initial analysis",
+            "\n\nProviding a detailed breakdown:\n\n",
+            "Scope: \nNarrow\n\n",
+            "Potential legal implications:\n\n",
+            "Low risk",
+            "Sentiment analysis of the clause:\n\n",
+            "Neutral",
+        ]
+        # Roughly the slowest stage rather than the sum of all of them
+        assert elapsed < serial_elapsed
+        assert elapsed < 0.11
+
+    async def test_stages_send_distinct_prompts(self):
+        prompts = []
+
+        async def stream(request, bot_name, *args, **kwargs):
+            prompts.append(request.query[-1].content)
+            yield fp.PartialResponse(text="Scope: Narrow")
+
+        request = MagicMock()
+        request.query = [fp.ProtocolMessage(role="user", content="contract A")]
+        request.model_copy = lambda update: MagicMock(**update)
+        with patch('core.contract_analysis.stream_request', stream):
+            await get_detailed_breakdown(request, "A clause")
+            await get_legal_implications(request, "A clause")
+            await get_sentiment_analysis(request, "A clause")
+
+        # Identical prompts would share one response cache entry
+        assert len(set(prompts)) == 3
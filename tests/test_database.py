@@ -0,0 +1,141 @@
+# File: tests/test_database.py
+
+import json
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from utils import database
+from utils.database import (
+    append_negotiation_turn,
+    build_engine,
+    create_negotiation_scenario,
+    get_negotiation_scenario_by_id,
+    get_recent_negotiation_turns,
+    init_db,
+    migrate_legacy_history,
+    to_async_url,
+)
+
+
+def test_to_async_url():
+    assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert (
+        to_async_url("postgres://user:pw@host/db")
+        == "postgresql+asyncpg://user:pw@host/db"
+    )
+    assert (
+        to_async_url("postgresql://user:pw@host/db")
+        == "postgresql+asyncpg://user:pw@host/db"
+    )
+    assert to_async_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+
+@pytest.mark.asyncio
+class TestAsyncDatabase:
+    @pytest.fixture
+    def engine(self, tmp_path):
+        return build_engine(f"sqlite:///{tmp_path / 'bot.db'}")
+
+    async def _session_factory(self, engine):
+        await init_db(engine)
+        return async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def test_create_and_get_negotiation_scenario(self, engine):
+        session_factory = await self._session_factory(engine)
+        async with session_factory() as db:
+            scenario = await create_negotiation_scenario(db, "Salary Increase")
+            assert scenario.id is not None
+
+        async with session_factory() as db:
+            fetched = await get_negotiation_scenario_by_id(db, scenario.id)
+            assert fetched.topic == "Salary Increase"
+        await engine.dispose()
+
+    async def test_get_missing_negotiation_scenario(self, engine):
+        session_factory = await self._session_factory(engine)
+        async with session_factory() as db:
+            assert await get_negotiation_scenario_by_id(db, 12345) is None
+        await engine.dispose()
+
+    async def test_append_and_get_recent_negotiation_turns(self, engine):
+        session_factory = await self._session_factory(engine)
+        async with session_factory() as db:
+            scenario = await create_negotiation_scenario(db, "Rent")
+            for offer, response in [("900", "950"), ("920", "940"), ("930", "935")]:
+                await append_negotiation_turn(db, scenario.id, offer, response)
+
+        async with session_factory() as db:
+            turns = await get_recent_negotiation_turns(db, scenario.id)
+            assert [turn.turn_no for turn in turns] == [1, 2, 3]
+
+            recent = await get_recent_negotiation_turns(db, scenario.id, limit=2)
+            assert [turn.user_offer for turn in recent] == ["920", "930"]
+            assert [turn.bot_response for turn in recent] == ["940", "935"]
+        await engine.dispose()
+
+    async def test_append_retries_turn_numbers_taken_by_another_writer(self, engine):
+        session_factory = await self._session_factory(engine)
+        async with session_factory() as db:
+            scenario = await create_negotiation_scenario(db, "Rent")
+            await append_negotiation_turn(db, scenario.id, "900", "950")
+
+        # The first read misses the turn another writer committed meanwhile
+        last_turn_nos = database._last_turn_nos
+        reads = []
+
+        async def stale_then_fresh(db, scenario_ids):
+            reads.append(scenario_ids)
+            if len(reads) == 1:
+                return {}
+            return await last_turn_nos(db, scenario_ids)
+
+        async with session_factory() as db:
+            with patch.object(database, "_last_turn_nos", stale_then_fresh):
+                turn = await append_negotiation_turn(db, scenario.id, "920", "940")
+        assert len(reads) == 2
+        assert turn.turn_no == 2
+
+        async with session_factory() as db:
+            turns = await get_recent_negotiation_turns(db, scenario.id)
+            assert [turn.user_offer for turn in turns] == ["900", "920"]
+        await engine.dispose()
+
+    async def test_init_db_moves_legacy_history_into_turns(self, engine, tmp_path):
+        # A database from before negotiation_turns, plus one turn recorded
+        # since, and a scenario whose legacy history is unreadable
+        session_factory = await self._session_factory(engine)
+        async with session_factory() as db:
+            scenario = await create_negotiation_scenario(db, "Rent")
+            other = await create_negotiation_scenario(db, "Car purchase")
+            await append_negotiation_turn(db, scenario.id, "930", "935")
+        await engine.dispose()
+        with sqlite3.connect(tmp_path / "bot.db") as conn:
+            for column in ("user_offers", "bot_responses"):
+                conn.execute(
+                    f"ALTER TABLE negotiation_scenarios ADD COLUMN {column} TEXT"
+                )
+            conn.execute(
+                "UPDATE negotiation_scenarios SET user_offers = ?, "
+                "bot_responses = ? WHERE id = ?",
+                (json.dumps(["900", "920"]), json.dumps(["950"]), scenario.id),
+            )
+            conn.execute(
+                "UPDATE negotiation_scenarios SET user_offers = 'oops' WHERE id = ?",
+                (other.id,),
+            )
+
+        await init_db(engine)
+        await init_db(engine)  # Nothing left to migrate
+        async with session_factory() as db:
+            turns = await get_recent_negotiation_turns(db, scenario.id)
+            assert [(t.turn_no, t.user_offer, t.bot_response) for t in turns] == [
+                (1, "900", "950"),
+                (2, "920", ""),
+                (3, "930", "935"),
+            ]
+            assert await get_recent_negotiation_turns(db, other.id) == []
+        async with engine.connect() as conn:
+            assert await conn.run_sync(migrate_legacy_history) == 0
+        await engine.dispose()
@@ -0,0 +1,141 @@
+# File: tests/test_external_api.py
+
+import pytest
+from aiohttp import web
+from unittest.mock import patch
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from utils import external_api
+from utils.database import build_engine, init_db
+from utils.external_api import close_http_session, fetch_salary_data, get_http_session
+from utils.salary_cache import SalaryCache
+from utils.salary_index import SalaryIndex, build_salary_index
+
+
+@pytest.mark.asyncio
+class TestFetchSalaryData:
+    async def _start_stub_server(self, handler):
+        """Starts a local HTTP server standing in for the Adzuna API."""
+        app = web.Application()
+        app.router.add_get("/search", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://127.0.0.1:{port}/search"
+
+    @pytest.fixture(autouse=True)
+    def credentials(self):
+        fetch_salary_data.cache_clear()
+        with patch.object(external_api, "ADZUNA_API_ID", "test-id"), patch.object(
+            external_api, "ADZUNA_API_KEY", "test-key"
+        ):
+            yield
+
+    @pytest.fixture(autouse=True)
+    def no_salary_index(self):
+        with patch.object(external_api, "_salary_index", None), patch.object(
+            external_api, "_salary_index_loaded", True
+        ):
+            yield
+
+    @pytest.fixture
+    def salary_engine(self, tmp_path):
+        """Points the shared salary cache at an empty throwaway database."""
+        engine = build_engine(f"sqlite:///{tmp_path / 'salary.db'}")
+        cache = SalaryCache(session_factory=async_sessionmaker(bind=engine))
+        with patch.object(external_api, "salary_cache", cache):
+            yield engine
+
+    async def test_fetch_salary_data_reuses_shared_session(self, salary_engine):
+        await init_db(salary_engine)
+        client_ports = []
+
+        async def handler(request):
+            client_ports.append(request.transport.get_extra_info("peername")[1])
+            return web.json_response(
+                {
+                    "results": [
+                        {"salary_min": 100000, "salary_max": 140000},
+                        {"salary_min": 110000, "salary_max": 150000},
+                    ]
+                }
+            )
+
+        runner, url = await self._start_stub_server(handler)
+        try:
+            with patch.object(external_api, "ADZUNA_BASE_URL", url):
+                first = await fetch_salary_data("Software Engineer", "Austin")
+                second = await fetch_salary_data("Data Scientist", "Boston")
+                assert await get_http_session() is await get_http_session()
+        finally:
+            await close_http_session()
+            await runner.cleanup()
+            await salary_engine.dispose()
+
+        assert first == {"average_salary": 125000, "currency": "USD"}
+        assert second == first
+        # Both requests went over the same kept-alive connection
+        assert len(client_ports) == 2
+        assert client_ports[0] == client_ports[1]
+
+    async def test_fetch_salary_data_no_results(self, salary_engine):
+        await init_db(salary_engine)
+
+        async def handler(request):
+            return web.json_response({"results": []})
+
+        runner, url = await self._start_stub_server(handler)
+        try:
+            with patch.object(external_api, "ADZUNA_BASE_URL", url):
+                with pytest.raises(ValueError, match="No salary data found"):
+                    await fetch_salary_data("Astronaut", "Nowhere")
+        finally:
+            await close_http_session()
+            await runner.cleanup()
+            await salary_engine.dispose()
+
+    async def test_close_http_session(self):
+        session = await get_http_session()
+        await close_http_session()
+        assert session.closed
+        assert not (await get_http_session()).closed
+        await close_http_session()
+
+    async def test_fetch_salary_data_prefers_offline_index(self, tmp_path):
+        index_path = str(tmp_path / "salary_index.bin")
+        build_salary_index(
+            [{"job_title": "Nurse", "location": "Denver", "salary": 80000}], index_path
+        )
+        index = SalaryIndex(index_path)
+        try:
+            with patch.object(external_api, "_salary_index", index), patch.object(
+                external_api, "SALARY_OFFLINE_ONLY", True
+            ):
+                result = await fetch_salary_data("Nurse", "Denver")
+                with pytest.raises(ValueError, match="No salary data found"):
+                    await fetch_salary_data("Astronaut", "Nowhere")
+        finally:
+            index.close()
+
+        assert result["average_salary"] == 80000
+        assert result["salary_min"] == result["salary_max"] == 80000
+
+
+class TestAdzunaCredentials:
+    def test_read_from_environment_on_first_use(self, monkeypatch):
+        monkeypatch.setenv("ADZUNA_API_ID", "env-id")
+        monkeypatch.setenv("ADZUNA_API_KEY", "env-key")
+        with patch.object(external_api, "ADZUNA_API_ID", None), patch.object(
+            external_api, "ADZUNA_API_KEY", None
+        ):
+            assert external_api.adzuna_credentials() == ("env-id", "env-key")
+
+    def test_missing_credentials(self, monkeypatch):
+        monkeypatch.delenv("ADZUNA_API_ID", raising=False)
+        monkeypatch.delenv("ADZUNA_API_KEY", raising=False)
+        with patch.object(external_api, "ADZUNA_API_ID", None), patch.object(
+            external_api, "ADZUNA_API_KEY", None
+        ):
+            with pytest.raises(ValueError):
+                external_api.adzuna_credentials()
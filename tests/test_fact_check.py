@@ -2,8 +2,11 @@
 
 from fastapi_poe import BotError
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+import fastapi_poe as fp
+from core import fact_check
 from core.fact_check import handle_fact_check
+from utils.near_duplicates import NearDuplicateIndex
 
 
 @pytest.mark.asyncio
@@ -63,6 +66,39 @@ class TestFactCheck:
         assert responses[0].text == "Invalid input for fact checking"
 
 
+@pytest.mark.asyncio
+class TestFactCheckNearDuplicates:
+    async def test_reuses_result_for_reworded_statement(self):
+        calls = []
+
+        async def stream(request, bot_name, *args, **kwargs):
+            calls.append(bot_name)
+            yield fp.PartialResponse(text=f"Verdict {len(calls)}.")
+
+        async def run(statement):
+            request = MagicMock()
+            request.query = [fp.ProtocolMessage(role="user", content="3")]
+            return [
+                r.text
+                async for r in handle_fact_check(request, f"fact-check {statement}")
+            ]
+
+        with patch("core.fact_check.fp.stream_request", stream), patch(
+            "core.fact_check.create_prompt", return_value="prompt"
+        ), patch.object(fact_check, "FACT_CHECK_NEAR_DUPLICATES", True), patch.object(
+            fact_check, "fact_check_index", NearDuplicateIndex(threshold=0.7)
+        ):
+            first = await run("The Great Wall of China is visible from space.")
+            second = await run("the great wall of china is visible from space")
+            negated = await run("The Great Wall of China is not visible from space.")
+            other = await run("Goldfish have a three second memory.")
+
+        assert first[1] == second[1] == "Verdict 1."
+        assert negated[1] == "Verdict 2."
+        assert other[1] == "Verdict 3."
+        assert calls == ["GPT-3.5-Turbo"] * 3
+
+
 async def test_handle_fact_check_no_statement(self):
     request = AsyncMock()
     user_input = "fact-check"
@@ -76,3 +112,20 @@ async def test_handle_fact_check_no_statement(self):
         with pytest.raises(BotError, match="Please provide a statement to fact-check."):
             async for _ in handle_fact_check(request, user_input):
                 pass
+
+
+@pytest.mark.asyncio
+async def test_strips_the_routed_keyword():
+    statements = []
+
+    async def check(statement, request):
+        statements.append(statement)
+        yield fp.PartialResponse(text="Verdict.")
+
+    with patch.object(fact_check, "fact_check", check):
+        async for _ in handle_fact_check(
+            MagicMock(), "fact check the moon is made of cheese", "fact check"
+        ):
+            pass
+
+    assert statements == ["the moon is made of cheese"]
@@ -0,0 +1,130 @@
+# File: tests/test_hedging.py
+
+import asyncio
+from unittest.mock import patch
+
+import fastapi_poe as fp
+import pytest
+from utils import hedging, upstream
+from utils.hedging import HedgePolicy
+from utils.upstream import stream_request
+
+
+def make_request():
+    return fp.QueryRequest(
+        version="1.0",
+        type="query",
+        query=[fp.ProtocolMessage(role="user", content="Debate: remote work")],
+        user_id="u",
+        conversation_id="c",
+        message_id="m",
+        access_key="k",
+    )
+
+
+class FakeUpstream:
+    """Streams "<bot>: ok" after each bot's injected first-token latency."""
+
+    def __init__(self, latencies, failures=()):
+        self.latencies = latencies
+        self.failures = set(failures)
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, request, bot_name, *args, **kwargs):
+        self.calls.append(bot_name)
+        try:
+            await asyncio.sleep(self.latencies.get(bot_name, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(bot_name)
+            raise
+        if bot_name in self.failures:
+            raise RuntimeError(f"{bot_name} failed")
+        yield fp.PartialResponse(text=f"{bot_name}: ")
+        yield fp.PartialResponse(text="ok")
+
+
+@pytest.fixture
+def policy():
+    policy = HedgePolicy(enabled=True, max_delay=0.05, max_rate=1.0)
+    with patch.object(hedging, "hedge_policy", policy), patch.object(
+        upstream, "hedge_policy", policy
+    ):
+        yield policy
+
+
+async def run(fake, bot="GPT-3.5-Turbo"):
+    with patch("utils.upstream.fp.stream_request", fake):
+        return "".join(
+            [msg.text async for msg in stream_request(make_request(), bot, "k")]
+        )
+
+
+@pytest.mark.asyncio
+class TestHedgedRequests:
+    async def test_slow_start_is_hedged(self, policy):
+        fake = FakeUpstream({"GPT-3.5-Turbo": 1.0, "Claude-instant": 0})
+        assert await run(fake) == "Claude-instant: ok"
+        assert fake.calls == ["GPT-3.5-Turbo", "Claude-instant"]
+        assert fake.cancelled == ["GPT-3.5-Turbo"]
+        assert policy.metrics()["hedges_won"] == 1
+
+    async def test_reports_the_bot_that_answered(self, policy):
+        answered = []
+
+        def start(bot):
+            return fake(make_request(), bot)
+
+        fake = FakeUpstream({"GPT-3.5-Turbo": 1.0, "Claude-instant": 0})
+        stream = hedging.hedged_stream(
+            start, "GPT-3.5-Turbo", "m", on_answer=answered.append
+        )
+        assert [msg.text async for msg in stream] == ["Claude-instant: ", "ok"]
+        assert answered == ["Claude-instant"]
+
+    async def test_fast_start_is_not_hedged(self, policy):
+        fake = FakeUpstream({})
+        assert await run(fake) == "GPT-3.5-Turbo: ok"
+        assert fake.calls == ["GPT-3.5-Turbo"]
+
+    async def test_primary_wins_if_hedge_is_slower(self, policy):
+        fake = FakeUpstream({"GPT-4": 0.1})
+        assert await run(fake, "GPT-4") == "GPT-4: ok"
+        # GPT-4 is alone in its tier, so the hedge is a second GPT-4 call
+        assert fake.calls == ["GPT-4", "GPT-4"]
+        assert fake.cancelled == ["GPT-4"]
+        assert policy.metrics()["hedges_won"] == 0
+
+    async def test_failed_call_falls_back_to_the_other(self, policy):
+        fake = FakeUpstream(
+            {"GPT-3.5-Turbo": 0.1, "Claude-instant": 0.2}, failures={"GPT-3.5-Turbo"}
+        )
+        assert await run(fake) == "Claude-instant: ok"
+
+        fake = FakeUpstream({}, failures={"GPT-3.5-Turbo"})
+        with pytest.raises(RuntimeError):
+            await run(fake)
+
+    async def test_rate_cap(self, policy):
+        policy.max_rate = 0
+        fake = FakeUpstream({"GPT-3.5-Turbo": 0.1})
+        assert await run(fake) == "GPT-3.5-Turbo: ok"
+        assert fake.calls == ["GPT-3.5-Turbo"]
+        assert policy.metrics()["hedges"] == 0
+
+    async def test_call_budget(self, policy):
+        policy.calls.budgets["Claude-instant"] = 1
+        policy.calls.record("m", "Claude-instant")
+        fake = FakeUpstream({"GPT-3.5-Turbo": 0.1})
+        assert await run(fake) == "GPT-3.5-Turbo: ok"
+        assert fake.calls == ["GPT-3.5-Turbo"]
+
+
+def test_delay_tracks_percentile():
+    policy = HedgePolicy(min_delay=0.1, max_delay=5, min_samples=10)
+    assert policy.delay("GPT-4") == 5
+    for i in range(100):
+        policy.record_first_token("GPT-4", i / 100)
+    assert policy.delay("GPT-4") == pytest.approx(0.94, abs=0.01)
+    assert policy.alternate("GPT-3.5-Turbo") == "Claude-instant"
+    assert policy.alternate("Other-Bot") is None
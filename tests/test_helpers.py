@@ -0,0 +1,73 @@
+# File: tests/test_helpers.py
+
+from unittest.mock import patch
+
+import pytest
+from utils import helpers
+from utils.helpers import generate_dynamic_follow_up_questions, iter_follow_up_questions
+
+TAGS = {
+    "contract": "NN",
+    "salary": "NN",
+    "employer": "NN",
+    "terminates": "VBZ",
+    "pays": "VBZ",
+    "don't": "VBP",
+}
+
+
+class FakeTagger:
+    def __init__(self):
+        self.calls = 0
+
+    def tag(self, tokens):
+        self.calls += 1
+        return [(token, TAGS.get(token, "DT")) for token in tokens]
+
+
+@pytest.fixture
+def tagger():
+    tagger = FakeTagger()
+    with patch.object(helpers, "get_pos_tagger", return_value=tagger):
+        yield tagger
+
+
+def test_questions_in_first_seen_order_without_duplicates(tagger):
+    text = "The employer pays the salary. The contract terminates. The salary"
+    assert generate_dynamic_follow_up_questions(text, max_questions=None) == [
+        "Tell me more about employer.",
+        "What is the significance of employer in this context?",
+        "Why did pays happen?",
+        "What were the consequences of pays?",
+        "Tell me more about salary.",
+        "What is the significance of salary in this context?",
+        "Tell me more about contract.",
+        "What is the significance of contract in this context?",
+        "Why did terminates happen?",
+        "What were the consequences of terminates?",
+    ]
+
+
+def test_stops_at_max_questions(tagger):
+    text = "The employer pays. " * 1000 + "The contract terminates."
+    questions = iter_follow_up_questions(text, max_questions=3)
+    assert list(questions) == [
+        "Tell me more about employer.",
+        "What is the significance of employer in this context?",
+        "Why did pays happen?",
+    ]
+    assert tagger.calls == 1
+    assert generate_dynamic_follow_up_questions(text, max_questions=0) == []
+    assert len(generate_dynamic_follow_up_questions(text * 3)) <= (
+        helpers.FOLLOW_UP_MAX_QUESTIONS
+    )
+
+
+def test_fast_tokenizer(tagger):
+    questions = list(iter_follow_up_questions("I don't know.", fast_tokenizer=True))
+    assert questions == [
+        "Why did don't happen?",
+        "What were the consequences of don't?",
+    ]
+    # The Treebank tokenizer splits the contraction
+    assert list(iter_follow_up_questions("I don't know.")) == []
@@ -0,0 +1,61 @@
+# File: tests/test_intent_router.py
+
+from utils.intent_router import IntentRouter, Route, strip_keyword
+
+
+def test_routes_keyword_with_word_boundaries():
+    router = IntentRouter()
+    assert router.route("Analyze this contract clause") == Route(
+        "contract_analysis", 0.9, "contract"
+    )
+    assert router.route("I need help with my contractor's invoice") is None
+
+
+def test_priority_over_dict_order():
+    router = IntentRouter()
+    route = router.route("How do I negotiate my salary in the new contract?")
+    assert route.intent == "salary_negotiation"
+    assert route.confidence == 0.7
+
+
+def test_command_form_wins():
+    router = IntentRouter()
+    assert router.route("debate: should salaries be public?") == Route(
+        "debate", 1.0, "debate"
+    )
+    assert router.route("Fact-check this debate claim").intent == "fact_check"
+
+
+def test_longest_keyword_matched():
+    router = IntentRouter()
+    assert router.route("cognitive bias: all swans are white").keyword == (
+        "cognitive bias"
+    )
+
+
+def test_fuzzy_matching():
+    router = IntentRouter()
+    route = router.route("salry for a web developer")
+    assert route.intent == "salary_negotiation"
+    assert 0.5 < route.confidence < 0.6
+    assert IntentRouter(fuzzy=False).route("salry for a web developer") is None
+    assert router.route("What is the weather like today?") is None
+
+
+def test_custom_intents():
+    router = IntentRouter([("greeting", ("hello", "hi")), ("farewell", ("bye",))])
+    assert router.route("Hi there").intent == "greeting"
+    assert router.route("ok bye, hello to them").intent == "greeting"
+
+
+def test_strip_keyword():
+    assert strip_keyword("fact check the moon is cheese", "fact check") == (
+        "the moon is cheese"
+    )
+    assert strip_keyword("Is this biased? The bias is clear", "biased") == (
+        "Is this ? The bias is clear"
+    )
+    assert strip_keyword("Debate: remote work", "debate") == ": remote work"
+    assert strip_keyword("salry for a web developer", "salary") == (
+        "salry for a web developer"
+    )
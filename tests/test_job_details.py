@@ -0,0 +1,75 @@
+# File: tests/test_job_details.py
+
+from utils import job_details
+from utils.job_details import Gazetteer, JobDetailsExtractor, normalize_words
+
+TITLES = {
+    "Software Engineer": ["software developer", "swe", "developer"],
+    "Web Developer": ["web dev"],
+    "Registered Nurse": ["nurse", "rn"],
+}
+LOCATIONS = {
+    "San Francisco": ["sf", "bay area"],
+    "Washington": ["wa", "washington state"],
+    "Washington DC": ["washington d.c.", "dc"],
+}
+
+
+def test_gazetteer_prefers_longest_alias():
+    gazetteer = Gazetteer(LOCATIONS)
+    words = normalize_words("From Washington D.C. to the Bay Area")
+    assert gazetteer.find(words) == [
+        (1, 3, "Washington DC"),
+        (5, 7, "San Francisco"),
+    ]
+
+
+def test_extracts_canonical_keys():
+    extractor = JobDetailsExtractor(TITLES, LOCATIONS)
+    expected = {"job_title": "Software Engineer", "location": "San Francisco"}
+    assert extractor.extract("Software Engineer in San Francisco") == expected
+    assert extractor.extract("I'm a swe in the bay area, is 150k fair?") == expected
+    assert extractor.extract("i'm a software developer in sf") == expected
+    assert extractor.extract("I'm a web dev in DC") == {
+        "job_title": "Web Developer",
+        "location": "Washington DC",
+    }
+
+
+def test_location_words_are_not_titles():
+    extractor = JobDetailsExtractor({"Lobbyist": ["washington"]}, LOCATIONS)
+    assert extractor.extract("What do people make in Washington?") == {
+        "job_title": None,
+        "location": "Washington",
+    }
+
+
+def test_falls_back_to_bounded_phrases():
+    extractor = JobDetailsExtractor(TITLES, LOCATIONS)
+    assert extractor.extract("I'm a beekeeper in Boise, what should I ask for?") == {
+        "job_title": "Beekeeper",
+        "location": "Boise",
+    }
+    assert extractor.extract("I'm looking for a marine biologist job") == {
+        "job_title": "Marine Biologist",
+        "location": None,
+    }
+    assert extractor.extract("How do I ask for a raise?") == {
+        "job_title": None,
+        "location": None,
+    }
+
+
+def test_default_gazetteer_loads():
+    extractor = JobDetailsExtractor.from_file()
+    assert extractor.extract("I'm a nurse in NYC") == {
+        "job_title": "Registered Nurse",
+        "location": "New York",
+    }
+
+
+def test_default_gazetteer_loads_from_any_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(job_details, "_extractor", None)
+    extractor = job_details.get_job_details_extractor()
+    assert extractor.extract("I'm a nurse in NYC")["location"] == "New York"
@@ -0,0 +1,157 @@
+# File: tests/test_llm_cache.py
+
+from unittest.mock import patch
+
+import fastapi_poe as fp
+import pytest
+from utils import upstream
+from utils.llm_cache import ResponseCache, response_cache_key
+from utils.upstream import stream_request
+
+
+def make_request(*contents):
+    return fp.QueryRequest(
+        version="1.0",
+        type="query",
+        query=[fp.ProtocolMessage(role="user", content=c) for c in contents],
+        user_id="u",
+        conversation_id="c",
+        message_id="m",
+        access_key="k",
+    )
+
+
+def test_response_cache_key():
+    request = make_request("debate taxes", "Generate a debate on:  taxes")
+    same = make_request("other", "debate taxes", "Generate a debate on: taxes ")
+    assert response_cache_key("GPT-4", request.query, 2) == response_cache_key(
+        "GPT-4", same.query, 2
+    )
+    assert response_cache_key("GPT-4", request.query) != response_cache_key(
+        "Claude-instant", request.query
+    )
+    assert response_cache_key("GPT-4", request.query) != response_cache_key(
+        "GPT-4", make_request("debate taxes", "Debate: tariffs").query
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+class TestStreamRequestCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        ttls = {"debate": 60, "negotiation": 0}
+        cache = ResponseCache(
+            path=str(tmp_path / "llm_cache.sqlite3"),
+            enabled=True,
+            ttl_for=lambda handler: ttls.get(handler, 0),
+            clock=FakeClock(),
+        )
+        with patch.object(upstream, "response_cache", cache):
+            yield cache
+        cache.close()
+
+    @pytest.fixture
+    def upstream_calls(self):
+        calls = []
+
+        async def fake_stream_request(request, bot_name, api_key="", **kwargs):
+            calls.append(bot_name)
+            for text in ("For: ", "lower taxes"):
+                yield fp.PartialResponse(text=text)
+
+        with patch("utils.upstream.fp.stream_request", fake_stream_request):
+            yield calls
+
+    async def _collect(self, request, handler):
+        return [
+            msg.text
+            async for msg in stream_request(request, "GPT-4", "k", handler=handler)
+        ]
+
+    async def test_hit_replays_chunks(self, cache, upstream_calls):
+        request = make_request("debate taxes")
+        assert await self._collect(request, "debate") == ["For: ", "lower taxes"]
+        assert await self._collect(request, "debate") == ["For: ", "lower taxes"]
+
+        assert upstream_calls == ["GPT-4"]
+        assert cache.metrics()["debate"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+    async def test_disk_store_survives_restart(self, cache, upstream_calls, tmp_path):
+        await self._collect(make_request("debate taxes"), "debate")
+
+        restarted = ResponseCache(
+            path=cache._store.path,
+            enabled=True,
+            ttl_for=lambda handler: 60,
+            clock=cache._clock,
+        )
+        with patch.object(upstream, "response_cache", restarted):
+            result = await self._collect(make_request("debate taxes"), "debate")
+        restarted.close()
+
+        assert result == ["For: ", "lower taxes"]
+        assert upstream_calls == ["GPT-4"]
+
+    async def test_entries_expire(self, cache, upstream_calls):
+        await self._collect(make_request("debate taxes"), "debate")
+        cache._clock.now += 61
+        await self._collect(make_request("debate taxes"), "debate")
+        assert upstream_calls == ["GPT-4", "GPT-4"]
+
+    async def test_opted_out_handlers_are_not_cached(self, cache, upstream_calls):
+        for handler in ("negotiation", None):
+            await self._collect(make_request("negotiation 1"), handler)
+            await self._collect(make_request("negotiation 1"), handler)
+        assert len(upstream_calls) == 4
+        assert cache.metrics() == {}
+
+    async def test_partial_stream_is_not_cached(self, cache, upstream_calls):
+        request = make_request("debate taxes")
+        async for msg in stream_request(request, "GPT-4", "k", handler="debate"):
+            break
+        await self._collect(request, "debate")
+        assert upstream_calls == ["GPT-4", "GPT-4"]
+
+    async def test_only_the_named_bots_answers_are_cached(self, cache, upstream_calls):
+        request = make_request("debate taxes")
+        selections = iter(
+            ["Claude-instant", "GPT-3.5-Turbo", "GPT-4", "Claude-instant"]
+        )
+        with patch.object(
+            upstream.model_selector, "select", lambda *args: next(selections)
+        ):
+            for _ in range(4):
+                assert await self._collect(request, "debate") == [
+                    "For: ",
+                    "lower taxes",
+                ]
+        # Substituted answers are not stored as GPT-4's; GPT-4's own is, and
+        # is replayed whichever bot is selected next
+        assert upstream_calls == ["Claude-instant", "GPT-3.5-Turbo", "GPT-4"]
+
+    async def test_entries_from_another_bot_are_misses(self, cache, upstream_calls):
+        request = make_request("debate taxes")
+        key = response_cache_key("GPT-4", request.query)
+        await cache.set("debate", key, "Claude-instant", [("cached", False, False)])
+        assert await cache.get("debate", key, "GPT-4") is None
+        # An entry stored before entries recorded their bot
+        cache._store._connect().execute(
+            "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?)",
+            (key, '[["legacy", false, false]]', 2000.0),
+        )
+        cache._memory.clear()
+
+        assert await self._collect(request, "debate") == ["For: ", "lower taxes"]
+        assert upstream_calls == ["GPT-4"]
+        assert await cache.get("debate", key, "GPT-4") == [
+            ("For: ", False, False),
+            ("lower taxes", False, False),
+        ]
@@ -0,0 +1,191 @@
+# File: tests/test_model_selection.py
+
+import asyncio
+from unittest.mock import patch
+
+import fastapi_poe as fp
+import pytest
+from utils import upstream
+from utils.model_selection import (
+    ModelSelector,
+    RequestCalls,
+    estimate_complexity,
+    request_calls,
+)
+from utils.upstream import stream_request
+
+SHORT = "Generate two opposing viewpoints on the topic: remote work."
+LONG = (
+    "Analyze this clause: the Employee shall not, for 24 months, engage in any "
+    "business that competes with the Company, unless the Company pays 50% of "
+    "the $120,000 base salary, provided that notice is given within 30 days. "
+) * 3
+
+
+def prompt(text):
+    return [fp.ProtocolMessage(role="user", content=text)]
+
+
+def test_estimate_complexity():
+    assert estimate_complexity("") == 0
+    assert estimate_complexity(SHORT) < 0.2
+    assert estimate_complexity(LONG) > 0.6
+
+
+def test_short_prompts_skip_the_strong_tier():
+    selector = ModelSelector()
+    assert selector.choose("debate", SHORT, "GPT-4") == (
+        "GPT-3.5-Turbo",
+        estimate_complexity(SHORT),
+        1,
+        "cheaper tier",
+    )
+    assert selector.choose("debate", LONG, "GPT-4").bot == "GPT-4"
+    assert selector.choose("debate", LONG, "Claude-instant").reason == (
+        "needs stronger tier"
+    )
+
+
+def test_quality_floor():
+    selector = ModelSelector()
+    assert selector.choose("contract_analysis", SHORT, "GPT-4").bot == "GPT-4"
+    with patch.dict("os.environ", {"MODEL_QUALITY_FLOOR_CONTRACT_ANALYSIS": "1"}):
+        assert selector.choose("contract_analysis", SHORT, "GPT-4").bot != "GPT-4"
+
+
+def test_latency_and_errors_steer_within_a_tier():
+    selector = ModelSelector()
+    assert selector.choose("debate", SHORT, "Claude-instant").bot == "Claude-instant"
+
+    selector.record_success("Claude-instant", 3.0, 10.0)
+    selector.record_success("GPT-3.5-Turbo", 0.5, 4.0)
+    assert selector.choose("debate", SHORT, "Claude-instant") == (
+        "GPT-3.5-Turbo",
+        estimate_complexity(SHORT),
+        1,
+        "faster",
+    )
+
+    for _ in range(5):
+        selector.record_error("GPT-3.5-Turbo")
+    assert selector.choose("debate", SHORT, "GPT-3.5-Turbo").bot == "Claude-instant"
+    assert selector.metrics()["bots"]["GPT-3.5-Turbo"]["errors"] == 5
+
+
+def test_unhealthy_bot_is_picked_again_once_errors_age():
+    now = [0.0]
+    selector = ModelSelector(clock=lambda: now[0])
+    for _ in range(5):
+        selector.record_error("GPT-3.5-Turbo")
+    assert selector.choose("debate", SHORT, "GPT-3.5-Turbo").bot == "Claude-instant"
+
+    # No call reaches the bot while it is skipped, yet its errors age out
+    now[0] += 60
+    assert selector.stats["GPT-3.5-Turbo"].error_rate < 0.5
+    assert selector.choose("debate", SHORT, "GPT-3.5-Turbo").bot == "GPT-3.5-Turbo"
+
+
+def test_upgrades_stay_within_call_budgets():
+    calls = RequestCalls({"GPT-3.5-Turbo": 5, "Claude-instant": 3, "GPT-4": 2})
+    selector = ModelSelector(calls=calls)
+    # The contract_analysis floor upgrades, and so does a complex prompt...
+    assert selector.choose("contract_analysis", SHORT, "Claude-instant", "m").bot == (
+        "GPT-4"
+    )
+    assert selector.choose("debate", LONG, "GPT-3.5-Turbo", "m").bot == "GPT-4"
+
+    # ...until the request has used up its GPT-4 calls
+    calls.record("m", "GPT-4")
+    calls.record("m", "GPT-4")
+    assert selector.choose("contract_analysis", SHORT, "Claude-instant", "m") == (
+        "Claude-instant",
+        estimate_complexity(SHORT),
+        2,
+        "no healthy bot within budget",
+    )
+    assert selector.choose("debate", LONG, "GPT-3.5-Turbo", "m").bot == (
+        "GPT-3.5-Turbo"
+    )
+    # Another request has its own budget, and a named bot is always allowed
+    assert selector.choose("debate", LONG, "GPT-3.5-Turbo", "n").bot == "GPT-4"
+    assert selector.choose("debate", LONG, "GPT-4", "m").bot == "GPT-4"
+
+
+def test_disabled_or_unknown_default_is_kept():
+    selector = ModelSelector(enabled=False)
+    assert selector.select("debate", prompt(SHORT), "GPT-4") == "GPT-4"
+    assert ModelSelector().select("debate", prompt(SHORT), "Other-Bot") == "Other-Bot"
+
+
+@pytest.mark.asyncio
+async def test_stream_request_calls_selected_bot(caplog):
+    calls = []
+
+    async def stream(request, bot_name, *args, **kwargs):
+        calls.append(bot_name)
+        yield fp.PartialResponse(text="ok")
+
+    async def failing(request, bot_name, *args, **kwargs):
+        raise RuntimeError("upstream down")
+        yield
+
+    request = fp.QueryRequest(
+        version="1.0",
+        type="query",
+        query=prompt(SHORT),
+        user_id="u",
+        conversation_id="c",
+        message_id="m",
+        access_key="k",
+    )
+    selector = ModelSelector()
+    with patch.object(upstream, "model_selector", selector):
+        with patch("utils.upstream.fp.stream_request", stream):
+            with caplog.at_level("INFO", logger="utils.model_selection"):
+                async for _ in stream_request(request, "GPT-4", handler="debate"):
+                    pass
+        with patch("utils.upstream.fp.stream_request", failing):
+            with pytest.raises(RuntimeError):
+                async for _ in stream_request(request, "GPT-4", handler="debate"):
+                    pass
+
+    assert calls == ["GPT-3.5-Turbo"]
+    assert "debate: GPT-3.5-Turbo (default GPT-4" in caplog.text
+    bots = selector.metrics()["bots"]
+    assert bots["GPT-3.5-Turbo"]["calls"] == 2
+    assert bots["GPT-3.5-Turbo"]["errors"] == 1
+    assert selector.metrics()["decisions"]["debate"] == {
+        "GPT-3.5-Turbo (cheaper tier)": 2
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_the_request_budget():
+    calls = []
+
+    async def stream(request, bot_name, *args, **kwargs):
+        calls.append(bot_name)
+        yield fp.PartialResponse(text="ok")
+
+    async def call():
+        request = fp.QueryRequest(
+            version="1.0",
+            type="query",
+            query=prompt(SHORT),
+            user_id="u",
+            conversation_id="c",
+            message_id="budget",
+            access_key="k",
+        )
+        async for _ in stream_request(
+            request, "Claude-instant", handler="contract_analysis"
+        ):
+            pass
+
+    selector = ModelSelector(calls=request_calls)
+    with patch.object(upstream, "model_selector", selector), patch(
+        "utils.upstream.fp.stream_request", stream
+    ):
+        await asyncio.gather(*(call() for _ in range(3)))
+
+    assert sorted(calls) == ["Claude-instant", "GPT-4", "GPT-4"]
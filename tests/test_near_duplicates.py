@@ -0,0 +1,63 @@
+# File: tests/test_near_duplicates.py
+
+import numpy as np
+from utils.near_duplicates import NearDuplicateIndex, anchors, shingles
+
+
+def test_shingles_fold_case_and_punctuation():
+    assert shingles("Hello,  World!", size=5) == shingles("hello world", size=5)
+    assert shingles("abc", size=5) == ["abc"]
+
+
+def test_signature_estimates_jaccard():
+    index = NearDuplicateIndex(num_perm=256, bands=32)
+    a = "The Great Wall of China is visible from space with the naked eye"
+    b = "The Great Wall of China is visible from space with the naked eye."
+    c = "Vaccines cause autism according to a retracted 1998 study"
+    assert (index.signature(a) == index.signature(b)).mean() == 1.0
+    assert (index.signature(a) == index.signature(c)).mean() < 0.2
+
+
+def test_lookup_reuses_near_duplicates():
+    index = NearDuplicateIndex(threshold=0.7)
+    index.add("The Great Wall of China is visible from space.", "False.")
+    index.add("Humans only use 10 percent of their brains.", "Myth.")
+
+    assert index.lookup("the great wall of china is visible from space") == "False."
+    assert index.lookup("The Great Wall of China is visible from outer space") == (
+        "False."
+    )
+    assert index.lookup("Goldfish have a three second memory.") is None
+
+
+def test_anchors():
+    assert anchors("Einstein was born in 1879.") == "1879|"
+    assert anchors("It isn't visible, not at 1,000 km") == "1000|not not"
+    assert anchors("It is not visible at 1000 km") == "1000|not"
+
+
+def test_numbers_and_negations_must_match():
+    index = NearDuplicateIndex(threshold=0.7)
+    index.add("Einstein was born in 1879.", "True.")
+    index.add("The Great Wall of China is visible from space.", "False.")
+
+    assert index.lookup("einstein was born in 1879") == "True."
+    assert index.lookup("Einstein was born in 1897.") is None
+    assert index.lookup("The Great Wall of China is not visible from space.") is None
+    assert index.lookup("The Great Wall of China isn't visible from space.") is None
+
+
+def test_save_and_load(tmp_path):
+    index = NearDuplicateIndex(threshold=0.8)
+    for i in range(40):
+        index.add(f"Statement number {i} about the moon landing", f"Answer {i} ✓")
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    loaded = NearDuplicateIndex.load(path, threshold=0.8)
+    assert len(loaded) == 40
+    assert loaded.lookup("statement number 71 about the moon landing") is None
+    assert loaded.lookup("statement number 17 about the moon landing") == "Answer 17 ✓"
+    assert np.array_equal(
+        loaded.signature("x y z"), index.signature("x y z")
+    )  # Same hash functions after loading
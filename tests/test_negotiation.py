@@ -9,7 +9,7 @@ from core.negotiation import (
     provide_negotiation_tactics,
     continue_negotiation,
     generate_bot_response,
-    NegotiationScenario,
+    NegotiationTurn,
 )
 
 
@@ -81,6 +81,40 @@ class TestNegotiation:
 
             assert len(responses) > 0
 
+    async def test_offer_stages_use_the_loaded_history(self, mock_request):
+        history = [NegotiationTurn(user_offer="900", bot_response="950")]
+        prompts = []
+
+        def create_prompt(name, **kwargs):
+            prompts.append(kwargs)
+            return "prompt"
+
+        async def stream(*args, **kwargs):
+            yield AsyncMock(text="reply")
+
+        with patch(
+            'core.negotiation.get_db', side_effect=AssertionError("no database")
+        ), patch('core.negotiation.create_prompt', create_prompt), patch(
+            'core.negotiation.stream_request', stream
+        ):
+            analysis = [
+                r.text
+                async for r in analyze_offer(
+                    mock_request, "Analyze", "Rent", "920", history=history
+                )
+            ]
+            continued = [
+                r.text
+                async for r in continue_negotiation(
+                    mock_request, "Rent", "920", history=history
+                )
+            ]
+
+        assert analysis == ["reply", "reply"]
+        assert continued == ["reply"]
+        assert [p["user_offers"] for p in prompts] == [["900"], ["900"]]
+        assert [p["bot_responses"] for p in prompts] == [["950"], ["950"]]
+
 
 class TestGenerateBotResponse(TestCase):
     @patch('core.negotiation.fp.stream_request')
@@ -100,14 +134,15 @@ class TestGenerateBotResponse(TestCase):
         request = AsyncMock()
         scenario = "Test Scenario"
         user_offer = "Test Offer"
-        state = {"user_offers": ["Test Offer 1"], "bot_responses": ["Test Response 1"]}
-        negotiation_scenario = NegotiationScenario(scenario, state)
+        history = [
+            NegotiationTurn(user_offer="Test Offer 1", bot_response="Test Response 1")
+        ]
 
         response = await generate_bot_response(
             request=request,
-            negotiation_scenario=negotiation_scenario,
+            history=history,
             user_offer=user_offer,
-            scenario="Test Scenario",
+            scenario=scenario,
         )
 
         self.assertIn("This is a bot response", response)
@@ -124,14 +159,15 @@ class TestGenerateBotResponse(TestCase):
         request = AsyncMock()
         scenario = "Test Scenario"
         user_offer = "Test Offer"
-        state = {"user_offers": ["Test Offer 1"], "bot_responses": ["Test Response 1"]}
-        negotiation_scenario = NegotiationScenario(scenario, state)
+        history = [
+            NegotiationTurn(user_offer="Test Offer 1", bot_response="Test Response 1")
+        ]
 
         response = await generate_bot_response(
             request=request,
-            negotiation_scenario=negotiation_scenario,
+            history=history,
             user_offer=user_offer,
-            scenario="Test Scenario",
+            scenario=scenario,
         )
 
         self.assertEqual(
@@ -150,14 +186,15 @@ class TestGenerateBotResponse(TestCase):
         request = AsyncMock()
         scenario = "Test Scenario"
         user_offer = "Test Offer"
-        state = {"user_offers": ["Test Offer 1"], "bot_responses": ["Test Response 1"]}
-        negotiation_scenario = NegotiationScenario(scenario, state)
+        history = [
+            NegotiationTurn(user_offer="Test Offer 1", bot_response="Test Response 1")
+        ]
 
         response = await generate_bot_response(
             request=request,
-            negotiation_scenario=negotiation_scenario,
+            history=history,
             user_offer=user_offer,
-            scenario="Test Scenario",
+            scenario=scenario,
         )
 
         self.assertEqual(response, "No response generated.")
@@ -0,0 +1,62 @@
+# File: tests/test_nltk_data.py
+
+import pickle
+
+import pytest
+from utils import nltk_data
+
+FAKE_DATA = {
+    "version": nltk_data.NLTK_DATA_VERSION,
+    "vader_lexicon": {"love": 3.2, "terrible": -2.1},
+    "tagger": {
+        "weights": {},
+        "tagdict": {"dogs": "NNS", "bark": "VBP"},
+        "classes": ["NNS", "VBP"],
+    },
+}
+
+
+@pytest.fixture
+def data_path(tmp_path, monkeypatch):
+    path = tmp_path / "nltk_data.pickle"
+    monkeypatch.setattr(nltk_data, "NLTK_DATA_PATH", str(path))
+    monkeypatch.setattr(nltk_data, "_data", None)
+    monkeypatch.setattr(nltk_data, "_analyzer", None)
+    monkeypatch.setattr(nltk_data, "_tagger", None)
+    monkeypatch.setattr(
+        nltk_data, "read_vader_lexicon", lambda: FAKE_DATA["vader_lexicon"]
+    )
+    monkeypatch.setattr(nltk_data, "read_tagger_model", lambda: FAKE_DATA["tagger"])
+    return path
+
+
+def test_build_and_load(data_path):
+    nltk_data.build_nltk_data(str(data_path))
+    with open(data_path, "rb") as f:
+        assert pickle.load(f) == FAKE_DATA
+
+    analyzer = nltk_data.get_sentiment_analyzer()
+    assert analyzer.polarity_scores("I love it")["compound"] > 0
+    assert analyzer.polarity_scores("It is terrible")["compound"] < 0
+    assert nltk_data.get_pos_tagger().tag(["dogs", "bark"]) == [
+        ("dogs", "NNS"),
+        ("bark", "VBP"),
+    ]
+
+
+def test_falls_back_to_nltk_resources_per_model(data_path, monkeypatch):
+    def missing():
+        raise LookupError("tagger not installed")
+
+    monkeypatch.setattr(nltk_data, "read_tagger_model", missing)
+    assert nltk_data.load_nltk_model("vader_lexicon") == FAKE_DATA["vader_lexicon"]
+    with pytest.raises(LookupError):
+        nltk_data.load_nltk_model("tagger")
+    assert not data_path.exists()
+
+
+def test_rejects_other_versions(data_path):
+    with open(data_path, "wb") as f:
+        pickle.dump({**FAKE_DATA, "version": 0}, f)
+    with pytest.raises(ValueError):
+        nltk_data.load_nltk_model("vader_lexicon")
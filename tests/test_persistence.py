@@ -0,0 +1,101 @@
+# File: tests/test_persistence.py
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from utils.database import (
+    append_negotiation_turns,
+    build_engine,
+    create_negotiation_scenario,
+    get_recent_negotiation_turns,
+    init_db,
+)
+from utils.persistence import PersistenceWorker, TurnRecord
+
+
+@pytest.mark.asyncio
+class TestPersistenceWorker:
+    @pytest.fixture
+    def engine(self, tmp_path):
+        return build_engine(f"sqlite:///{tmp_path / 'bot.db'}")
+
+    async def _session_factory(self, engine):
+        await init_db(engine)
+        return async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def test_flushes_in_batches(self, engine):
+        session_factory = await self._session_factory(engine)
+        async with session_factory() as db:
+            scenario = await create_negotiation_scenario(db, "Rent")
+
+        worker = PersistenceWorker(
+            batch_size=2, flush_interval=0.05, session_factory=session_factory
+        )
+        for i in range(5):
+            worker.enqueue(TurnRecord(scenario.id, f"offer {i}", f"response {i}"))
+        assert worker.queue_depth > 0
+
+        await asyncio.sleep(0.2)
+        await worker.stop()
+
+        metrics = worker.metrics()
+        assert metrics["queue_depth"] == 0
+        assert metrics["enqueued"] == 5
+        assert metrics["written"] == 5
+        assert metrics["batches"] == 3
+
+        async with session_factory() as db:
+            turns = await get_recent_negotiation_turns(db, scenario.id)
+        assert [turn.turn_no for turn in turns] == [1, 2, 3, 4, 5]
+        assert turns[-1].user_offer == "offer 4"
+        await engine.dispose()
+
+    async def test_stop_flushes_pending_records(self, engine):
+        session_factory = await self._session_factory(engine)
+        async with session_factory() as db:
+            scenario = await create_negotiation_scenario(db, "Car purchase")
+
+        worker = PersistenceWorker(
+            batch_size=100, flush_interval=60, session_factory=session_factory
+        )
+        worker.enqueue(TurnRecord(scenario.id, "15000", "17000"))
+        worker.enqueue(TurnRecord(scenario.id, "16000", "16500"))
+        await asyncio.sleep(0)
+        await worker.stop()
+
+        assert worker.metrics()["written"] == 2
+        async with session_factory() as db:
+            turns = await get_recent_negotiation_turns(db, scenario.id)
+        assert [turn.bot_response for turn in turns] == ["17000", "16500"]
+        await engine.dispose()
+
+    async def test_failed_scenario_does_not_drop_other_scenarios(self, engine):
+        session_factory = await self._session_factory(engine)
+        async with session_factory() as db:
+            rent = await create_negotiation_scenario(db, "Rent")
+            car = await create_negotiation_scenario(db, "Car purchase")
+
+        async def fail_for_car(db, turns):
+            if any(turn.scenario_id == car.id for turn in turns):
+                raise RuntimeError("constraint violated")
+            return await append_negotiation_turns(db, turns)
+
+        worker = PersistenceWorker(
+            batch_size=100, flush_interval=60, session_factory=session_factory
+        )
+        worker.enqueue(TurnRecord(rent.id, "900", "950"))
+        worker.enqueue(TurnRecord(car.id, "15000", "17000"))
+        worker.enqueue(TurnRecord(rent.id, "920", "940"))
+        with patch("utils.persistence.append_negotiation_turns", fail_for_car):
+            await asyncio.sleep(0)
+            await worker.stop()
+
+        metrics = worker.metrics()
+        assert metrics["written"] == 2
+        assert metrics["dropped"] == 1
+        async with session_factory() as db:
+            turns = await get_recent_negotiation_turns(db, rent.id)
+        assert [turn.user_offer for turn in turns] == ["900", "920"]
+        await engine.dispose()
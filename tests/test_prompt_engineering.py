@@ -1,6 +1,14 @@
+import logging
 import unittest
+from unittest.mock import patch
 
-from prompt_engineering import PROMPT_TEMPLATES, create_prompt
+from utils import prompt_engineering
+from utils.prompt_engineering import (
+    PROMPT_TEMPLATES,
+    PromptRegistry,
+    PromptTemplate,
+    create_prompt,
+)
 
 
 class TestCreatePrompt(unittest.TestCase):
@@ -44,14 +52,14 @@ class TestCreatePrompt(unittest.TestCase):
 
     def test_bias_detection_functionality(self):
         # Test bias detection functionality
-        result = create_prompt("bias_detection", topic="All politicians are corrupt.")
+        result = create_prompt("bias_detection", topic="All politicians are corrupt")
         expected = "Analyze the following argument for cognitive biases: All politicians are corrupt. Identify specific biases, explain how they manifest in the argument, and suggest ways to mitigate their influence."
         self.assertEqual(result, expected)
 
     def test_contract_analysis_functionality(self):
         # Test contract analysis functionality
         result = create_prompt("contract_analysis", topic="Non-compete clause")
-        expected = "Analyze the following contract clause, highlighting key terms, potential risks, and suggesting improvements for clarity and fairness: Non-compete clause."
+        expected = "Analyze the following contract clause, highlighting key terms, potential risks, and suggesting improvements for clarity and fairness: Non-compete clause"
         self.assertEqual(result, expected)
 
     def test_salary_negotiation_functionality(self):
@@ -81,5 +89,57 @@ class TestCreatePrompt(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+class TestPromptTemplate(unittest.TestCase):
+    def test_fields_parsed_once(self):
+        template = PromptTemplate("offer", "Offer {amount} to {user.name}, {offers[0]}")
+        self.assertEqual(template.fields, {"amount", "user", "offers"})
+
+    def test_invalid_templates_rejected(self):
+        with self.assertRaises(ValueError):
+            PromptTemplate("positional", "Debate {}")
+        with self.assertRaises(ValueError):
+            PromptTemplate("unbalanced", "Debate {topic")
+
+    def test_missing_fields_named(self):
+        template = PromptTemplate("offer", "{amount} for {role}")
+        with self.assertRaisesRegex(KeyError, "amount, role"):
+            template.render()
+
+    def test_registry(self):
+        registry = PromptRegistry(PROMPT_TEMPLATES)
+        self.assertIn("debate", registry)
+        self.assertEqual(registry.get("debate").fields, {"topic"})
+        with self.assertRaises(ValueError):
+            registry.get("invalid_functionality")
+
+
+class TestPromptLogging(unittest.TestCase):
+    def test_not_logged_at_info(self):
+        prompt_engineering.logger.setLevel(logging.INFO)
+        self.addCleanup(prompt_engineering.logger.setLevel, logging.NOTSET)
+        with patch.object(
+            prompt_engineering, "PROMPT_LOG_SAMPLE_RATE", 1.0
+        ), patch.object(prompt_engineering.logger, "debug") as debug:
+            create_prompt("debate", topic="Climate Change")
+        debug.assert_not_called()
+
+    def test_sampled_and_truncated(self):
+        prompt_engineering.logger.setLevel(logging.DEBUG)
+        self.addCleanup(prompt_engineering.logger.setLevel, logging.NOTSET)
+        with patch.object(
+            prompt_engineering, "PROMPT_LOG_SAMPLE_RATE", 1.0
+        ), patch.object(prompt_engineering, "PROMPT_LOG_MAX_CHARS", 20):
+            with self.assertLogs(
+                prompt_engineering.logger, level=logging.DEBUG
+            ) as logs:
+                create_prompt("debate", topic="x" * 1000)
+        self.assertEqual(len(logs.records), 1)
+        self.assertTrue(logs.output[0].endswith("Generate two opposin"))
+
+        with patch.object(prompt_engineering, "PROMPT_LOG_SAMPLE_RATE", 0.0):
+            with self.assertNoLogs(prompt_engineering.logger, level=logging.DEBUG):
+                create_prompt("debate", topic="Climate Change")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,79 @@
+# File: tests/test_registry.py
+
+import sys
+import types
+
+import pytest
+from core.registry import HandlerRegistry, HandlerSpec
+
+
+@pytest.fixture
+def handler_module():
+    """A handler module that is only "imported" when the registry asks for it."""
+    module = types.ModuleType("fake_handlers")
+    module.calls = []
+
+    async def handle(request, user_input):
+        yield user_input
+
+    async def save():
+        module.calls.append("save")
+
+    module.handle = handle
+    module.save = save
+    return module
+
+
+def make_registry():
+    return HandlerRegistry(
+        {"fake": HandlerSpec("fake_handlers:handle", shutdown="save")}
+    )
+
+
+def test_handler_module_imported_on_first_use(handler_module, monkeypatch):
+    monkeypatch.delitem(sys.modules, "fake_handlers", raising=False)
+    registry = make_registry()
+    assert registry.metrics() == {"fake": {"loaded": False, "load_ms": 0}}
+    with pytest.raises(ModuleNotFoundError):
+        registry.resolve("fake")
+
+    monkeypatch.setitem(sys.modules, "fake_handlers", handler_module)
+    assert registry.resolve("fake") is handler_module.handle
+    assert registry.metrics()["fake"]["loaded"]
+    with pytest.raises(KeyError):
+        registry.resolve("missing")
+
+
+def test_package_exports_are_lazy():
+    import core
+    import utils
+
+    assert "handle_debate" in dir(core)
+    from core.debate import handle_debate
+    from utils.helpers import format_salary_data
+
+    assert core.handle_debate is handle_debate
+    assert utils.format_salary_data is format_salary_data
+    with pytest.raises(AttributeError):
+        utils.missing
+
+
+@pytest.mark.asyncio
+class TestHandlerRegistry:
+    async def test_get_and_prewarm(self, handler_module, monkeypatch):
+        monkeypatch.setitem(sys.modules, "fake_handlers", handler_module)
+        registry = make_registry()
+        await registry.prewarm()
+        assert registry.metrics()["fake"]["loaded"]
+        assert await registry.get("fake") is handler_module.handle
+
+    async def test_shutdown_only_runs_hooks_of_loaded_modules(
+        self, handler_module, monkeypatch
+    ):
+        monkeypatch.delitem(sys.modules, "fake_handlers", raising=False)
+        await make_registry().shutdown()
+        assert handler_module.calls == []
+
+        monkeypatch.setitem(sys.modules, "fake_handlers", handler_module)
+        await make_registry().shutdown()
+        assert handler_module.calls == ["save"]
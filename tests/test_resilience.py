@@ -0,0 +1,135 @@
+# File: tests/test_resilience.py
+
+import asyncio
+from unittest.mock import patch
+
+import fastapi_poe as fp
+import pytest
+from utils import upstream
+from utils.resilience import (
+    AIMDLimiter,
+    CircuitBreaker,
+    UpstreamGuards,
+    UpstreamUnavailableError,
+)
+from utils.upstream import stream_request
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock):
+    return CircuitBreaker(
+        "GPT-4",
+        window=10,
+        min_calls=4,
+        failure_rate=0.5,
+        slow_seconds=5,
+        open_seconds=30,
+        clock=clock,
+    )
+
+
+def test_breaker_opens_on_failures_and_probes_half_open():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for ok in (True, False, True, False):
+        breaker.before_call()
+        breaker.record(ok)
+    assert breaker.state == "open"
+    with pytest.raises(UpstreamUnavailableError):
+        breaker.before_call()
+
+    clock.now += 30
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(UpstreamUnavailableError):
+        breaker.before_call()  # Only one probe at a time
+    breaker.record(False)
+    assert breaker.state == "open"
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record(True, first_token_seconds=0.5)
+    assert breaker.state == "closed"
+    assert breaker.metrics()["opened"] == 2
+
+
+def test_breaker_opens_on_slow_starts():
+    breaker = make_breaker(FakeClock())
+    for seconds in (1, 6, 7, 1):
+        breaker.record(True, first_token_seconds=seconds)
+    assert breaker.state == "open"
+
+
+def test_limiter_additive_increase_multiplicative_decrease():
+    clock = FakeClock()
+    limiter = AIMDLimiter("GPT-4", initial=4, latency_target=2, clock=clock)
+    for _ in range(4):
+        limiter.in_flight += 1
+        limiter.release(True, first_token_seconds=0.5)
+    assert limiter.metrics()["limit"] == 4 and limiter.limit > 4.9
+
+    limiter.in_flight += 2
+    limiter.release(True, first_token_seconds=3)
+    limiter.release(False)  # Same burst: not halved twice
+    assert int(limiter.limit) == 2
+    clock.now += 2
+    limiter.in_flight += 1
+    limiter.release(False)
+    assert int(limiter.limit) == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_and_times_out():
+    limiter = AIMDLimiter("GPT-4", initial=1, queue_timeout=0.05)
+    await limiter.acquire()
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.metrics()["waiting"] == 1
+    limiter.release()  # Hands the slot over, limit unchanged
+    await waiting
+    assert limiter.in_flight == 1
+
+    with pytest.raises(UpstreamUnavailableError):
+        await limiter.acquire()
+    assert limiter.metrics()["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_calls_fast():
+    calls = []
+
+    async def failing(request, bot_name, *args, **kwargs):
+        calls.append(bot_name)
+        raise RuntimeError("upstream down")
+        yield
+
+    request = fp.QueryRequest(
+        version="1.0",
+        type="query",
+        query=[fp.ProtocolMessage(role="user", content="Debate: remote work")],
+        user_id="u",
+        conversation_id="c",
+        message_id="m",
+        access_key="k",
+    )
+    guards = UpstreamGuards()
+    with patch.object(upstream, "upstream_guards", guards), patch(
+        "utils.upstream.fp.stream_request", failing
+    ):
+        for _ in range(11):
+            with pytest.raises(RuntimeError):
+                async for _ in stream_request(request, "GPT-4"):
+                    pass
+
+    assert len(calls) == 10
+    metrics = guards.metrics()["GPT-4"]
+    assert metrics["breaker"]["state"] == "open"
+    assert metrics["breaker"]["rejected"] == 1
+    assert metrics["concurrency"]["in_flight"] == 0
@@ -0,0 +1,128 @@
+# File: tests/test_salary_cache.py
+
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from utils.database import build_engine, init_db
+from utils.salary_cache import SalaryCache, salary_cache_key
+
+
+def test_salary_cache_key():
+    assert salary_cache_key(" Software  Engineer", "Austin ") == (
+        "software engineer|austin"
+    )
+    assert salary_cache_key("Nurse", "New York") != salary_cache_key(
+        "Nurse", "New Jersey"
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+class TestSalaryCache:
+    @pytest.fixture
+    def engine(self, tmp_path):
+        return build_engine(f"sqlite:///{tmp_path / 'salary.db'}")
+
+    async def _session_factory(self, engine):
+        await init_db(engine)
+        return async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    @staticmethod
+    def _fetcher(calls):
+        async def fetch(job_title, location):
+            calls.append((job_title, location))
+            return {"average_salary": 100000 + len(calls), "currency": "USD"}
+
+        return fetch
+
+    async def test_miss_then_fresh_hit(self, engine):
+        session_factory = await self._session_factory(engine)
+        cache = SalaryCache(ttl=60, session_factory=session_factory, clock=FakeClock())
+        calls = []
+        fetch = self._fetcher(calls)
+
+        first = await cache.get("Nurse", "Denver", fetch)
+        second = await cache.get("nurse", " denver", fetch)
+
+        assert first == second == {"average_salary": 100001, "currency": "USD"}
+        assert calls == [("Nurse", "Denver")]
+        assert cache.metrics()["hits"] == 1
+        await engine.dispose()
+
+    async def test_shared_between_instances(self, engine):
+        session_factory = await self._session_factory(engine)
+        calls = []
+        fetch = self._fetcher(calls)
+        await SalaryCache(session_factory=session_factory).get("Nurse", "Denver", fetch)
+
+        # A second worker (or a restarted container) reuses the stored entry
+        other = SalaryCache(session_factory=session_factory)
+        assert await other.get("Nurse", "Denver", fetch) == {
+            "average_salary": 100001,
+            "currency": "USD",
+        }
+        assert len(calls) == 1
+        await engine.dispose()
+
+    async def test_stale_entry_served_while_refreshing(self, engine):
+        session_factory = await self._session_factory(engine)
+        clock = FakeClock()
+        cache = SalaryCache(ttl=60, session_factory=session_factory, clock=clock)
+        calls = []
+        fetch = self._fetcher(calls)
+        await cache.get("Nurse", "Denver", fetch)
+
+        clock.now += 61
+        stale = await asyncio.gather(
+            *(cache.get("Nurse", "Denver", fetch) for _ in range(3))
+        )
+        assert stale == [{"average_salary": 100001, "currency": "USD"}] * 3
+        await cache.stop()
+
+        # One background refresh replaced the entry
+        assert len(calls) == 2
+        assert await cache.get("Nurse", "Denver", fetch) == {
+            "average_salary": 100002,
+            "currency": "USD",
+        }
+        assert cache.metrics()["refreshes"] == 1
+        await engine.dispose()
+
+    async def test_failed_refresh_keeps_stale_entry(self, engine):
+        session_factory = await self._session_factory(engine)
+        clock = FakeClock()
+        cache = SalaryCache(ttl=60, session_factory=session_factory, clock=clock)
+        await cache.get("Nurse", "Denver", self._fetcher([]))
+
+        async def failing_fetch(job_title, location):
+            raise RuntimeError("Adzuna API request failed: 503")
+
+        clock.now += 61
+        await cache.get("Nurse", "Denver", failing_fetch)
+        await cache.stop()
+        assert await cache.get("Nurse", "Denver", failing_fetch) == {
+            "average_salary": 100001,
+            "currency": "USD",
+        }
+        await engine.dispose()
+
+    async def test_miss_errors_are_not_stored(self, engine):
+        session_factory = await self._session_factory(engine)
+        cache = SalaryCache(session_factory=session_factory)
+
+        async def no_data(job_title, location):
+            raise ValueError("No salary data found for this job and location.")
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await cache.get("Astronaut", "Nowhere", no_data)
+        assert cache.metrics()["misses"] == 2
+        await engine.dispose()
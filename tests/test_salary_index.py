@@ -0,0 +1,86 @@
+# File: tests/test_salary_index.py
+
+import csv
+import json
+
+import pytest
+from utils.salary_index import SalaryIndex, build_salary_index, read_salary_rows
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "salaries.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["job_title", "location", "salary"])
+        writer.writeheader()
+        for salary in (90000, 120000, 100000):
+            writer.writerow(
+                {"job_title": "Nurse", "location": "Denver", "salary": salary}
+            )
+        writer.writerow(
+            {"job_title": "Software Engineer", "location": "Austin", "salary": 130000}
+        )
+    return str(path)
+
+
+def test_build_and_lookup(dataset, tmp_path):
+    index_path = str(tmp_path / "salary_index.bin")
+    assert build_salary_index(read_salary_rows(dataset), index_path) == 2
+
+    index = SalaryIndex(index_path)
+    try:
+        assert len(index) == 2
+        assert index.lookup("  nurse ", "DENVER") == {
+            "average_salary": 100000,
+            "currency": "USD",
+            "salary_min": 90000,
+            "salary_median": 100000,
+            "salary_max": 120000,
+        }
+        assert index.lookup("Software Engineer", "Austin")["average_salary"] == 130000
+        assert index.lookup("Nurse", "Boston") is None
+        assert index.lookup("Astronaut", "Nowhere") is None
+    finally:
+        index.close()
+
+
+def test_build_from_jsonl_ranges(tmp_path):
+    dataset = tmp_path / "salaries.jsonl"
+    rows = [
+        {
+            "job_title": f"Job {i}",
+            "location": "Berlin",
+            "currency": "eur",
+            "salary_min": 40000 + i,
+            "salary_median": 50000 + i,
+            "salary_max": 60000 + i,
+        }
+        for i in range(500)
+    ]
+    dataset.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+    index_path = str(tmp_path / "salary_index.bin")
+    build_salary_index(read_salary_rows(str(dataset)), index_path)
+
+    index = SalaryIndex(index_path)
+    try:
+        for i in (0, 137, 499):
+            result = index.lookup(f"Job {i}", "Berlin")
+            assert result["currency"] == "EUR"
+            assert result["salary_median"] == 50000 + i
+        assert index.lookup("Job 500", "Berlin") is None
+    finally:
+        index.close()
+
+
+def test_build_rejects_rows_without_salary(tmp_path):
+    with pytest.raises(ValueError):
+        build_salary_index(
+            [{"job_title": "Nurse", "location": "Denver"}], str(tmp_path / "x.bin")
+        )
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / "not_an_index.bin"
+    path.write_bytes(b"0" * 64)
+    with pytest.raises(ValueError):
+        SalaryIndex(str(path))
@@ -0,0 +1,76 @@
+# File: tests/test_sentiment_batch.py
+
+import random
+
+import pytest
+from nltk.sentiment.vader import SentiText, SentimentIntensityAnalyzer, VaderConstants
+from utils.helpers import sentiment_label
+from utils.sentiment_batch import BatchSentimentScorer
+
+LEXICON = {
+    "good": 1.9,
+    "great": 3.1,
+    "bad": -2.5,
+    "fair": 1.3,
+    "unfair": -2.1,
+    "love": 3.2,
+    "hate": -2.7,
+    "ok": 0.9,
+    ":)": 2.0,
+}
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    analyzer.lexicon = LEXICON
+    analyzer.constants = VaderConstants()
+    return analyzer
+
+
+def expected_labels(analyzer, texts):
+    return [sentiment_label(analyzer.polarity_scores(t)["compound"]) for t in texts]
+
+
+def test_same_labels_as_vader(analyzer):
+    texts = [
+        "",
+        "The offer is good.",
+        "The offer is good!!",
+        "Is the offer fair??",
+        "The offer is not good",
+        "The offer is very good but the terms are bad",
+        "The offer is GOOD and fair",
+        "At least it is ok",
+        "It is kind of unfair",
+        "I love this :)",
+        "(good) 'bad' ..fair good,",
+        "I don't hate it",
+        "good good bad",
+    ]
+    scorer = BatchSentimentScorer(analyzer)
+    assert scorer.labels(texts) == expected_labels(analyzer, texts)
+
+
+def test_same_labels_on_random_texts(analyzer):
+    rng = random.Random(0)
+    words = list(LEXICON) + "the a offer is not very but this kind of NO".split()
+    texts = [
+        " ".join(
+            rng.choice(words) + rng.choice(["", "", ",", "!", "?", "."])
+            for _ in range(rng.randint(0, 12))
+        )
+        for _ in range(500)
+    ]
+    scorer = BatchSentimentScorer(analyzer)
+    assert scorer.labels(texts) == expected_labels(analyzer, texts)
+
+
+def test_tokens_match_vader(analyzer):
+    constants = analyzer.constants
+    scorer = BatchSentimentScorer(analyzer)
+    for text in ["Hello, world!", "(good) 'bad' ..fair :) don't!", "a b-c -d e-"]:
+        sentitext = SentiText(
+            text, constants.PUNC_LIST, constants.REGEX_REMOVE_PUNCTUATION
+        )
+        assert scorer.tokens(text) == sentitext.words_and_emoticons
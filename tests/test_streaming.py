@@ -0,0 +1,100 @@
+# File: tests/test_streaming.py
+
+import asyncio
+
+import fastapi_poe as fp
+import pytest
+from utils.streaming import coalesce_chunks
+
+
+async def stream(*items, delay=0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        if isinstance(item, Exception):
+            raise item
+        yield item if not isinstance(item, str) else fp.PartialResponse(text=item)
+
+
+async def collect(messages, **kwargs):
+    return [msg async for msg in coalesce_chunks(messages, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_first_chunk_sent_alone_then_coalesced():
+    frames = await collect(
+        stream("He", "llo", " wor", "ld"), max_bytes=1000, interval=10
+    )
+    assert [frame.text for frame in frames] == ["He", "llo world"]
+
+
+@pytest.mark.asyncio
+async def test_flushes_at_byte_threshold():
+    frames = await collect(stream(*"abcdefg"), max_bytes=3, interval=10)
+    assert [frame.text for frame in frames] == ["a", "bcd", "efg"]
+
+
+@pytest.mark.asyncio
+async def test_flushes_after_interval_while_stream_waits():
+    async def slow():
+        yield fp.PartialResponse(text="a")
+        yield fp.PartialResponse(text="b")
+        await asyncio.sleep(0.2)
+        yield fp.PartialResponse(text="c")
+
+    arrivals = []
+    async for frame in coalesce_chunks(slow(), max_bytes=1000, interval=0.02):
+        arrivals.append((frame.text, asyncio.get_running_loop().time()))
+    assert [text for text, _ in arrivals] == ["a", "b", "c"]
+    # "b" was sent after the interval, not held until "c" arrived
+    assert arrivals[2][1] - arrivals[1][1] > 0.1
+
+
+@pytest.mark.asyncio
+async def test_other_messages_flush_and_pass_through_in_order():
+    suggestion = fp.PartialResponse(text="Tell me more", is_suggested_reply=True)
+    error = fp.ErrorResponse(text="Upstream failed")
+    frames = await collect(
+        stream("a", "b", "c", suggestion, "d", error), max_bytes=1000, interval=10
+    )
+    assert frames[0].text == "a"
+    assert frames[1].text == "bc"
+    assert frames[2] is suggestion
+    assert frames[3].text == "d"
+    assert frames[4] is error
+
+
+@pytest.mark.asyncio
+async def test_errors_raised_after_pending_text():
+    frames = []
+    with pytest.raises(ValueError):
+        async for frame in coalesce_chunks(
+            stream("a", "b", ValueError("boom")), max_bytes=1000, interval=10
+        ):
+            frames.append(frame.text)
+    assert frames == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_disabled_passes_chunks_through():
+    frames = await collect(stream("a", "b", "c"), max_bytes=0)
+    assert [frame.text for frame in frames] == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_closing_early_stops_the_stream():
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            while True:
+                yield fp.PartialResponse(text="x")
+                await asyncio.sleep(0.001)
+        finally:
+            closed.set()
+
+    frames = coalesce_chunks(endless(), max_bytes=1000, interval=0.01)
+    assert (await frames.__anext__()).text == "x"
+    await frames.__anext__()
+    await frames.aclose()
+    assert closed.is_set()
@@ -0,0 +1,42 @@
+# File: tests/test_text_matching.py
+
+from utils.text_matching import Match, PatternMatcher
+
+
+def test_find_all_case_insensitive_with_offsets():
+    matcher = PatternMatcher(["Halo Effect", "Anchoring Bias"])
+    text = "This shows ANCHORING bias and the halo effect."
+    assert matcher.find_all(text) == [
+        Match("Anchoring Bias", 11, 25),
+        Match("Halo Effect", 34, 45),
+    ]
+    assert text[11:25].lower() == "anchoring bias"
+
+
+def test_overlapping_patterns():
+    matcher = PatternMatcher(["he", "she", "hers", "his"])
+    assert [m.pattern for m in matcher.find_all("ushers")] == ["she", "he", "hers"]
+
+
+def test_scanner_matches_across_chunks():
+    matcher = PatternMatcher(["Sunk Cost Fallacy", "Loss Aversion"])
+    scanner = matcher.scanner()
+
+    assert scanner.feed("The sunk co") == []
+    assert scanner.feed("st fal") == []
+    assert scanner.feed("lacy drives this.") == [Match("Sunk Cost Fallacy", 4, 21)]
+    assert scanner.patterns == ["Sunk Cost Fallacy"]
+
+
+def test_scanner_reports_each_pattern_once():
+    matcher = PatternMatcher(["Recency Bias"])
+    scanner = matcher.scanner()
+    scanner.feed("Recency bias, recency bias, ")
+    scanner.feed("and more recency bias.")
+    assert scanner.matches == [Match("Recency Bias", 0, 12)]
+
+
+def test_case_sensitive():
+    matcher = PatternMatcher(["Reactance"], case_insensitive=False)
+    assert matcher.find_all("reactance") == []
+    assert matcher.find_all("Reactance") == [Match("Reactance", 0, 9)]
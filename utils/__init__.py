@@ -1,26 +1,34 @@
 """Utility modules for the Argument and Negotiation Master Bot."""
 
-from .error_handling import handle_error
-from .prompt_engineering import create_prompt, PROMPT_TEMPLATES
-from .database import get_db, User, NegotiationScenario
-from .helpers import (
-    analyze_sentiment,
-    generate_dynamic_follow_up_questions,
-    extract_job_details,
-    format_salary_data,
-)
-from .external_api import fetch_salary_data
+import importlib
 
-__all__ = [
-    "handle_error",
-    "create_prompt",
-    "PROMPT_TEMPLATES",
-    "get_db",
-    "User",
-    "NegotiationScenario",
-    "analyze_sentiment",
-    "generate_dynamic_follow_up_questions",
-    "extract_job_details",
-    "format_salary_data",
-    "fetch_salary_data",
-]
+# Imported on first access, so that importing one utility module (which
+# imports this package) does not also load NLTK, the database models and the
+# HTTP client.
+_LAZY_EXPORTS = {
+    "handle_error": "utils.error_handling",
+    "create_prompt": "utils.prompt_engineering",
+    "PROMPT_TEMPLATES": "utils.prompt_engineering",
+    "get_db": "utils.database",
+    "User": "utils.database",
+    "NegotiationScenario": "utils.database",
+    "analyze_sentiment": "utils.helpers",
+    "generate_dynamic_follow_up_questions": "utils.helpers",
+    "extract_job_details": "utils.helpers",
+    "format_salary_data": "utils.helpers",
+    "fetch_salary_data": "utils.external_api",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -0,0 +1,253 @@
+"""Caching helpers: a coroutine-aware TTL cache decorator and a size-bounded
+LRU/TTL cache."""
+
+import asyncio
+import functools
+import hashlib
+import re
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Type
+
+from cachetools import TTLCache
+from cachetools.keys import hashkey
+
+from utils.metrics import register_metrics
+
+
+def async_cached(
+    maxsize: int = 128,
+    ttl: float = 300,
+    negative_ttl: float = 60,
+    negative_exceptions: Tuple[Type[BaseException], ...] = (ValueError,),
+    key: Callable[..., Hashable] = hashkey,
+    name: Optional[str] = None,
+) -> Callable:
+    """
+    Caches the results of an async function, unlike ``cachetools.cached`` which
+    would cache the (single-use) coroutine object.
+
+    Concurrent calls with the same key share a single in-flight call. Failures
+    raising one of ``negative_exceptions`` are cached for ``negative_ttl``
+    seconds and re-raised to later callers; other exceptions are not cached.
+
+    The wrapped function gains ``cache_info()`` (hit, miss and coalesce
+    counters) and ``cache_clear()``.
+
+    Parameters:
+        maxsize (int): Maximum number of cached results (and of cached failures).
+        ttl (float): Seconds a result stays cached.
+        negative_ttl (float): Seconds a failure stays cached.
+        negative_exceptions (Tuple[Type[BaseException], ...]): Exception types
+            to cache as negative results.
+        key (Callable[..., Hashable]): Builds the cache key from the call's
+            arguments.
+        name (Optional[str]): If given, the counters are reported under this
+            name at ``/metrics``.
+
+    Returns:
+        Callable: The decorator.
+
+    Example:
+        @async_cached(ttl=300, name="salary_data")
+        async def fetch_salary_data(job_title: str, location: str) -> dict: ...
+    """
+
+    def decorator(func: Callable) -> Callable:
+        results: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        failures: TTLCache = TTLCache(maxsize=maxsize, ttl=negative_ttl)
+        in_flight: Dict[Hashable, asyncio.Future] = {}
+        stats = {"hits": 0, "negative_hits": 0, "misses": 0, "coalesced": 0}
+
+        async def fill(cache_key: Hashable, args: tuple, kwargs: dict) -> Any:
+            try:
+                result = await func(*args, **kwargs)
+            except negative_exceptions as e:
+                failures[cache_key] = (type(e), e.args)
+                raise
+            finally:
+                in_flight.pop(cache_key, None)
+            results[cache_key] = result
+            return result
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            cache_key = key(*args, **kwargs)
+            try:
+                result = results[cache_key]
+                stats["hits"] += 1
+                return result
+            except KeyError:
+                pass
+            failure = failures.get(cache_key)
+            if failure is not None:
+                stats["negative_hits"] += 1
+                exc_type, exc_args = failure
+                raise exc_type(*exc_args)
+
+            future = in_flight.get(cache_key)
+            if future is None:
+                stats["misses"] += 1
+                future = asyncio.ensure_future(fill(cache_key, args, kwargs))
+                # Mark the exception as retrieved even if every caller has
+                # gone away by the time the call fails.
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                in_flight[cache_key] = future
+            else:
+                stats["coalesced"] += 1
+            # Shielded so that one caller being cancelled does not cancel the
+            # call the other callers are waiting on.
+            return await asyncio.shield(future)
+
+        def cache_info() -> Dict[str, int]:
+            return {
+                **stats,
+                "size": len(results),
+                "negative_size": len(failures),
+                "in_flight": len(in_flight),
+            }
+
+        def cache_clear() -> None:
+            results.clear()
+            failures.clear()
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        if name is not None:
+            register_metrics(name, cache_info)
+        return wrapper
+
+    return decorator
+
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_text_key(text: str) -> str:
+    """
+    Builds a compact cache key that ignores case, punctuation and whitespace.
+
+    Parameters:
+        text (str): The text to key on, e.g. a user's argument.
+
+    Returns:
+        str: A hex digest, the same for "Taxes are BAD!" and "taxes are bad".
+    """
+    folded = " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())
+    return hashlib.blake2b(folded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def estimate_size(value: Any) -> int:
+    """Estimates the memory held by a value, following lists, tuples and dicts."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return size
+
+
+class BoundedCache:
+    """
+    Dict-like LRU cache bounded by entry count, total size and entry age.
+
+    Keys are passed through ``key`` (by default :func:`normalize_text_key`), so
+    near-identical texts share an entry and long texts are not kept as keys.
+    When either bound is exceeded the least recently used entries are evicted;
+    entries older than ``ttl`` seconds are dropped when next looked up.
+
+    Example:
+        cache = BoundedCache(maxsize=1000, max_bytes=1_000_000, ttl=3600)
+        cache["Taxes are bad!"] = ["Framing Effect"]
+        "taxes are  bad" in cache  # True
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        max_bytes: int = 4 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        key: Callable[[Any], Hashable] = normalize_text_key,
+        sizeof: Callable[[Any], int] = estimate_size,
+        name: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._key = key
+        self._sizeof = sizeof
+        self._clock = clock
+        # Maps key -> (value, size, expiry time), least recently used first
+        self._data: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        if name is not None:
+            register_metrics(name, self.metrics)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, item: Any) -> bool:
+        return self._lookup(self._key(item)) is not None
+
+    def __getitem__(self, item: Any) -> Any:
+        entry = self._lookup(self._key(item))
+        if entry is None:
+            self._stats["misses"] += 1
+            raise KeyError(item)
+        self._stats["hits"] += 1
+        return entry[0]
+
+    def __setitem__(self, item: Any, value: Any) -> None:
+        key = self._key(item)
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return  # Would evict everything else and still not fit
+        self._remove(key)
+        expires = self._clock() + self.ttl if self.ttl is not None else float("inf")
+        self._data[key] = (value, size, expires)
+        self._bytes += size
+        while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._data.popitem(last=False)
+            self._bytes -= evicted_size
+            self._stats["evictions"] += 1
+
+    def __delitem__(self, item: Any) -> None:
+        if not self._remove(self._key(item)):
+            raise KeyError(item)
+
+    def get(self, item: Any, default: Any = None) -> Any:
+        """Returns the cached value for ``item``, or ``default``."""
+        try:
+            return self[item]
+        except KeyError:
+            return default
+
+    def clear(self) -> None:
+        """Removes every entry (the counters are kept)."""
+        self._data.clear()
+        self._bytes = 0
+
+    def metrics(self) -> Dict[str, int]:
+        """Returns the entry count, estimated size and hit/eviction counters."""
+        return {"size": len(self._data), "bytes": self._bytes, **self._stats}
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[Any, int, float]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= self._clock():
+            self._remove(key)
+            self._stats["expirations"] += 1
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Hashable) -> bool:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
@@ -0,0 +1,46 @@
+"""Helpers for running independent upstream calls concurrently."""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Coroutine, Iterable, TypeVar
+
+T = TypeVar("T")
+
+
+async def ordered_concurrently(
+    coros: Iterable[Coroutine[None, None, T]], limit: int
+) -> AsyncIterator[T]:
+    """
+    Runs coroutines concurrently and yields their results in the given order.
+
+    At most ``limit`` coroutines run at once. Each result is yielded as soon as
+    it and every earlier result are available, so output can stream while
+    later calls are still in flight. Closing the generator early (e.g. when
+    the client disconnects) cancels the calls that have not finished.
+
+    Parameters:
+        coros (Iterable[Coroutine[None, None, T]]): The calls to make.
+        limit (int): Maximum number of calls in flight.
+
+    Yields:
+        T: The results, in the order of ``coros``.
+
+    Raises:
+        Exception: Whatever a call raises, when its result is reached.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(coro: Awaitable[T]) -> T:
+        try:
+            async with semaphore:
+                return await coro
+        finally:
+            # Closes calls cancelled before they got a slot
+            coro.close()
+
+    tasks = [asyncio.ensure_future(run(coro)) for coro in coros]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,153 @@
+"""Keeps the conversation sent to upstream bots within a per-bot token budget.
+
+Handlers append their own prompts to ``request.query`` as a turn progresses,
+and every upstream call re-sends the whole list. Messages that came from Poe
+carry a ``message_id``; prompts the handlers add do not, which is how the
+internal prompts are told apart. Before each call, repeated internal prompts
+are collapsed to their latest copy and, while the conversation is over
+budget, older internal prompts are dropped. The user's messages and the
+current prompt are always sent.
+"""
+
+import logging
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+import fastapi_poe as fp
+
+from utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# Tokens of conversation sent to each bot, leaving room for its reply. Each
+# can be overridden with TOKEN_BUDGET_<BOT>, e.g. TOKEN_BUDGET_GPT_4.
+DEFAULT_TOKEN_BUDGETS = {
+    "GPT-3.5-Turbo": 3000,
+    "GPT-4": 6000,
+    "Claude-instant": 8000,
+}
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("TOKEN_BUDGET_DEFAULT", "4000"))
+
+# Approximate per-message overhead (role markers etc.) in chat formats
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_WORD_PIECE = re.compile(r"\w+|[^\w\s]")
+
+_stats: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"calls": 0, "trimmed_calls": 0, "tokens_saved": 0}
+)
+
+
+def token_budget(bot_name: str) -> int:
+    """Returns the token budget for a bot."""
+    env_name = "TOKEN_BUDGET_" + re.sub(r"\W", "_", bot_name).upper()
+    default = DEFAULT_TOKEN_BUDGETS.get(bot_name, DEFAULT_TOKEN_BUDGET)
+    return int(os.environ.get(env_name, default))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in a text without a tokenizer.
+
+    Counts words and punctuation marks, with long words counted as one
+    token per four characters, which tracks BPE tokenizers closely enough for
+    budgeting.
+    """
+    return sum(max(1, len(piece) // 4) for piece in _WORD_PIECE.findall(text))
+
+
+def message_tokens(message: fp.ProtocolMessage) -> int:
+    """Estimates the tokens a message adds to a conversation."""
+    return estimate_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def is_internal(message: fp.ProtocolMessage) -> bool:
+    """Whether a message is a prompt added by a handler rather than by Poe."""
+    return not message.message_id
+
+
+def fit_query(
+    query: Sequence[fp.ProtocolMessage], budget: int
+) -> List[fp.ProtocolMessage]:
+    """
+    Trims stale internal prompts from a conversation.
+
+    Parameters:
+        query (Sequence[fp.ProtocolMessage]): The conversation, ending with the
+            prompt for the upcoming call.
+        budget (int): The token budget.
+
+    Returns:
+        List[fp.ProtocolMessage]: The messages to send, in their original order.
+    """
+    messages = list(query)
+    if not messages:
+        return []
+    *history, prompt = messages
+
+    # Keep only the latest copy of each repeated internal prompt
+    seen = {prompt.content} if is_internal(prompt) else set()
+    kept = []
+    for message in reversed(history):
+        if is_internal(message):
+            if message.content in seen:
+                continue
+            seen.add(message.content)
+        kept.append(message)
+    kept.reverse()
+
+    # Then drop the oldest internal prompts while over budget
+    sizes = [message_tokens(message) for message in kept]
+    total = sum(sizes) + message_tokens(prompt)
+    if total > budget:
+        dropped = set()
+        for i, message in enumerate(kept):
+            if total <= budget:
+                break
+            if is_internal(message):
+                dropped.add(i)
+                total -= sizes[i]
+        kept = [message for i, message in enumerate(kept) if i not in dropped]
+    return [*kept, prompt]
+
+
+def fit_to_budget(request: fp.QueryRequest, bot_name: str) -> fp.QueryRequest:
+    """
+    Returns the request to send to a bot, trimmed to the bot's token budget.
+
+    The request passed in is not modified; handlers keep reading their own
+    ``request.query``.
+
+    Parameters:
+        request (fp.QueryRequest): The request a handler is about to send.
+        bot_name (str): The upstream bot.
+
+    Returns:
+        fp.QueryRequest: ``request`` itself if nothing was trimmed, else a copy
+        with the trimmed query.
+    """
+    stats = _stats[bot_name]
+    stats["calls"] += 1
+    trimmed = fit_query(request.query, token_budget(bot_name))
+    if len(trimmed) == len(request.query):
+        return request
+
+    before = sum(message_tokens(message) for message in request.query)
+    after = sum(message_tokens(message) for message in trimmed)
+    stats["trimmed_calls"] += 1
+    stats["tokens_saved"] += before - after
+    logger.info(
+        f"Trimmed context for {bot_name}: {len(request.query)} -> {len(trimmed)} "
+        f"messages, ~{before} -> ~{after} tokens (saved ~{before - after})"
+    )
+    if after > token_budget(bot_name):
+        logger.warning(
+            f"Context for {bot_name} is still ~{after} tokens, over its budget "
+            f"of {token_budget(bot_name)}"
+        )
+    return request.model_copy(update={"query": trimmed})
+
+
+register_metrics("context_budget", lambda: {bot: dict(s) for bot, s in _stats.items()})
@@ -1,8 +1,35 @@
+import json
+import logging
 import os
-
-from sqlalchemy import Column, Integer, String, Text, create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
+from itertools import zip_longest
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import declarative_base
+
+logger = logging.getLogger(__name__)
 
 # from modal.secret import Secret
 
@@ -10,16 +37,63 @@ from sqlalchemy.orm import sessionmaker
 # For now, you can use an in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./test.db")
 
-# Create the database engine
-if str(SQLALCHEMY_DATABASE_URL).startswith("sqlite:///./"):
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# Connection pool settings (ignored for SQLite, which uses its own pooling)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+# Attempts at appending turns while other writers take the same turn numbers
+TURN_APPEND_ATTEMPTS = int(os.environ.get("TURN_APPEND_ATTEMPTS", "3"))
+
+
+def to_async_url(url: str) -> str:
+    """
+    Rewrites a database URL to use an asyncio driver.
+
+    Parameters:
+        url (str): A database URL, e.g. ``postgres://...`` or ``sqlite:///./test.db``.
+
+    Returns:
+        str: The URL with ``asyncpg`` (Postgres) or ``aiosqlite`` (SQLite) as driver.
+    """
+    for prefix in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix) :]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://") :]
+    return url
+
+
+def build_engine(url: str) -> AsyncEngine:
+    """
+    Creates an async engine for the given database URL.
+
+    Parameters:
+        url (str): The database URL (sync or async form).
+
+    Returns:
+        AsyncEngine: A pooled async engine.
+    """
+    async_url = to_async_url(url)
+    if async_url.startswith("sqlite"):
+        return create_async_engine(async_url)
+    return create_async_engine(
+        async_url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
     )
-else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-# Create a configured "Session" class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Create the database engine
+engine = build_engine(SQLALCHEMY_DATABASE_URL)
+
+# Create a configured "Session" class. Objects stay usable after commit so
+# handlers don't trigger a reload round-trip when reading them back.
+SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
 
 # Base class for declarative models
 Base = declarative_base()
@@ -48,97 +122,317 @@ class NegotiationScenario(Base):
     """
     Model for storing negotiation scenarios.
 
+    The offer/response history lives in ``negotiation_turns``; see
+    :class:`NegotiationTurn`. Databases created before that table kept it in
+    JSON ``user_offers``/``bot_responses`` columns here, which
+    :func:`init_db` moves into turns; see :func:`migrate_legacy_history`.
+
     Attributes:
         id (int): Primary key for the scenario.
         topic (str): The topic of the negotiation.
-        user_offers (str): A JSON string representing the user's offers.
-        bot_responses (str): A JSON string representing the bot's responses.
     """
 
     __tablename__ = "negotiation_scenarios"
 
     id = Column(Integer, primary_key=True, index=True)
     topic = Column(String, nullable=False)
-    user_offers = Column(Text, default="[]")
-    bot_responses = Column(Text, default="[]")
 
 
-# Create all tables in the database - ONLY IF THEY DON'T EXIST
-Base.metadata.create_all(bind=engine, checkfirst=True)
+class NegotiationTurn(Base):
+    """
+    Model for storing one offer/response pair of a negotiation.
 
+    Turns are append-only: each new turn is a single-row insert, and readers
+    can fetch just the most recent turns through the (scenario_id, turn_no)
+    index.
 
-async def get_db():
+    Attributes:
+        id (int): Primary key for the turn.
+        scenario_id (int): The negotiation scenario this turn belongs to.
+        turn_no (int): 1-based position of the turn within its scenario.
+        user_offer (str): The user's offer.
+        bot_response (str): The bot's response to the offer.
+        created_at (datetime): When the turn was recorded.
     """
-    Dependency function that provides a database session.
 
-    Yields:
-        Session: A database session for use in operations.
+    __tablename__ = "negotiation_turns"
+    __table_args__ = (
+        Index(
+            "ix_negotiation_turns_scenario_turn", "scenario_id", "turn_no", unique=True
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    scenario_id = Column(
+        Integer, ForeignKey("negotiation_scenarios.id"), nullable=False
+    )
+    turn_no = Column(Integer, nullable=False)
+    user_offer = Column(Text, nullable=False)
+    bot_response = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class SalaryCacheEntry(Base):
+    """
+    Model for caching salary lookups across workers and container restarts.
+
+    Attributes:
+        key (str): Normalized ``title|location`` key; see ``salary_cache_key``.
+        payload (str): The salary data as a JSON string.
+        fetched_at (float): When the data was fetched, as a Unix timestamp.
     """
-    db = SessionLocal()
+
+    __tablename__ = "salary_cache"
+
+    key = Column(String, primary_key=True)
+    payload = Column(Text, nullable=False)
+    fetched_at = Column(Float, nullable=False)
+
+
+# Columns of negotiation_scenarios that held the history as JSON lists
+LEGACY_HISTORY_COLUMNS = ("user_offers", "bot_responses")
+
+
+def _legacy_list(value: Optional[str], scenario_id: int) -> List[str]:
     try:
+        items = json.loads(value or "[]")
+    except ValueError:
+        items = None
+    if not isinstance(items, list):
+        logger.warning(f"Unreadable legacy history of scenario {scenario_id}")
+        return []
+    return [str(item) for item in items]
+
+
+def migrate_legacy_history(conn: Connection) -> int:
+    """
+    Copies the history kept in the legacy ``user_offers``/``bot_responses``
+    columns of ``negotiation_scenarios`` into ``negotiation_turns``, then drops
+    those columns. Does nothing once they are gone.
+
+    Legacy offers and responses are paired up in order and become a
+    scenario's first turns; turns it already has are renumbered after them.
+
+    Parameters:
+        conn (Connection): A connection inside the migration's transaction.
+
+    Returns:
+        int: The number of turns copied.
+    """
+    columns = {
+        column["name"] for column in inspect(conn).get_columns("negotiation_scenarios")
+    }
+    legacy = [name for name in LEGACY_HISTORY_COLUMNS if name in columns]
+    if not legacy:
+        return 0
+
+    rows = conn.execute(
+        text(f"SELECT id, {', '.join(legacy)} FROM negotiation_scenarios")
+    ).mappings()
+    turns = []
+    for row in rows:
+        user_offers, bot_responses = (
+            _legacy_list(row.get(name), row["id"]) for name in LEGACY_HISTORY_COLUMNS
+        )
+        pairs = list(zip_longest(user_offers, bot_responses, fillvalue=""))
+        if not pairs:
+            continue
+        # Negating first keeps the unique (scenario_id, turn_no) index
+        # satisfied while every existing turn is shifted by len(pairs)
+        for offset in ("-turn_no", f"-turn_no + {len(pairs)}"):
+            conn.execute(
+                text(
+                    f"UPDATE negotiation_turns SET turn_no = {offset} "
+                    "WHERE scenario_id = :scenario_id"
+                ),
+                {"scenario_id": row["id"]},
+            )
+        turns.extend(
+            {
+                "scenario_id": row["id"],
+                "turn_no": turn_no,
+                "user_offer": user_offer,
+                "bot_response": bot_response,
+            }
+            for turn_no, (user_offer, bot_response) in enumerate(pairs, start=1)
+        )
+    if turns:
+        conn.execute(NegotiationTurn.__table__.insert(), turns)
+    for name in legacy:
+        conn.execute(text(f"ALTER TABLE negotiation_scenarios DROP COLUMN {name}"))
+    logger.info(f"Moved {len(turns)} legacy negotiation turns to negotiation_turns")
+    return len(turns)
+
+
+async def init_db(bind: AsyncEngine = engine) -> None:
+    """
+    Creates all tables in the database - ONLY IF THEY DON'T EXIST - and moves
+    legacy negotiation history into ``negotiation_turns``.
+    """
+    async with bind.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, checkfirst=True)
+        await conn.run_sync(migrate_legacy_history)
+
+
+async def dispose_engine(bind: AsyncEngine = engine) -> None:
+    """Closes all pooled connections held by the engine."""
+    await bind.dispose()
+
+
+@asynccontextmanager
+async def get_db(db: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+    """
+    Provides a request-scoped database session (one unit of work per request).
+
+    A new session is always closed on exit, which rolls back any uncommitted
+    work and returns its connection to the pool.
+
+    Parameters:
+        db (Optional[AsyncSession]): An already open session to reuse. It is
+            yielded as-is and left open for its owner to close.
+
+    Yields:
+        AsyncSession: A database session for use in operations.
+    """
+    if db is not None:
         yield db
-    finally:
-        db.close()
+        return
+    async with SessionLocal() as session:
+        yield session
 
 
-async def create_user(db, poe_user_id: str):
+async def create_user(db: AsyncSession, poe_user_id: str):
     """Creates a new user in the database."""
     new_user = User(poe_user_id=poe_user_id)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     return new_user
 
 
-async def get_user_by_id(db, poe_user_id: str):
+async def get_user_by_id(db: AsyncSession, poe_user_id: str):
     """Retrieves a user from the database by their Poe user ID."""
-    return db.query(User).filter(User.poe_user_id == poe_user_id).first()
+    result = await db.execute(select(User).where(User.poe_user_id == poe_user_id))
+    return result.scalars().first()
 
 
-async def update_user_preferences(db, poe_user_id: str, preferences: dict):
+async def update_user_preferences(
+    db: AsyncSession, poe_user_id: str, preferences: dict
+):
     """Updates a user's preferences in the database."""
-    user = db.query(User).filter(User.poe_user_id == poe_user_id).first()
+    user = await get_user_by_id(db, poe_user_id)
     if user:
         user.preferences = preferences
-        db.commit()
-        db.refresh(user)
+        await db.commit()
         return user
     else:
         return None
 
 
-async def create_negotiation_scenario(db, topic: str):
+async def create_negotiation_scenario(db: AsyncSession, topic: str):
     """Creates a new negotiation scenario in the database."""
     new_scenario = NegotiationScenario(topic=topic)
     db.add(new_scenario)
-    db.commit()
-    db.refresh(new_scenario)
+    await db.commit()
     return new_scenario
 
 
-async def get_negotiation_scenario_by_id(db, scenario_id: int):
+async def get_negotiation_scenario_by_id(db: AsyncSession, scenario_id: int):
     """Retrieves a negotiation scenario from the database by its ID."""
-    return (
-        db.query(NegotiationScenario)
-        .filter(NegotiationScenario.id == scenario_id)
-        .first()
+    # Session.get() answers from the identity map when the scenario was already
+    # loaded in this unit of work, so repeated lookups cost no round-trip.
+    return await db.get(NegotiationScenario, scenario_id)
+
+
+async def append_negotiation_turn(
+    db: AsyncSession, scenario_id: int, user_offer: str, bot_response: str
+) -> NegotiationTurn:
+    """Appends an offer/response pair to a negotiation scenario's history."""
+    (turn,) = await append_negotiation_turns(
+        db, [(scenario_id, user_offer, bot_response)]
     )
+    return turn
 
 
-async def update_negotiation_scenario(
-    db, scenario_id: int, user_offers: list, bot_responses: list
-):
-    """Updates a negotiation scenario in the database."""
-    scenario = (
-        db.query(NegotiationScenario)
-        .filter(NegotiationScenario.id == scenario_id)
-        .first()
+async def _last_turn_nos(db: AsyncSession, scenario_ids: Set[int]) -> Dict[int, int]:
+    """Returns the latest turn number of each scenario that has turns."""
+    result = await db.execute(
+        select(NegotiationTurn.scenario_id, func.max(NegotiationTurn.turn_no))
+        .where(NegotiationTurn.scenario_id.in_(scenario_ids))
+        .group_by(NegotiationTurn.scenario_id)
     )
-    if scenario:
-        scenario.user_offers = user_offers
-        scenario.bot_responses = bot_responses
-        db.commit()
-        db.refresh(scenario)
-        return scenario
-    else:
-        return None
+    return dict(result.all())
+
+
+async def append_negotiation_turns(
+    db: AsyncSession, turns: Sequence[Tuple[int, str, str]]
+) -> List[NegotiationTurn]:
+    """
+    Appends several offer/response pairs in a single transaction.
+
+    Each scenario's turns are numbered after its latest turn. If another writer
+    commits a turn with one of those numbers first, the unique (scenario_id,
+    turn_no) index rejects the transaction, and it is retried with fresh
+    numbers, up to TURN_APPEND_ATTEMPTS times in all.
+
+    Parameters:
+        db (AsyncSession): The database session.
+        turns (Sequence[Tuple[int, str, str]]): ``(scenario_id, user_offer,
+            bot_response)`` tuples, in the order they happened.
+
+    Returns:
+        List[NegotiationTurn]: The inserted turns.
+
+    Raises:
+        IntegrityError: If the turns still collide after the last attempt, or
+            violate another constraint. Nothing is written.
+    """
+    scenario_ids = {scenario_id for scenario_id, _, _ in turns}
+    for attempt in range(1, TURN_APPEND_ATTEMPTS + 1):
+        last_turn_nos = await _last_turn_nos(db, scenario_ids)
+        new_turns = []
+        for scenario_id, user_offer, bot_response in turns:
+            turn_no = (last_turn_nos.get(scenario_id) or 0) + 1
+            last_turn_nos[scenario_id] = turn_no
+            new_turns.append(
+                NegotiationTurn(
+                    scenario_id=scenario_id,
+                    turn_no=turn_no,
+                    user_offer=user_offer,
+                    bot_response=bot_response,
+                )
+            )
+        db.add_all(new_turns)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            if attempt == TURN_APPEND_ATTEMPTS:
+                raise
+            continue
+        return new_turns
+
+
+async def get_recent_negotiation_turns(
+    db: AsyncSession, scenario_id: int, limit: Optional[int] = None
+) -> List[NegotiationTurn]:
+    """
+    Retrieves the most recent turns of a negotiation scenario.
+
+    Parameters:
+        db (AsyncSession): The database session.
+        scenario_id (int): The negotiation scenario ID.
+        limit (Optional[int]): How many of the latest turns to return. All turns
+            are returned when omitted.
+
+    Returns:
+        List[NegotiationTurn]: The turns in chronological order.
+    """
+    query = (
+        select(NegotiationTurn)
+        .where(NegotiationTurn.scenario_id == scenario_id)
+        .order_by(NegotiationTurn.turn_no.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    return list(reversed(result.scalars().all()))
@@ -1,72 +1,231 @@
+import logging
 import os
-from cachetools import cached, TTLCache
+from typing import Optional, Tuple
+
 import aiohttp
-from modal import Secret
 
-# Adzuna API credentials from Modal secrets
-ADZUNA_API_ID = os.environ.get("ADZUNA_API_ID", Secret.from_name("ADZUNA_API_ID"))
-ADZUNA_API_KEY = os.environ.get("ADZUNA_API_KEY", Secret.from_name("ADZUNA_API_KEY"))
+from utils.caching import async_cached
+from utils.salary_cache import salary_cache
+from utils.salary_index import SalaryIndex
+
+logger = logging.getLogger(__name__)
+
+# Adzuna API credentials. The Modal secrets attached to the app (see main.py)
+# set them as environment variables; they are read on first use.
+ADZUNA_API_ID: Optional[str] = None
+ADZUNA_API_KEY: Optional[str] = None
+ADZUNA_BASE_URL = os.environ.get(
+    "ADZUNA_BASE_URL", "https://api.adzuna.com/v1/api/jobs/us/search/1"
+)  # US endpoint
+
+# Settings for the process-wide HTTP connection pool
+HTTP_POOL_LIMIT = int(os.environ.get("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.environ.get("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_DNS_CACHE_TTL = int(os.environ.get("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "10"))
+
+# Salary lookups are cached for SALARY_CACHE_TTL seconds; lookups that found
+# no data (or were rejected) are cached for SALARY_NEGATIVE_CACHE_TTL seconds.
+SALARY_CACHE_TTL = float(os.environ.get("SALARY_CACHE_TTL", "300"))
+SALARY_NEGATIVE_CACHE_TTL = float(os.environ.get("SALARY_NEGATIVE_CACHE_TTL", "60"))
+
+# Offline salary index (see scripts/build_salary_index.py), consulted before
+# the Adzuna API. With SALARY_OFFLINE_ONLY set, the API is never called.
+SALARY_INDEX_PATH = os.environ.get(
+    "SALARY_INDEX_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "data", "salary_index.bin"
+    ),
+)
+SALARY_OFFLINE_ONLY = os.environ.get("SALARY_OFFLINE_ONLY", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Shared HTTP session, created at startup and closed at shutdown
+_http_session: Optional[aiohttp.ClientSession] = None
+
+# Offline salary index, opened on first use (None if there is no index file)
+_salary_index: Optional[SalaryIndex] = None
+_salary_index_loaded = False
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    Returns the shared HTTP session used for external API calls, creating it on
+    first use.
+
+    The session keeps connections alive between requests and caches DNS
+    lookups, so repeated calls to the same host skip the TCP/TLS handshake.
+
+    Returns:
+        aiohttp.ClientSession: The shared session.
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            use_dns_cache=True,
+        )
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+        )
+    return _http_session
+
+
+async def close_http_session() -> None:
+    """Closes the shared HTTP session and its pooled connections."""
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+
+def get_salary_index() -> Optional[SalaryIndex]:
+    """
+    Returns the offline salary index, opening it on first use.
+
+    Returns:
+        Optional[SalaryIndex]: The index, or None if ``SALARY_INDEX_PATH`` does
+        not exist or is not a valid index.
+    """
+    global _salary_index, _salary_index_loaded
+    if not _salary_index_loaded:
+        _salary_index_loaded = True
+        if os.path.exists(SALARY_INDEX_PATH):
+            try:
+                _salary_index = SalaryIndex(SALARY_INDEX_PATH)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error opening salary index {SALARY_INDEX_PATH}: {e}")
+    return _salary_index
+
+
+def lookup_offline_salary(job_title: str, location: str) -> Optional[dict]:
+    """
+    Looks up salary data in the offline index without any network call.
+
+    Parameters:
+        job_title (str): The job title.
+        location (str): The job location.
 
-# Cache for API responses
-cache = TTLCache(maxsize=100, ttl=300)
+    Returns:
+        Optional[dict]: The salary data, or None on a miss or without an index.
+    """
+    index = get_salary_index()
+    return index.lookup(job_title, location) if index is not None else None
 
 
-@cached(cache)
+@async_cached(
+    maxsize=100,
+    ttl=SALARY_CACHE_TTL,
+    negative_ttl=SALARY_NEGATIVE_CACHE_TTL,
+    name="salary_data_cache",
+)
 async def fetch_salary_data(job_title: str, location: str) -> dict:
     """
-    Fetches salary data from the Adzuna API.
+    Fetches salary data from, in order, the in-process cache, the offline
+    salary index, the shared salary cache table or the Adzuna API.
+
+    Entries in the salary cache table that are past their TTL are returned
+    as-is while a background task fetches fresh data.
 
     Parameters:
         job_title (str): The job title for which to fetch salary data.
         location (str): The location where the job is based.
 
     Returns:
-        dict: A dictionary containing the average salary and currency, or an error message.
+        dict: A dictionary containing the average salary and currency.
 
     Raises:
         RuntimeError: If the API request fails.
         ValueError: If the API response is invalid or no salary data is found.
     """
-    base_url = "https://api.adzuna.com/v1/api/jobs/us/search/1"  # US endpoint
+    offline = lookup_offline_salary(job_title, location)
+    if offline is not None:
+        return offline
+    if SALARY_OFFLINE_ONLY:
+        raise ValueError("No salary data found for this job and location.")
+    return await salary_cache.get(job_title, location, _fetch_from_adzuna)
+
+
+def adzuna_credentials() -> Tuple[str, str]:
+    """
+    Returns the Adzuna app id and key.
+
+    Raises:
+        ValueError: If the credentials are not configured.
+    """
+    global ADZUNA_API_ID, ADZUNA_API_KEY
+    ADZUNA_API_ID = ADZUNA_API_ID or os.environ.get("ADZUNA_API_ID")
+    ADZUNA_API_KEY = ADZUNA_API_KEY or os.environ.get("ADZUNA_API_KEY")
+    if not ADZUNA_API_ID or not ADZUNA_API_KEY:
+        raise ValueError("Adzuna API credentials are not configured.")
+    return ADZUNA_API_ID, ADZUNA_API_KEY
+
+
+async def _fetch_from_adzuna(job_title: str, location: str) -> dict:
+    """
+    Fetches salary data from the Adzuna API.
+
+    Parameters:
+        job_title (str): The job title for which to fetch salary data.
+        location (str): The location where the job is based.
+
+    Returns:
+        dict: A dictionary containing the average salary and currency, or an error message.
 
+    Raises:
+        RuntimeError: If the API request fails.
+        ValueError: If the credentials are missing, the API response is invalid
+            or no salary data is found.
+    """
+    app_id, app_key = adzuna_credentials()
     params = {
-        "app_id": ADZUNA_API_ID,
-        "app_key": ADZUNA_API_KEY,
+        "app_id": app_id,
+        "app_key": app_key,
         "results_per_page": 10,  # Get up to 10 results for averaging
         "what": job_title,
         "where": location,
         "content-type": "application/json",
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(base_url, params=params) as response:
-            if response.status == 200:
-                data = await response.json()
-                salaries = [
-                    result["salary_is_predicted"]
-                    for result in data["results"]
-                    if result.get("salary_is_predicted") is not None
-                ]
-
-                if salaries:
-                    average_salary = sum(salaries) / len(salaries)
-                    return {
-                        "average_salary": int(average_salary),  # Return as an integer
-                        "currency": (
-                            data["results"][0].get("currency")
-                            if data["results"]
-                            else "USD"
-                        ),  # Default to USD
-                    }
-                else:
-                    raise ValueError("No salary data found for this job and location.")
-            elif response.status == 400:
-                raise ValueError("Invalid request parameters.")
-            elif response.status == 401:
-                raise ValueError("Invalid API credentials.")
-            elif response.status == 429:
-                raise ValueError("Too many requests.")
-            else:
-                raise RuntimeError(
-                    f"Adzuna API request failed: {response.status}, {response.text}"
+    session = await get_http_session()
+    async with session.get(ADZUNA_BASE_URL, params=params) as response:
+        if response.status == 200:
+            data = await response.json()
+            salaries = [
+                (result.get("salary_min", 0) + result.get("salary_max", 0)) / 2
+                for result in data["results"]
+                if result.get("salary_min") is not None
+                and result.get("salary_max") is not None
+            ]
+
+            if salaries:
+                average_salary = sum(salaries) / len(salaries)
+                currency = (
+                    data["results"][0].get("currency")
+                    if data["results"] and "currency" in data["results"][0]
+                    else "USD"
                 )
+                return {
+                    "average_salary": int(average_salary),  # Return as an integer
+                    "currency": currency,  # Default to USD if currency is not present
+                }
+            else:
+                raise ValueError("No salary data found for this job and location.")
+        elif response.status == 400:
+            raise ValueError("Invalid request parameters.")
+        elif response.status == 401:
+            raise ValueError("Invalid API credentials.")
+        elif response.status == 429:
+            raise ValueError("Too many requests.")
+        else:
+            raise RuntimeError(
+                f"Adzuna API request failed: {response.status}, {await response.text()}"
+            )
@@ -0,0 +1,269 @@
+"""Hedged upstream requests.
+
+Most upstream calls start streaming quickly, but now and then a bot takes
+seconds to produce its first token, and those calls set our tail latency. When
+a call's first token has not arrived after the bot's usual worst case (a
+percentile of its recent times to first token), the same request is sent to an
+alternate bot: another bot of the same tier, or the same bot again if it is
+alone in its tier. Whichever call streams its first token first is used and
+the other is cancelled.
+
+Hedges are capped twice: a token bucket lets at most HEDGE_MAX_RATE hedges be
+sent per call overall, and a hedge is only sent while the Poe request has made
+fewer calls to the alternate than its ``server_bot_dependencies`` budget (as
+counted by ``utils.model_selection.request_calls``).
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Hashable, Optional
+
+import numpy as np
+
+from utils.metrics import register_metrics
+from utils.model_selection import BOT_TIERS, RequestCalls, request_calls
+
+logger = logging.getLogger(__name__)
+
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Percentile of a bot's recent times to first token after which to hedge
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))
+# Bounds of the hedge delay, in seconds; the maximum applies until a bot has
+# HEDGE_MIN_SAMPLES times to first token recorded
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", "0.25"))
+HEDGE_MAX_DELAY = float(os.environ.get("HEDGE_MAX_DELAY", "5"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+# Most hedges per upstream call, averaged over time
+HEDGE_MAX_RATE = float(os.environ.get("HEDGE_MAX_RATE", "0.05"))
+
+# Times to first token kept per bot
+HEDGE_WINDOW = 200
+# Most hedges the rate allowance can save up
+HEDGE_BURST = 5.0
+
+StartStream = Callable[[str], AsyncIterator[Any]]
+
+
+class HedgePolicy:
+    """Decides when, and to which bot, upstream calls are hedged."""
+
+    def __init__(
+        self,
+        enabled: bool = HEDGE_ENABLED,
+        percentile: float = HEDGE_PERCENTILE,
+        min_delay: float = HEDGE_MIN_DELAY,
+        max_delay: float = HEDGE_MAX_DELAY,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        max_rate: float = HEDGE_MAX_RATE,
+        calls: Optional[RequestCalls] = None,
+        tiers: Optional[Dict[str, int]] = None,
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.calls = calls or RequestCalls()
+        self.tiers = dict(tiers or BOT_TIERS)
+        self._first_tokens: Dict[str, Deque[float]] = {}
+        self._allowance = 0.0
+        self._stats = {"calls": 0, "hedges": 0, "hedges_won": 0}
+
+    def record_first_token(self, bot: str, seconds: float) -> None:
+        """Records how long a call to a bot took to stream its first token."""
+        window = self._first_tokens.get(bot)
+        if window is None:
+            window = self._first_tokens[bot] = deque(maxlen=HEDGE_WINDOW)
+        window.append(seconds)
+
+    def delay(self, bot: str) -> float:
+        """Returns how long to wait for a bot's first token before hedging."""
+        window = self._first_tokens.get(bot, ())
+        if len(window) < self.min_samples:
+            return self.max_delay
+        delay = float(np.percentile(np.fromiter(window, float), self.percentile))
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def alternate(self, bot: str) -> Optional[str]:
+        """Returns the bot to hedge calls to a bot with, if any."""
+        tier = self.tiers.get(bot)
+        if tier is None:
+            return None
+        others = [b for b, t in self.tiers.items() if t == tier and b != bot]
+        return others[0] if others else bot
+
+    def record_call(self) -> None:
+        """Counts an upstream call, which earns hedge allowance."""
+        self._stats["calls"] += 1
+        self._allowance = min(HEDGE_BURST, self._allowance + self.max_rate)
+
+    def can_hedge(
+        self, request_key: Hashable, bot: str, now: bool = True
+    ) -> Optional[str]:
+        """
+        Returns the alternate a call to a bot may be hedged with, if any.
+
+        Parameters:
+            request_key (Hashable): Identifies the Poe request the call is for.
+            bot (str): The bot called.
+            now (bool): Whether the hedge would be sent now, which also needs
+                rate allowance; otherwise only the budget is checked.
+
+        Returns:
+            Optional[str]: The alternate, or None if the call may not be hedged.
+        """
+        alternate = self.alternate(bot)
+        if not self.enabled or alternate is None:
+            return None
+        if now and self._allowance < 1:
+            return None
+        if not self.calls.within_budget(request_key, alternate):
+            return None
+        return alternate
+
+    def record_hedge(self, request_key: Hashable, alternate: str) -> None:
+        """Spends allowance on a hedge and counts its call."""
+        self._allowance -= 1
+        self._stats["hedges"] += 1
+        self.calls.record(request_key, alternate)
+        self.record_call()
+
+    def record_hedge_won(self) -> None:
+        self._stats["hedges_won"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Returns the hedge counts and each bot's current hedge delay."""
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "delay_ms": {
+                bot: round(self.delay(bot) * 1000, 1) for bot in self._first_tokens
+            },
+        }
+
+
+hedge_policy = HedgePolicy(calls=request_calls)
+register_metrics("hedging", hedge_policy.metrics)
+
+
+class _Failure:
+    """An exception raised by a call, passed through the queue."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+_END = object()  # A call's stream ended
+_HEDGE = object()  # The hedge delay passed
+
+
+async def _pump(attempt: int, stream: AsyncIterator[Any], queue: asyncio.Queue):
+    """Streams one call into the shared queue, tagged with its attempt number."""
+    try:
+        async for msg in stream:
+            queue.put_nowait((attempt, msg))
+    except Exception as e:
+        queue.put_nowait((attempt, _Failure(e)))
+    else:
+        queue.put_nowait((attempt, _END))
+
+
+async def hedged_stream(
+    start: StartStream,
+    bot: str,
+    request_key: Hashable,
+    policy: Optional[HedgePolicy] = None,
+    on_answer: Optional[Callable[[str], None]] = None,
+) -> AsyncIterator[Any]:
+    """
+    Streams a call to a bot, hedged with a call to an alternate bot if its
+    first token is late.
+
+    Each call runs in a task of its own until one of them streams a message;
+    that one is streamed on and the other is cancelled. If a call fails before
+    either streams, the other carries on; the error is raised if none is left.
+
+    Parameters:
+        start (StartStream): Starts a call to the given bot.
+        bot (str): The bot to call.
+        request_key (Hashable): Identifies the Poe request, for the budgets.
+            The call to ``bot`` must already be counted in ``policy.calls``;
+            a hedge is counted here.
+        policy (Optional[HedgePolicy]): Defaults to the shared policy.
+        on_answer (Optional[Callable[[str], None]]): Called with the bot whose
+            call is streamed, once it is known.
+
+    Yields:
+        Any: The messages of the call streamed first.
+    """
+    policy = policy or hedge_policy
+    policy.record_call()
+    if policy.can_hedge(request_key, bot, now=False) is None:
+        # Nothing to hedge with: stream the call directly
+        if on_answer is not None:
+            on_answer(bot)
+        async for msg in start(bot):
+            yield msg
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    bots = [bot]
+    tasks = [asyncio.create_task(_pump(0, start(bot), queue))]
+    timer = loop.call_later(policy.delay(bot), queue.put_nowait, (None, _HEDGE))
+    winner: Optional[int] = None
+    running = {0}
+    try:
+        while True:
+            attempt, item = await queue.get()
+            if item is _HEDGE:
+                alternate = policy.can_hedge(request_key, bot)
+                if winner is None and alternate is not None:
+                    policy.record_hedge(request_key, alternate)
+                    logger.info(
+                        f"No first token from {bot} after "
+                        f"{policy.delay(bot):.2f} s, hedging with {alternate}"
+                    )
+                    bots.append(alternate)
+                    running.add(1)
+                    tasks.append(asyncio.create_task(_pump(1, start(alternate), queue)))
+                continue
+            if winner is None:
+                if isinstance(item, _Failure):
+                    running.discard(attempt)
+                    if running:
+                        logger.warning(
+                            f"Hedged call to {bots[attempt]} failed: {item.error}"
+                        )
+                        continue
+                    raise item.error
+                # The first call to stream (or to end) wins
+                winner = attempt
+                timer.cancel()
+                for other, task in enumerate(tasks):
+                    if other != winner:
+                        task.cancel()
+                if winner == 1:
+                    policy.record_hedge_won()
+                if on_answer is not None:
+                    on_answer(bots[winner])
+            elif attempt != winner:
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        timer.cancel()
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
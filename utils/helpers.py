@@ -1,12 +1,17 @@
+import os
 import re
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional
 
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+from utils.nltk_data import get_pos_tagger, get_sentiment_analyzer
 
-nltk.download("vader_lexicon")
+# Sentence boundaries for word tokenization (as nltk.word_tokenize does, but
+# without the Punkt model)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# Words for the fast tokenizer of iter_follow_up_questions
+_WORD = re.compile(r"\w+(?:['-]\w+)*|[^\w\s]")
 
-sia = SentimentIntensityAnalyzer()
+# Most follow-up questions generate_dynamic_follow_up_questions returns
+FOLLOW_UP_MAX_QUESTIONS = int(os.environ.get("FOLLOW_UP_MAX_QUESTIONS", "10"))
 
 
 def analyze_sentiment(text: str) -> str:
@@ -19,77 +24,139 @@ def analyze_sentiment(text: str) -> str:
     Returns:
         str: A string describing the sentiment (positive, negative, neutral, or mixed).
     """
-    sentiment = sia.polarity_scores(text)
-    if sentiment["compound"] >= 0.05:
+    sentiment = get_sentiment_analyzer().polarity_scores(text)
+    return sentiment_label(sentiment["compound"])
+
+
+def sentiment_label(compound: float) -> str:
+    """
+    Maps a VADER compound score to a sentiment label.
+
+    Parameters:
+        compound (float): The compound score, rounded to four decimals as VADER does.
+
+    Returns:
+        str: positive, negative, neutral, or mixed.
+    """
+    if compound >= 0.05:
         return "positive"
-    elif sentiment["compound"] <= -0.05:
+    elif compound <= -0.05:
         return "negative"
-    elif sentiment["compound"] == 0:
+    elif compound == 0:
         return "neutral"
     else:
         return "mixed"
 
 
-def generate_dynamic_follow_up_questions(text: str) -> List[str]:
+def analyze_sentiment_batch(texts: List[str]) -> List[str]:
     """
-    Generates dynamic follow-up questions based on the provided text.
+    Analyzes the sentiment of many texts at once.
+
+    Gives the same labels as calling :func:`analyze_sentiment` on each text, but
+    texts without negations, intensifiers and the like are scored together
+    with NumPy (see utils.sentiment_batch).
 
     Parameters:
-        text (str): The text to analyze.
+        texts (List[str]): The texts to analyze.
 
     Returns:
-        List[str]: A list of follow-up questions.
+        List[str]: One label (positive, negative, neutral, or mixed) per text.
     """
-    questions = []
-    # Extract key nouns and verbs from the text
-    tokens = nltk.word_tokenize(text)
-    nouns = [word for word, pos in nltk.pos_tag(tokens) if pos.startswith("NN")]
-    verbs = [word for word, pos in nltk.pos_tag(tokens) if pos.startswith("VB")]
+    from utils.sentiment_batch import get_batch_scorer
+
+    return get_batch_scorer().labels(texts)
+
 
-    # Generate questions based on nouns and verbs
-    for noun in nouns:
-        questions.append(f"Tell me more about {noun}.")
-        questions.append(f"What is the significance of {noun} in this context?")
-    for verb in verbs:
-        questions.append(f"Why did {verb} happen?")
-        questions.append(f"What were the consequences of {verb}?")
+def iter_follow_up_questions(
+    text: str, max_questions: Optional[int] = None, fast_tokenizer: bool = False
+) -> Iterator[str]:
+    """
+    Yields follow-up questions about the nouns and verbs of a text.
 
-    # Remove duplicate questions
-    questions = list(set(questions))
-    return questions
+    The text is tokenized and tagged one sentence at a time, so a long text is
+    only processed as far as needed. Each distinct noun or verb gives two
+    questions, in order of first appearance.
+
+    Parameters:
+        text (str): The text to analyze.
+        max_questions (Optional[int]): Stop after this many questions.
+        fast_tokenizer (bool): Split words with a simple regular expression
+            instead of NLTK's Treebank tokenizer (faster, but contractions
+            such as "don't" stay one token).
+
+    Yields:
+        str: The next follow-up question.
+    """
+    if max_questions is not None and max_questions <= 0:
+        return
+    if fast_tokenizer:
+        tokenize = _WORD.findall
+    else:
+        from nltk.tokenize import NLTKWordTokenizer
+
+        tokenize = NLTKWordTokenizer().tokenize
+    tagger = get_pos_tagger()
+    seen = set()
+    count = 0
+    for sentence in _SENTENCE_END.split(text):
+        for word, pos in tagger.tag(tokenize(sentence)):
+            if word in seen:
+                continue
+            if pos.startswith("NN"):
+                questions = (
+                    f"Tell me more about {word}.",
+                    f"What is the significance of {word} in this context?",
+                )
+            elif pos.startswith("VB"):
+                questions = (
+                    f"Why did {word} happen?",
+                    f"What were the consequences of {word}?",
+                )
+            else:
+                continue
+            seen.add(word)
+            for question in questions:
+                yield question
+                count += 1
+                if count == max_questions:
+                    return
+
+
+def generate_dynamic_follow_up_questions(
+    text: str, max_questions: Optional[int] = FOLLOW_UP_MAX_QUESTIONS
+) -> List[str]:
+    """
+    Generates dynamic follow-up questions based on the provided text.
+
+    Parameters:
+        text (str): The text to analyze.
+        max_questions (Optional[int]): The most questions to return (None for
+            no limit). Defaults to FOLLOW_UP_MAX_QUESTIONS.
+
+    Returns:
+        List[str]: A list of distinct follow-up questions, in order of first
+        appearance of the words they ask about.
+    """
+    return list(iter_follow_up_questions(text, max_questions))
 
 
 def extract_job_details(text: str) -> Dict[str, str | None]:
     """
     Extracts job title and location from user input.
 
+    Known titles and locations are normalized to their canonical names from the
+    job gazetteer (see utils.job_details), e.g. "swe in the bay area" gives
+    "Software Engineer" and "San Francisco".
+
     Parameters:
         text (str): The user's input text.
 
     Returns:
         Dict[str, str | None]: A dictionary containing the extracted job title and location.
     """
-    job_title = None
-    location = None
-
-    # Use regular expressions to extract job title and location
-    job_title_match = re.search(r"I'm looking for a (.*) job", text, re.IGNORECASE)
-    if job_title_match:
-        job_title = job_title_match.group(1).strip()
-    else:
-        job_title_match = re.search(r"I'm a (.*)", text, re.IGNORECASE)
-        if job_title_match:
-            job_title = job_title_match.group(1).strip()
-
-    location_match = re.search(r"in (.*)", text, re.IGNORECASE)
-    if location_match:
-        location = location_match.group(1).strip()
-    else:
-        location_match = re.search(r"in the (.*)", text, re.IGNORECASE)
-        if location_match:
-            location = location_match.group(1).strip()
+    from utils.job_details import get_job_details_extractor
 
-    return {"job_title": job_title, "location": location}
+    return get_job_details_extractor().extract(text)
 
 
 def format_salary_data(salary_data: dict) -> str:
@@ -105,4 +172,7 @@ def format_salary_data(salary_data: dict) -> str:
     if "error" in salary_data:
         return salary_data["error"]
     else:
-        return f"The average salary for this job is {salary_data['average_salary']} {salary_data['currency']}."
+        formatted = f"The average salary for this job is {salary_data['average_salary']} {salary_data['currency']}."
+        if "salary_min" in salary_data and "salary_max" in salary_data:
+            formatted += f" Typical range: {salary_data['salary_min']} - {salary_data['salary_max']} {salary_data['currency']}."
+        return formatted
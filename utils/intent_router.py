@@ -0,0 +1,163 @@
+"""Routes a user message to the feature it asks for.
+
+All keywords are compiled into one word-bounded regular expression, so a
+message is scanned once whatever the number of features. When a message
+mentions several features, a keyword that opens the message (the command
+form, e.g. "debate: ...") wins, then the intent with the higher priority, then
+the earliest mention. Messages without an exact keyword can still be routed by
+fuzzy-matching their words against the keywords, to tolerate typos.
+"""
+
+import difflib
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# (intent, keywords), highest priority first. More specific features come
+# before the ones they are often mentioned alongside: a salary question may
+# mention a contract, and most requests mention a negotiation or an argument.
+DEFAULT_INTENTS: List[Tuple[str, Sequence[str]]] = [
+    (
+        "fact_check",
+        ("fact-check", "fact check", "factcheck", "fact-checking", "fact checking"),
+    ),
+    (
+        "bias_detection",
+        ("cognitive bias", "cognitive biases", "bias", "biases", "biased"),
+    ),
+    ("salary_negotiation", ("salary", "salaries", "pay raise", "compensation")),
+    ("contract_analysis", ("contract", "contracts", "clause", "clauses")),
+    ("debate", ("debate", "debates", "debating")),
+    ("negotiation", ("negotiation", "negotiations", "negotiate", "negotiating")),
+]
+
+# Routes below this confidence are treated as not understood
+INTENT_MIN_CONFIDENCE = float(os.environ.get("INTENT_MIN_CONFIDENCE", "0.5"))
+
+# Shortest keyword considered for fuzzy matching (shorter ones match too much)
+FUZZY_MIN_LENGTH = 5
+
+_WORD = re.compile(r"[a-z][a-z-]+")
+
+
+class Route(NamedTuple):
+    """The routing decision for a message."""
+
+    intent: str
+    confidence: float
+    keyword: str
+
+
+class IntentRouter:
+    """
+    Maps a message to one of a fixed set of intents.
+
+    Example:
+        router = IntentRouter()
+        router.route("What salary should I ask for in my contract?")
+        # Route(intent="salary_negotiation", confidence=0.7, keyword="salary")
+
+    Confidence is 1.0 for a message that opens with a keyword, 0.9 for a
+    single feature mentioned elsewhere, 0.7 when several features are
+    mentioned, and at most 0.6 for a fuzzy match.
+    """
+
+    def __init__(
+        self,
+        intents: Sequence[Tuple[str, Sequence[str]]] = DEFAULT_INTENTS,
+        fuzzy: bool = True,
+        fuzzy_cutoff: float = 0.8,
+    ):
+        self.intents = [intent for intent, _ in intents]
+        self.fuzzy = fuzzy
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._keywords: Dict[str, Tuple[str, int]] = {}
+        for priority, (intent, keywords) in enumerate(intents):
+            for keyword in keywords:
+                self._keywords.setdefault(keyword.lower(), (intent, priority))
+        # Longest first, so "cognitive bias" is preferred over "bias"
+        alternatives = sorted(self._keywords, key=len, reverse=True)
+        self._pattern = re.compile(
+            r"(?<![\w-])(?:"
+            + "|".join(re.escape(keyword) for keyword in alternatives)
+            + r")(?![\w-])"
+        )
+        self._fuzzy_words = [
+            keyword
+            for keyword in self._keywords
+            if " " not in keyword and len(keyword) >= FUZZY_MIN_LENGTH
+        ]
+
+    def route(self, text: str) -> Optional[Route]:
+        """
+        Picks the intent of a message.
+
+        Parameters:
+            text (str): The user's message.
+
+        Returns:
+            Optional[Route]: The intent, confidence and matched keyword, or None
+            if the message matches no intent.
+        """
+        text = text.lower()
+        best = None
+        intents = set()
+        for match in self._pattern.finditer(text):
+            keyword = match.group()
+            intent, priority = self._keywords[keyword]
+            intents.add(intent)
+            # Lower ranks win: command form, then priority (matches come in
+            # order, so the earliest mention wins ties)
+            rank = (text[: match.start()].strip(" \t\n\"'") != "", priority)
+            if best is None or rank < best[0]:
+                best = (rank, intent, keyword)
+        if best is not None:
+            (not_command, _), intent, keyword = best
+            if not not_command:
+                confidence = 1.0
+            elif len(intents) == 1:
+                confidence = 0.9
+            else:
+                confidence = 0.7
+            return Route(intent, confidence, keyword)
+        if self.fuzzy:
+            return self._fuzzy_route(text)
+        return None
+
+    def _fuzzy_route(self, text: str) -> Optional[Route]:
+        best = None
+        for word in dict.fromkeys(_WORD.findall(text)):
+            if len(word) < FUZZY_MIN_LENGTH:
+                continue
+            for keyword in difflib.get_close_matches(
+                word, self._fuzzy_words, n=1, cutoff=self.fuzzy_cutoff
+            ):
+                if word.startswith(keyword.rstrip("s")):
+                    continue  # A derived word ("contractor"), not a typo
+                similarity = difflib.SequenceMatcher(None, word, keyword).ratio()
+                if best is None or similarity > best[0]:
+                    best = (similarity, keyword)
+        if best is None:
+            return None
+        similarity, keyword = best
+        return Route(self._keywords[keyword][0], round(0.6 * similarity, 3), keyword)
+
+
+def strip_keyword(text: str, keyword: str) -> str:
+    """
+    Removes the keyword a message was routed on, leaving the feature's input.
+
+    Parameters:
+        text (str): The user's message.
+        keyword (str): The matched keyword, i.e. ``Route.keyword``.
+
+    Returns:
+        str: The message without its first word-bounded, case-insensitive
+        mention of the keyword, stripped of surrounding whitespace.
+    """
+    pattern = r"(?<![\w-])" + re.escape(keyword) + r"(?![\w-])"
+    return re.sub(pattern, "", text, count=1, flags=re.IGNORECASE).strip()
+
+
+# Router used by main.ArgumentNegotiationBot
+intent_router = IntentRouter()
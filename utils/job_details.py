@@ -0,0 +1,213 @@
+"""Extracts a job title and a location from a salary question.
+
+Known titles and locations come from a gazetteer file mapping each canonical
+name to its aliases (see ``data/job_gazetteer.json``). The aliases are indexed
+in a word trie, so a message is matched against all of them in one pass over
+its words. Titles and locations not in the gazetteer are picked up by a few
+precompiled patterns ("I'm a ...", "... in <place>"). Either way the result is
+a canonical name, so different wordings of the same job share salary cache
+entries.
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+JOB_GAZETTEER_PATH = os.environ.get(
+    "JOB_GAZETTEER_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "data", "job_gazetteer.json"
+    ),
+)
+
+# Words of a message, lower-cased; "d.c." and "st." keep their dots
+_WORD = re.compile(r"[^\W_]+(?:[.'&+-][^\W_]+)*\.?")
+
+# Fallback patterns for titles and locations missing from the gazetteer. A
+# phrase ends at punctuation or at a word that starts a new clause.
+_STOP = (
+    r"(?=\s*(?:[,.!?;:]|$)|\s+(?:in|at|for|and|with|based|from|near|job|"
+    r"position|role|what|how|but|so|who|which|working|making|earning|remote|"
+    r"remotely)\b)"
+)
+_TITLE_PATTERNS = [
+    re.compile(
+        r"\b(?:i'?m|i am|work(?:ing)? as|hired as|offered|job as|role as|as)\s+"
+        r"(?:a|an)\s+(?P<phrase>[a-z][a-z '&+-]{1,40}?)" + _STOP
+    ),
+    re.compile(
+        r"\blooking for (?:a|an)\s+(?P<phrase>[a-z][a-z '&+-]{1,40}?)\s+"
+        r"(?:job|position|role)\b"
+    ),
+    re.compile(r"^(?:(?:a|an)\s+)?(?P<phrase>[a-z][a-z '&+-]{1,40}?)\s+in\s+"),
+]
+_LOCATION_PATTERNS = [
+    re.compile(
+        r"\b(?:in|based in|located in|near|around)\s+(?:the\s+)?"
+        r"(?P<phrase>[a-z][a-z .'-]{1,30}?)" + _STOP
+    ),
+]
+# Longest fallback phrase, in words
+MAX_PHRASE_WORDS = 4
+# Words a fallback title or location cannot be
+_NOT_NAMES = {
+    "salary",
+    "pay",
+    "negotiation",
+    "the",
+    "my",
+    "a",
+    "an",
+    "this",
+    "that",
+    "what",
+    "how",
+    "who",
+    "where",
+    "is",
+    "do",
+    "does",
+}
+
+_END = ""  # Trie key marking the end of an alias
+
+
+def normalize_words(text: str) -> List[str]:
+    """Splits text into lower-cased words, dropping a trailing period."""
+    return [word.rstrip(".") or word for word in _WORD.findall(text.casefold())]
+
+
+class Gazetteer:
+    """
+    A word trie of aliases, each mapped to a canonical name.
+
+    Example:
+        gazetteer = Gazetteer({"San Francisco": ["sf", "bay area"]})
+        gazetteer.find(normalize_words("jobs in the bay area"))
+        # [(3, 5, "San Francisco")]
+    """
+
+    def __init__(self, names: Dict[str, List[str]]):
+        self._root: Dict[str, dict] = {}
+        for canonical, aliases in names.items():
+            for alias in [canonical, *aliases]:
+                words = normalize_words(alias)
+                if words:
+                    node = self._root
+                    for word in words:
+                        node = node.setdefault(word, {})
+                    node.setdefault(_END, canonical)
+
+    def find(self, words: List[str]) -> List[Tuple[int, int, str]]:
+        """
+        Finds every non-overlapping alias in a list of words, longest first at
+        each position.
+
+        Parameters:
+            words (List[str]): Normalized words.
+
+        Returns:
+            List[Tuple[int, int, str]]: (start, end, canonical name) per match.
+        """
+        matches = []
+        root = self._root
+        i = 0
+        while i < len(words):
+            node = root.get(words[i])
+            match = None
+            j = i
+            while node is not None:
+                j += 1
+                if _END in node:
+                    match = (i, j, node[_END])
+                node = node.get(words[j]) if j < len(words) else None
+            if match is None:
+                i += 1
+            else:
+                matches.append(match)
+                i = match[1]
+        return matches
+
+
+def _best(matches: List[Tuple[int, int, str]], words: List[str]) -> Optional[str]:
+    """Prefers a match right after "in", then the longest, then the first."""
+    if not matches:
+        return None
+    start, end, canonical = min(
+        matches,
+        key=lambda m: (
+            not (m[0] > 0 and words[m[0] - 1] in ("in", "at")),
+            m[0] - m[1],
+            m[0],
+        ),
+    )
+    return canonical
+
+
+def _fallback(text: str, patterns: List[re.Pattern]) -> Optional[str]:
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            words = normalize_words(match.group("phrase"))
+            if 0 < len(words) <= MAX_PHRASE_WORDS and words[0] not in _NOT_NAMES:
+                return " ".join(word.capitalize() for word in words)
+    return None
+
+
+class JobDetailsExtractor:
+    """Finds the canonical job title and location in a message."""
+
+    def __init__(
+        self, job_titles: Dict[str, List[str]], locations: Dict[str, List[str]]
+    ):
+        self.job_titles = Gazetteer(job_titles)
+        self.locations = Gazetteer(locations)
+
+    @classmethod
+    def from_file(cls, path: str = JOB_GAZETTEER_PATH) -> "JobDetailsExtractor":
+        """
+        Loads a gazetteer file: ``{"job_titles": {name: [alias, ...]},
+        "locations": {name: [alias, ...]}}``.
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("job_titles", {}), data.get("locations", {}))
+
+    def extract(self, text: str) -> Dict[str, Optional[str]]:
+        """
+        Extracts the job title and location from a message.
+
+        Parameters:
+            text (str): The user's message.
+
+        Returns:
+            Dict[str, Optional[str]]: The canonical ``job_title`` and
+            ``location``, each None if not found.
+        """
+        words = normalize_words(text)
+        location_matches = self.locations.find(words)
+        # A location alias cannot also be part of the title ("nurse in
+        # washington" vs. "washington"), so titles are looked up in the words
+        # outside the location matches.
+        title_words = list(words)
+        for start, end, _ in location_matches:
+            title_words[start:end] = [""] * (end - start)
+        lowered = text.casefold()
+        return {
+            "job_title": _best(self.job_titles.find(title_words), title_words)
+            or _fallback(lowered, _TITLE_PATTERNS),
+            "location": _best(location_matches, words)
+            or _fallback(lowered, _LOCATION_PATTERNS),
+        }
+
+
+_extractor: Optional[JobDetailsExtractor] = None
+
+
+def get_job_details_extractor() -> JobDetailsExtractor:
+    """Returns the shared extractor, loading the gazetteer on first call."""
+    global _extractor
+    if _extractor is None:
+        _extractor = JobDetailsExtractor.from_file(JOB_GAZETTEER_PATH)
+    return _extractor
@@ -0,0 +1,238 @@
+"""Content-addressed cache of upstream bot responses.
+
+Responses are keyed by the bot name and a hash of the normalized tail of the
+conversation (which ends with the prompt), so the same prompt from different
+users shares an entry. Each entry also records the bot that actually
+answered, which model selection or hedging may have changed, and is only
+replayed for calls to that bot. Entries live in an in-memory LRU in front of
+a SQLite file shared by the workers on a host.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import fastapi_poe as fp
+
+from utils.caching import BoundedCache
+from utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite3")
+# Number of trailing conversation messages (including the prompt) in the key
+LLM_CACHE_CONTEXT_MESSAGES = int(os.environ.get("LLM_CACHE_CONTEXT_MESSAGES", "3"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_MEMORY_BYTES = int(os.environ.get("LLM_CACHE_MEMORY_BYTES", "16777216"))
+
+# Seconds a response stays cached, per handler; 0 opts the handler out. Each
+# can be overridden with LLM_CACHE_TTL_<HANDLER>, e.g. LLM_CACHE_TTL_DEBATE.
+# Negotiation and salary replies depend on state outside the conversation
+# (stored history, live salary data), so they are not cached by default.
+DEFAULT_HANDLER_TTLS = {
+    "debate": 86400,
+    "fact_check": 3600,
+    "bias_detection": 86400,
+    "contract_analysis": 86400,
+    "negotiation": 0,
+    "salary_negotiation": 0,
+}
+
+# A cached chunk: (text, is_suggested_reply, is_replace_response)
+Chunk = Tuple[str, bool, bool]
+# A cached response: (expiry time, the bot that answered, its chunks)
+Entry = Tuple[float, Optional[str], List[Chunk]]
+
+
+def handler_ttl(handler: str) -> float:
+    """Returns the cache TTL in seconds for a handler (0 if not cached)."""
+    default = DEFAULT_HANDLER_TTLS.get(handler, 0)
+    return float(os.environ.get(f"LLM_CACHE_TTL_{handler.upper()}", default))
+
+
+def response_cache_key(
+    bot_name: str,
+    query: Sequence[fp.ProtocolMessage],
+    context_messages: int = LLM_CACHE_CONTEXT_MESSAGES,
+) -> str:
+    """
+    Builds the cache key for a request to an upstream bot.
+
+    Only the role and the whitespace-normalized content of the last
+    ``context_messages`` messages count, so ids, timestamps and earlier turns
+    do not split entries.
+
+    Parameters:
+        bot_name (str): The upstream bot.
+        query (Sequence[fp.ProtocolMessage]): The conversation, ending with the prompt.
+        context_messages (int): How many trailing messages to key on.
+
+    Returns:
+        str: A hex SHA-256 digest.
+    """
+    digest = hashlib.sha256(bot_name.encode("utf-8"))
+    for message in query[-context_messages:]:
+        digest.update(b"\0" + message.role.encode("utf-8") + b"\0")
+        digest.update(" ".join(message.content.split()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SQLiteResponseStore:
+    """Blocking SQLite store for cached responses; call it from a thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, chunks TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT chunks, expires_at FROM llm_responses WHERE key = ?",
+                    (key,),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        if isinstance(value, list):
+            # Stored before entries recorded their bot
+            return row[1], None, [tuple(chunk) for chunk in value]
+        return row[1], value["bot"], [tuple(chunk) for chunk in value["chunks"]]
+
+    def set(
+        self, key: str, bot: str, chunks: List[Chunk], expires_at: float, now: float
+    ) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?)",
+                (key, json.dumps({"bot": bot, "chunks": chunks}), expires_at),
+            )
+            conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ResponseCache:
+    """
+    Two-level (memory, then SQLite) cache of complete upstream responses.
+
+    Only streams that finish without an error are stored; a stream the caller
+    stops reading early is not.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        enabled: bool = LLM_CACHE_ENABLED,
+        ttl_for: Callable[[str], float] = handler_ttl,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.enabled = enabled
+        self._ttl_for = ttl_for
+        self._clock = clock
+        # Values are Entry tuples; expiry is checked here because the TTL
+        # differs per handler.
+        self._memory = BoundedCache(
+            maxsize=LLM_CACHE_MEMORY_ENTRIES,
+            max_bytes=LLM_CACHE_MEMORY_BYTES,
+            key=lambda key: key,
+        )
+        self._store = SQLiteResponseStore(path)
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0}
+        )
+
+    def ttl(self, handler: Optional[str]) -> float:
+        """Returns the TTL for a handler, or 0 if its responses are not cached."""
+        if not self.enabled or handler is None:
+            return 0
+        return self._ttl_for(handler)
+
+    async def get(self, handler: str, key: str, bot: str) -> Optional[List[Chunk]]:
+        """
+        Returns the cached chunks for a key, or None on a miss.
+
+        Parameters:
+            handler (str): The calling handler, for the metrics.
+            key (str): The cache key.
+            bot (str): The bot the call is for; a response another bot gave
+                is a miss.
+        """
+        now = self._clock()
+        entry = self._memory.get(key)
+        if entry is None:
+            try:
+                entry = await asyncio.to_thread(self._store.get, key)
+            except sqlite3.Error as e:
+                logger.error(f"Error reading LLM response cache: {e}")
+                entry = None
+            if entry is not None:
+                self._memory[key] = entry
+        if entry is None or entry[0] <= now or entry[1] != bot:
+            self._stats[handler]["misses"] += 1
+            return None
+        self._stats[handler]["hits"] += 1
+        return entry[2]
+
+    async def set(self, handler: str, key: str, bot: str, chunks: List[Chunk]) -> None:
+        """Stores a complete response, and the bot that gave it, for the
+        handler's TTL."""
+        now = self._clock()
+        expires_at = now + self.ttl(handler)
+        self._memory[key] = (expires_at, bot, chunks)
+        try:
+            await asyncio.to_thread(self._store.set, key, bot, chunks, expires_at, now)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing LLM response cache: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Returns hits, misses and hit ratio per handler."""
+        report = {}
+        for handler, stats in self._stats.items():
+            lookups = stats["hits"] + stats["misses"]
+            report[handler] = {
+                **stats,
+                "hit_ratio": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+        return report
+
+    def close(self) -> None:
+        """Closes the SQLite connection."""
+        self._store.close()
+
+
+# Process-wide cache used by utils.upstream.stream_request
+response_cache = ResponseCache()
+register_metrics("llm_cache", response_cache.metrics)
@@ -0,0 +1,36 @@
+"""In-process metrics registry, served as JSON from the ``/metrics`` route."""
+
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Maps a component name to a callable returning its current metrics
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Registers a metrics provider under the given name.
+
+    Parameters:
+        name (str): The component name, used as the key in the metrics report.
+        provider (Callable[[], Dict[str, Any]]): Returns the component's metrics.
+    """
+    _providers[name] = provider
+
+
+def collect_metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    Collects the current metrics of every registered component.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Metrics keyed by component name.
+    """
+    report = {}
+    for name, provider in _providers.items():
+        try:
+            report[name] = provider()
+        except Exception as e:
+            logger.error(f"Error collecting metrics for {name}: {e}")
+    return report
@@ -0,0 +1,377 @@
+"""Picks the upstream bot for each call.
+
+Handlers name a bot per call site; that bot is the default. The selector may
+send the call elsewhere, based on:
+
+- the complexity of the prompt, estimated locally from its length, clause
+  count and share of numbers, which sets the tier of bot it needs;
+- the handler's quality floor, the lowest tier its answers may come from;
+- each bot's recent time to first token and error rate, as exponentially
+  weighted moving averages of the calls made through ``utils.upstream``. The
+  error rate also decays while a bot is not called, so a bot skipped for its
+  errors is tried again once they are MODEL_ERROR_HALF_LIFE seconds old.
+
+Among the bots of the lowest tier that qualifies, the default is kept unless
+it is failing or another bot is clearly faster. A bot other than the default
+is only chosen while the Poe request has made fewer calls to it than its
+``server_bot_dependencies`` budget, so selection never upgrades or switches a
+call past what the bot declares; :data:`request_calls` counts those calls.
+Every decision is logged.
+"""
+
+import logging
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Sequence
+
+import fastapi_poe as fp
+
+from utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# The bots this bot calls, with the most calls each may get per request
+SERVER_BOT_DEPENDENCIES = {
+    "GPT-3.5-Turbo": 5,
+    "Claude-instant": 3,
+    "GPT-4": 2,
+}
+# Quality tier of each bot; higher is stronger and slower
+BOT_TIERS = {
+    "GPT-3.5-Turbo": 1,
+    "Claude-instant": 1,
+    "GPT-4": 2,
+}
+# Lowest tier each handler's answers may come from. Each can be overridden
+# with MODEL_QUALITY_FLOOR_<HANDLER>, e.g. MODEL_QUALITY_FLOOR_DEBATE.
+DEFAULT_QUALITY_FLOORS = {
+    "debate": 1,
+    "negotiation": 1,
+    "fact_check": 1,
+    "bias_detection": 1,
+    "contract_analysis": 2,
+    "salary_negotiation": 1,
+}
+
+MODEL_SELECTION_ENABLED = os.environ.get("MODEL_SELECTION_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Complexity (0 to 1) from which a prompt needs the strongest tier
+MODEL_COMPLEXITY_THRESHOLD = float(os.environ.get("MODEL_COMPLEXITY_THRESHOLD", "0.4"))
+# Weight of the latest call in the moving averages
+MODEL_EWMA_ALPHA = float(os.environ.get("MODEL_EWMA_ALPHA", "0.2"))
+# Error rate above which a bot is skipped
+MODEL_MAX_ERROR_RATE = float(os.environ.get("MODEL_MAX_ERROR_RATE", "0.5"))
+# Seconds in which a bot's error rate halves while it is not called
+MODEL_ERROR_HALF_LIFE = float(os.environ.get("MODEL_ERROR_HALF_LIFE", "30"))
+# How much faster another bot of the tier must be to replace the default
+MODEL_LATENCY_SLACK = float(os.environ.get("MODEL_LATENCY_SLACK", "1.5"))
+
+# Poe requests whose upstream calls are counted against the budgets
+TRACKED_REQUESTS = 4096
+
+# Prompts this long, with this many clauses, or this share of numbers score
+# 1 on that part of the complexity estimate
+COMPLEX_WORDS = 250
+COMPLEX_CLAUSES = 15
+COMPLEX_NUMERIC_DENSITY = 0.15
+
+_WORD = re.compile(r"\w+")
+_CLAUSE_BREAK = re.compile(
+    r"[,;:.!?]+|\b(?:and|but|or|if|unless|because|whereas|however|provided|except)\b",
+    re.IGNORECASE,
+)
+_NUMBER = re.compile(r"\d")
+
+
+def quality_floor(handler: str) -> int:
+    """Returns the lowest bot tier a handler's answers may come from."""
+    default = DEFAULT_QUALITY_FLOORS.get(handler, 1)
+    return int(os.environ.get(f"MODEL_QUALITY_FLOOR_{handler.upper()}", default))
+
+
+def estimate_complexity(text: str) -> float:
+    """
+    Estimates how demanding a prompt is, from 0 (trivial) to 1.
+
+    Half the score comes from the prompt's length, 30% from its clause count
+    and 20% from the share of its words that contain digits.
+    """
+    words = _WORD.findall(text)
+    if not words:
+        return 0.0
+    clauses = len(_CLAUSE_BREAK.findall(text))
+    numeric_density = sum(1 for word in words if _NUMBER.search(word)) / len(words)
+    return round(
+        0.5 * min(1.0, len(words) / COMPLEX_WORDS)
+        + 0.3 * min(1.0, clauses / COMPLEX_CLAUSES)
+        + 0.2 * min(1.0, numeric_density / COMPLEX_NUMERIC_DENSITY),
+        3,
+    )
+
+
+class RequestCalls:
+    """
+    Counts the upstream calls made for each Poe request, against each bot's
+    ``server_bot_dependencies`` budget.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None):
+        self.budgets = dict(budgets or SERVER_BOT_DEPENDENCIES)
+        self._calls: "OrderedDict[Hashable, Counter]" = OrderedDict()
+
+    def record(self, request_key: Hashable, bot: str) -> None:
+        """Counts a call to a bot made for a Poe request."""
+        calls = self._calls.get(request_key)
+        if calls is None:
+            calls = self._calls[request_key] = Counter()
+            if len(self._calls) > TRACKED_REQUESTS:
+                self._calls.popitem(last=False)
+        calls[bot] += 1
+
+    def count(self, request_key: Hashable, bot: str) -> int:
+        """Returns how many calls to a bot a Poe request has made."""
+        calls = self._calls.get(request_key)
+        return calls[bot] if calls is not None else 0
+
+    def within_budget(self, request_key: Hashable, bot: str) -> bool:
+        """Whether a Poe request may make one more call to a bot."""
+        return self.count(request_key, bot) < self.budgets.get(bot, 0)
+
+
+# The calls of every Poe request, shared by model selection and hedging
+request_calls = RequestCalls()
+
+
+class BotStats:
+    """Moving averages of one bot's time to first token and error rate."""
+
+    def __init__(
+        self,
+        alpha: float = MODEL_EWMA_ALPHA,
+        error_half_life: float = MODEL_ERROR_HALF_LIFE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self._clock = clock
+        self.first_token_seconds: Optional[float] = None
+        self.duration_seconds: Optional[float] = None
+        self._error_rate = 0.0
+        self._error_rate_at = clock()
+        self.calls = 0
+        self.errors = 0
+
+    @property
+    def error_rate(self) -> float:
+        """The error rate, decayed for the time since the bot was last called."""
+        elapsed = self._clock() - self._error_rate_at
+        return self._error_rate * 0.5 ** (elapsed / self.error_half_life)
+
+    def _record_outcome(self, error: float) -> None:
+        self._error_rate = self._average(self.error_rate, error)
+        self._error_rate_at = self._clock()
+
+    def _average(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return value
+        return current + self.alpha * (value - current)
+
+    def record_success(self, first_token_seconds: float, duration_seconds: float):
+        self.calls += 1
+        self.first_token_seconds = self._average(
+            self.first_token_seconds, first_token_seconds
+        )
+        self.duration_seconds = self._average(self.duration_seconds, duration_seconds)
+        self._record_outcome(0.0)
+
+    def record_error(self):
+        self.calls += 1
+        self.errors += 1
+        self._record_outcome(1.0)
+
+    def metrics(self) -> Dict[str, Any]:
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 3),
+            "first_token_ms": ms(self.first_token_seconds),
+            "duration_ms": ms(self.duration_seconds),
+        }
+
+
+class Selection(NamedTuple):
+    """A model selection decision."""
+
+    bot: str
+    complexity: float
+    tier: int
+    reason: str
+
+
+class ModelSelector:
+    """
+    Chooses the bot for each upstream call.
+
+    Example:
+        selector = ModelSelector()
+        # "GPT-3.5-Turbo" for a short prompt, "GPT-4" for a long one
+        selector.select("debate", request.query, "GPT-4")
+    """
+
+    def __init__(
+        self,
+        tiers: Optional[Dict[str, int]] = None,
+        enabled: bool = MODEL_SELECTION_ENABLED,
+        threshold: float = MODEL_COMPLEXITY_THRESHOLD,
+        max_error_rate: float = MODEL_MAX_ERROR_RATE,
+        latency_slack: float = MODEL_LATENCY_SLACK,
+        clock: Callable[[], float] = time.monotonic,
+        calls: Optional[RequestCalls] = None,
+    ):
+        self.tiers = dict(tiers or BOT_TIERS)
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_error_rate = max_error_rate
+        self.latency_slack = latency_slack
+        self._clock = clock
+        self.calls = calls or RequestCalls()
+        self.stats: Dict[str, BotStats] = {
+            bot: BotStats(clock=clock) for bot in self.tiers
+        }
+        self._decisions: Counter = Counter()
+
+    def _stats(self, bot: str) -> BotStats:
+        if bot not in self.stats:
+            self.stats[bot] = BotStats(clock=self._clock)
+        return self.stats[bot]
+
+    def record_success(
+        self, bot: str, first_token_seconds: float, duration_seconds: float
+    ) -> None:
+        """Records a completed call to a bot."""
+        self._stats(bot).record_success(first_token_seconds, duration_seconds)
+
+    def record_error(self, bot: str) -> None:
+        """Records a failed call to a bot."""
+        self._stats(bot).record_error()
+
+    def _healthy(self, bot: str) -> bool:
+        return self._stats(bot).error_rate <= self.max_error_rate
+
+    def _latency(self, bot: str) -> float:
+        latency = self._stats(bot).first_token_seconds
+        return float("inf") if latency is None else latency
+
+    def choose(
+        self,
+        handler: str,
+        text: str,
+        default: str,
+        request_key: Optional[Hashable] = None,
+    ) -> Selection:
+        """
+        Chooses the bot for a prompt, without logging the decision.
+
+        Parameters:
+            handler (str): The calling handler, which sets the quality floor.
+            text (str): The prompt.
+            default (str): The bot the call site names.
+            request_key (Optional[Hashable]): Identifies the Poe request, whose
+                calls so far limit the bots other than the default. Without
+                one, budgets are not checked.
+
+        Returns:
+            Selection: The bot, the prompt's complexity, the tier it needs and
+            why the bot was chosen.
+        """
+        complexity = estimate_complexity(text)
+        tier = max(quality_floor(handler), 2 if complexity >= self.threshold else 1)
+        for candidate_tier in sorted(set(self.tiers.values())):
+            if candidate_tier < tier:
+                continue
+            candidates = [
+                bot
+                for bot, bot_tier in self.tiers.items()
+                if bot_tier == candidate_tier
+                and self._healthy(bot)
+                and (
+                    bot == default
+                    or request_key is None
+                    or self.calls.within_budget(request_key, bot)
+                )
+            ]
+            if not candidates:
+                continue
+            # Bots never called yet rank last, in the order of self.tiers
+            fastest = min(candidates, key=self._latency)
+            if default in candidates:
+                if self._latency(fastest) * self.latency_slack < self._latency(default):
+                    return Selection(fastest, complexity, tier, "faster")
+                return Selection(default, complexity, tier, "default")
+            if self.tiers.get(default, 0) > candidate_tier:
+                reason = "cheaper tier"
+            elif self.tiers.get(default, 0) < tier:
+                reason = "needs stronger tier"
+            else:
+                reason = "default unhealthy"
+            return Selection(fastest, complexity, tier, reason)
+        return Selection(default, complexity, tier, "no healthy bot within budget")
+
+    def select(
+        self,
+        handler: str,
+        query: Sequence[fp.ProtocolMessage],
+        default: str,
+        request_key: Optional[Hashable] = None,
+    ) -> str:
+        """
+        Chooses the bot for a call and logs the decision.
+
+        Parameters:
+            handler (str): The calling handler.
+            query (Sequence[fp.ProtocolMessage]): The conversation, ending with
+                the prompt.
+            default (str): The bot the call site names.
+            request_key (Optional[Hashable]): Identifies the Poe request, for
+                the budgets. The caller records the call in :attr:`calls`.
+
+        Returns:
+            str: The bot to call.
+        """
+        if not self.enabled or default not in self.tiers:
+            return default
+        messages = list(query)
+        text = getattr(messages[-1], "content", "") if messages else ""
+        selection = self.choose(
+            handler, text if isinstance(text, str) else "", default, request_key
+        )
+        self._decisions[(handler, selection.bot, selection.reason)] += 1
+        logger.info(
+            f"Model selection for {handler}: {selection.bot} "
+            f"(default {default}, complexity {selection.complexity}, "
+            f"tier >= {selection.tier}, {selection.reason})"
+        )
+        return selection.bot
+
+    def metrics(self) -> Dict[str, Any]:
+        """Returns each bot's stats and the decisions made per handler."""
+        decisions: Dict[str, Dict[str, int]] = {}
+        for (handler, bot, reason), count in self._decisions.items():
+            decisions.setdefault(handler, {})[f"{bot} ({reason})"] = count
+        return {
+            "enabled": self.enabled,
+            "bots": {bot: stats.metrics() for bot, stats in self.stats.items()},
+            "decisions": decisions,
+        }
+
+
+model_selector = ModelSelector(calls=request_calls)
+register_metrics("model_selection", model_selector.metrics)
@@ -0,0 +1,296 @@
+"""Near-duplicate text index using MinHash signatures and LSH banding.
+
+Texts are normalized and split into character shingles; each text gets a
+MinHash signature whose rows agree with another signature's in roughly the
+proportion of shingles the two texts share (their Jaccard similarity).
+Signatures are split into bands, and texts sharing any whole band become
+candidates, so a lookup only compares against a handful of entries.
+
+Shingle similarity barely registers a changed number or an added "not", yet
+either changes what a statement says, so texts only match when their numbers
+and negation words (see :func:`anchors`) are the same.
+
+Signatures and payloads are kept in NumPy arrays and saved as a single
+``.npz`` file without pickling.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime for the (a * x + b) mod p hash family. As in common MinHash
+# implementations, a * x + b is allowed to wrap at 64 bits before the modulo.
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_NON_WORD = re.compile(r"[^\w\s]")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_TOKEN = re.compile(r"[\w']+")
+NEGATIONS = frozenset(
+    {
+        "no",
+        "not",
+        "never",
+        "none",
+        "nor",
+        "neither",
+        "nobody",
+        "nothing",
+        "nowhere",
+        "cannot",
+        "without",
+    }
+)
+
+
+def shingles(text: str, size: int = 5) -> List[str]:
+    """
+    Splits text into overlapping character shingles after folding case,
+    punctuation and whitespace.
+
+    Parameters:
+        text (str): The text to shingle.
+        size (int): Characters per shingle.
+
+    Returns:
+        List[str]: The shingles (the whole text if it is shorter than ``size``).
+    """
+    folded = " ".join(_NON_WORD.sub(" ", text.casefold()).split())
+    if len(folded) <= size:
+        return [folded]
+    return [folded[i : i + size] for i in range(len(folded) - size + 1)]
+
+
+def anchors(text: str) -> str:
+    """
+    Returns the numbers and negation words of a text, in order.
+
+    Thousands separators are dropped and contractions such as "isn't" count
+    as "not", so "1,000" matches "1000" and "isn't" matches "is not".
+
+    Parameters:
+        text (str): The text.
+
+    Returns:
+        str: The numbers, then the negation words, e.g. ``"1879|not"``.
+    """
+    folded = text.casefold()
+    numbers = [number.replace(",", "") for number in _NUMBER.findall(folded)]
+    negations = [
+        "not" if token.endswith("n't") else token
+        for token in _TOKEN.findall(folded)
+        if token in NEGATIONS or token.endswith("n't")
+    ]
+    return " ".join(numbers) + "|" + " ".join(negations)
+
+
+def _pack(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encodes strings as one UTF-8 byte array and their offsets into it."""
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(string) for string in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """Decodes strings packed by :func:`_pack`."""
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [
+        data[start:end].decode("utf-8") for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+class NearDuplicateIndex:
+    """
+    Maps texts to payloads and finds the payload of the most similar text.
+
+    Example:
+        index = NearDuplicateIndex(threshold=0.8)
+        index.add("The Great Wall is visible from space.", "False: ...")
+        index.lookup("the great wall is visible from space!")  # "False: ..."
+        index.lookup("The Great Wall is not visible from space.")  # None
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+        # Mixes the rows of a band into one 64-bit key (wrapping arithmetic)
+        self._band_weights = rng.integers(
+            1, 1 << 63, size=num_perm // bands, dtype=np.uint64
+        )
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._payloads: List[str] = []
+        self._anchors: List[str] = []
+        # LSH buckets: loaded entries are in per-band sorted arrays (searched
+        # with searchsorted), entries added since are in per-band dicts.
+        self._frozen = 0
+        self._sorted_keys = np.empty((bands, 0), dtype=np.uint64)
+        self._sorted_ids = np.empty((bands, 0), dtype=np.int64)
+        self._band_tables: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def signature(self, text: str) -> np.ndarray:
+        """Returns the MinHash signature (``num_perm`` uint32 values) of a text."""
+        hashes = np.fromiter(
+            (
+                int.from_bytes(
+                    hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little"
+                )
+                for s in set(shingles(text, self.shingle_size))
+            ),
+            dtype=np.uint64,
+        )
+        with np.errstate(over="ignore"):
+            permuted = ((np.outer(hashes, self._a) + self._b) % _PRIME) & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        rows = signatures.astype(np.uint64).reshape(len(signatures), self.bands, -1)
+        with np.errstate(over="ignore"):
+            return (rows * self._band_weights).sum(axis=2, dtype=np.uint64)
+
+    def add(self, text: str, payload: str) -> None:
+        """
+        Adds a text and the payload to return for texts similar to it.
+
+        Parameters:
+            text (str): The text, e.g. a fact-check statement.
+            payload (str): The value to reuse, e.g. the fact-check response.
+        """
+        signature = self.signature(text)
+        index = len(self._payloads)
+        if index == len(self._signatures):
+            grown = np.empty((max(16, 2 * index), self.num_perm), dtype=np.uint32)
+            grown[:index] = self._signatures[:index]
+            self._signatures = grown
+        self._signatures[index] = signature
+        self._payloads.append(payload)
+        self._anchors.append(anchors(text))
+        for band, key in enumerate(self._band_keys(signature[None, :])[0].tolist()):
+            self._band_tables[band].setdefault(key, []).append(index)
+
+    def lookup(self, text: str) -> Optional[str]:
+        """Returns the payload of the most similar text above the threshold."""
+        match = self.best_match(text)
+        return match[0] if match is not None else None
+
+    def best_match(self, text: str) -> Optional[Tuple[str, float]]:
+        """
+        Finds the most similar indexed text with the same numbers and negation
+        words.
+
+        Parameters:
+            text (str): The text to look up.
+
+        Returns:
+            Optional[Tuple[str, float]]: The payload and the estimated Jaccard
+            similarity, or None if nothing reaches the threshold.
+        """
+        if not self._payloads:
+            return None
+        signature = self.signature(text)
+        keys = self._band_keys(signature[None, :])[0]
+        candidates = set()
+        for band, key in enumerate(keys.tolist()):
+            candidates.update(self._band_tables[band].get(key, ()))
+        if self._frozen:
+            for band, key in enumerate(keys):
+                column = self._sorted_keys[band]
+                start = np.searchsorted(column, key, side="left")
+                end = np.searchsorted(column, key, side="right")
+                candidates.update(self._sorted_ids[band, start:end].tolist())
+        key = anchors(text)
+        candidates = [i for i in candidates if self._anchors[i] == key]
+        if not candidates:
+            return None
+        ids = np.array(candidates, dtype=np.int64)
+        similarity = (self._signatures[ids] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            return None
+        return self._payloads[ids[best]], float(similarity[best])
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to an ``.npz`` file (replacing it atomically).
+
+        Parameters:
+            path (str): The file to write.
+        """
+        # Entries added while saving (from another thread) wait for next time
+        count = len(self._payloads)
+        payload_blob, payload_offsets = _pack(self._payloads[:count])
+        anchor_blob, anchor_offsets = _pack(self._anchors[:count])
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            signatures=self._signatures[:count],
+            payload_blob=payload_blob,
+            payload_offsets=payload_offsets,
+            anchor_blob=anchor_blob,
+            anchor_offsets=anchor_offsets,
+            params=np.array(
+                [self.num_perm, self.bands, self.shingle_size, self.seed],
+                dtype=np.int64,
+            ),
+        )
+        os.replace(tmp_path, path)
+
+    def _freeze(self) -> None:
+        """Moves every entry's LSH buckets into the sorted arrays."""
+        count = len(self._payloads)
+        if count == self._frozen:
+            return
+        keys = self._band_keys(self._signatures[:count]).T
+        self._sorted_ids = np.argsort(keys, axis=1, kind="stable")
+        self._sorted_keys = np.take_along_axis(keys, self._sorted_ids, axis=1)
+        self._frozen = count
+        self._band_tables = [{} for _ in range(self.bands)]
+
+    @classmethod
+    def load(cls, path: str, threshold: float = 0.8) -> "NearDuplicateIndex":
+        """
+        Reads an index written by :meth:`save`.
+
+        Parameters:
+            path (str): The ``.npz`` file.
+            threshold (float): Minimum estimated similarity for a match.
+
+        Returns:
+            NearDuplicateIndex: The index, with its LSH bands rebuilt.
+
+        Raises:
+            KeyError: If the file lacks an array, e.g. one saved before numbers
+                and negation words were indexed.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            num_perm, bands, shingle_size, seed = (int(v) for v in data["params"])
+            index = cls(threshold, num_perm, bands, shingle_size, seed)
+            index._signatures = data["signatures"].copy()
+            index._payloads = _unpack(data["payload_blob"], data["payload_offsets"])
+            index._anchors = _unpack(data["anchor_blob"], data["anchor_offsets"])
+        index._freeze()
+        return index
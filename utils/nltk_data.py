@@ -0,0 +1,179 @@
+"""Local NLTK models: the VADER sentiment lexicon and the part-of-speech tagger.
+
+Both are packaged at build time into one pickle file (see
+``scripts/build_nltk_data.py``) and loaded on first use, so starting the bot
+needs no network access and does not even import NLTK. Without the file, the
+models are read from NLTK's own data directories; nothing is downloaded at
+run time.
+"""
+
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+NLTK_DATA_PATH = os.environ.get(
+    "NLTK_DATA_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "data", "nltk_data.pickle"
+    ),
+)
+NLTK_DATA_VERSION = 1
+
+# NLTK resources the packaged file is built from
+VADER_RESOURCE = "sentiment/vader_lexicon.zip/vader_lexicon/vader_lexicon.txt"
+TAGGER_RESOURCE = "averaged_perceptron_tagger_eng"
+
+_lock = threading.Lock()
+_data: Optional[Dict[str, Any]] = None
+_analyzer = None
+_tagger = None
+
+
+def read_vader_lexicon() -> Dict[str, float]:
+    """
+    Reads the VADER lexicon (word -> valence) from NLTK's data directories.
+
+    Raises:
+        LookupError: If NLTK's data directories lack the lexicon.
+    """
+    import nltk
+
+    lexicon = {}
+    for line in nltk.data.load(VADER_RESOURCE).split("\n"):
+        word, measure = line.strip().split("\t")[0:2]
+        lexicon[word] = float(measure)
+    return lexicon
+
+
+def read_tagger_model() -> Dict[str, Any]:
+    """
+    Reads the perceptron tagger's ``weights``, ``tagdict`` and ``classes`` from
+    NLTK's data directories.
+
+    Raises:
+        LookupError: If NLTK's data directories lack the tagger.
+    """
+    from nltk.tag.perceptron import PerceptronTagger
+
+    tagger = PerceptronTagger()
+    return {
+        "weights": tagger.model.weights,
+        "tagdict": tagger.tagdict,
+        "classes": sorted(tagger.classes),
+    }
+
+
+def read_nltk_resources() -> Dict[str, Any]:
+    """
+    Reads every model from NLTK's data directories.
+
+    Returns:
+        Dict[str, Any]: The ``vader_lexicon`` and the ``tagger`` model.
+
+    Raises:
+        LookupError: If NLTK's data directories lack one of the resources.
+    """
+    return {
+        "version": NLTK_DATA_VERSION,
+        "vader_lexicon": read_vader_lexicon(),
+        "tagger": read_tagger_model(),
+    }
+
+
+def build_nltk_data(path: str = NLTK_DATA_PATH) -> Dict[str, Any]:
+    """
+    Packages the NLTK models into a single file.
+
+    Parameters:
+        path (str): Where to write the file.
+
+    Returns:
+        Dict[str, Any]: The packaged data.
+    """
+    data = read_nltk_resources()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return data
+
+
+def load_nltk_model(name: str) -> Any:
+    """
+    Returns one of the models, reading the packaged file on first call.
+
+    Without the packaged file, each model is read from NLTK's data directories
+    when first needed.
+
+    Parameters:
+        name (str): "vader_lexicon" or "tagger".
+
+    Returns:
+        Any: The model.
+
+    Raises:
+        LookupError: If the model is neither packaged nor installed for NLTK.
+        ValueError: If the packaged file was built by another version.
+    """
+    global _data
+    with _lock:
+        if _data is None:
+            if os.path.exists(NLTK_DATA_PATH):
+                start = time.perf_counter()
+                with open(NLTK_DATA_PATH, "rb") as f:
+                    data = pickle.load(f)
+                if data.get("version") != NLTK_DATA_VERSION:
+                    raise ValueError(
+                        f"{NLTK_DATA_PATH} was built by another version; "
+                        "rebuild it with scripts/build_nltk_data.py."
+                    )
+                logger.info(
+                    f"Loaded NLTK models in "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms"
+                )
+            else:
+                logger.warning(
+                    f"{NLTK_DATA_PATH} not found, reading NLTK's data directories "
+                    "(build it with scripts/build_nltk_data.py)"
+                )
+                data = {}
+            _data = data
+        if name not in _data:
+            readers = {"vader_lexicon": read_vader_lexicon, "tagger": read_tagger_model}
+            _data[name] = readers[name]()
+        return _data[name]
+
+
+def get_sentiment_analyzer():
+    """Returns the VADER sentiment analyzer, built on first call."""
+    global _analyzer
+    if _analyzer is None:
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+        # Skips __init__, which would read the lexicon from NLTK's data files
+        analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+        analyzer.lexicon = load_nltk_model("vader_lexicon")
+        analyzer.constants = VaderConstants()
+        _analyzer = analyzer
+    return _analyzer
+
+
+def get_pos_tagger():
+    """Returns the averaged perceptron part-of-speech tagger, built on first call."""
+    global _tagger
+    if _tagger is None:
+        from nltk.tag.perceptron import PerceptronTagger
+
+        model = load_nltk_model("tagger")
+        tagger = PerceptronTagger(load=False)
+        tagger.model.weights = model["weights"]
+        tagger.tagdict = model["tagdict"]
+        tagger.classes = tagger.model.classes = set(model["classes"])
+        _tagger = tagger
+    return _tagger
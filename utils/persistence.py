@@ -0,0 +1,161 @@
+"""Write-behind persistence: handlers enqueue records and a background worker
+writes them to the database in batched transactions."""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from utils.database import SessionLocal, append_negotiation_turns
+from utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# Flush once this many records are queued...
+PERSIST_BATCH_SIZE = int(os.environ.get("PERSIST_BATCH_SIZE", "50"))
+# ...or once the oldest queued record has waited this many seconds
+PERSIST_FLUSH_INTERVAL = float(os.environ.get("PERSIST_FLUSH_INTERVAL", "0.5"))
+# Records beyond this are dropped (and counted) rather than blocking handlers
+PERSIST_QUEUE_MAXSIZE = int(os.environ.get("PERSIST_QUEUE_MAXSIZE", "10000"))
+
+
+# Queued by stop() to tell the worker to write its batch and exit
+_STOP = object()
+
+
+class TurnRecord(NamedTuple):
+    """A negotiation turn waiting to be written to ``negotiation_turns``."""
+
+    scenario_id: int
+    user_offer: str
+    bot_response: str
+
+
+class PersistenceWorker:
+    """
+    Batches queued records into as few database transactions as possible.
+
+    Handlers call :meth:`enqueue` and return immediately; the worker task writes
+    a batch whenever ``batch_size`` records are waiting or ``flush_interval``
+    seconds have passed since the first record of the batch arrived.
+
+    Records are written shortly after they are enqueued, so a read issued in
+    the same instant may not see them yet.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = PERSIST_BATCH_SIZE,
+        flush_interval: float = PERSIST_FLUSH_INTERVAL,
+        maxsize: int = PERSIST_QUEUE_MAXSIZE,
+        session_factory: Callable[[], Any] = SessionLocal,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maxsize = maxsize
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "dropped": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of records waiting to be written."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """Starts the background worker task on the running event loop."""
+        if self._task is not None and not self._task.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the worker after writing every record still in the queue."""
+        if self._task is not None and not self._task.done():
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+        # Write anything enqueued while the worker was shutting down
+        if self._queue is not None:
+            batch = []
+            while not self._queue.empty():
+                record = self._queue.get_nowait()
+                if record is not _STOP:
+                    batch.append(record)
+            for i in range(0, len(batch), self.batch_size):
+                await self._write(batch[i : i + self.batch_size])
+
+    def enqueue(self, record: TurnRecord) -> None:
+        """
+        Queues a record for writing, starting the worker if necessary.
+
+        Parameters:
+            record (TurnRecord): The record to persist.
+        """
+        self.start()
+        try:
+            self._queue.put_nowait(record)
+            self._stats["enqueued"] += 1
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            logger.error("Persistence queue is full; dropping record.")
+
+    def metrics(self) -> Dict[str, int]:
+        """Returns the queue depth and write counters."""
+        return {"queue_depth": self.queue_depth, **self._stats}
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            record = await self._queue.get()
+            if record is _STOP:
+                return
+            batch = [record]
+            stopping = False
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def _write(self, batch: List[TurnRecord]) -> None:
+        try:
+            async with self._session_factory() as db:
+                await append_negotiation_turns(db, batch)
+        except Exception as e:
+            by_scenario: Dict[int, List[TurnRecord]] = {}
+            for record in batch:
+                by_scenario.setdefault(record.scenario_id, []).append(record)
+            if len(by_scenario) == 1:
+                self._stats["dropped"] += len(batch)
+                logger.error(f"Error writing {len(batch)} queued records: {e}")
+                return
+            # Writes each scenario's records on their own, so that records
+            # that cannot be written only drop the rest of their scenario's
+            logger.warning(
+                f"Error writing {len(batch)} queued records, "
+                f"retrying them per scenario: {e}"
+            )
+            for records in by_scenario.values():
+                await self._write(records)
+            return
+        self._stats["written"] += len(batch)
+        self._stats["batches"] += 1
+
+
+# Process-wide worker used by the handlers
+persistence_worker = PersistenceWorker()
+register_metrics("persistence", persistence_worker.metrics)
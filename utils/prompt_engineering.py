@@ -1,8 +1,26 @@
+"""Prompt templates for each feature.
+
+Templates are parsed once, when registered: a malformed template fails at
+import rather than on a user's message, and the fields each needs are known up
+front. Rendered prompts can hold a whole contract clause or negotiation
+history, so they are logged at DEBUG only, truncated, and for a sample of
+calls (PROMPT_LOG_SAMPLE_RATE).
+"""
+
 import logging
-from typing import Any, Dict
+import os
+import random
+from string import Formatter
+from typing import Any, Dict, FrozenSet, Mapping, Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Share of rendered prompts logged when DEBUG logging is on
+PROMPT_LOG_SAMPLE_RATE = float(os.environ.get("PROMPT_LOG_SAMPLE_RATE", "0.1"))
+# Characters of a prompt to log
+PROMPT_LOG_MAX_CHARS = int(os.environ.get("PROMPT_LOG_MAX_CHARS", "200"))
 
 # Dictionary to store prompt templates for different functionalities
 PROMPT_TEMPLATES: Dict[str, str] = {
@@ -11,11 +29,119 @@ PROMPT_TEMPLATES: Dict[str, str] = {
     "fact-check": "Fact-check the following statement, providing a clear verdict and citing credible sources to support your conclusion: {topic}",
     "bias_detection": "Analyze the following argument for cognitive biases: {topic}. Identify specific biases, explain how they manifest in the argument, and suggest ways to mitigate their influence.",
     "contract_analysis": "Analyze the following contract clause, highlighting key terms, potential risks, and suggesting improvements for clarity and fairness: {topic}",
+    "contract_breakdown": "Break the following contract clause down into its parts. For each part, write a short title, a colon and a plain-language explanation, with a blank line between parts: {topic}",
+    "contract_legal_implications": "Summarize the potential legal implications and risks of the following contract clause for each party: {topic}",
+    "contract_sentiment": "Describe the tone and sentiment of the following contract clause, and whether it favors one party over the other: {topic}",
     "salary_negotiation": "Provide comprehensive salary negotiation advice for someone with these job details: {topic}. Include market data, effective negotiation strategies, potential talking points, and how to handle common counter-offers.",
     "continue_negotiation": "You are negotiating in the following scenario: {topic}\n\nThe user has made the following offer: {user_offer}\n\nPrevious offers: {user_offers}\n\nPrevious bot responses: {bot_responses}\n\nGenerate a realistic and strategic response to the user's offer, considering the negotiation context and previous interactions.",
 }
 
 
+class PromptTemplate:
+    """
+    A prompt template, parsed once.
+
+    Example:
+        template = PromptTemplate("debate", "Debate the topic: {topic}")
+        template.fields  # frozenset({"topic"})
+        template.render(topic="Remote work")
+    """
+
+    def __init__(self, name: str, template: str):
+        """
+        Parameters:
+            name (str): The template's name, used in errors.
+            template (str): A ``str.format`` template with named fields only.
+
+        Raises:
+            ValueError: If the template is malformed or has positional fields.
+        """
+        try:
+            parsed = list(Formatter().parse(template))
+        except ValueError as e:
+            raise ValueError(f"Invalid prompt template {name}: {e}")
+        fields = set()
+        for _, field, _, _ in parsed:
+            if field is None:
+                continue
+            # "{user.name}" and "{offers[0]}" need the "user" and "offers" fields
+            field = field.split(".")[0].split("[")[0]
+            if not field or field.isdigit():
+                raise ValueError(
+                    f"Invalid prompt template {name}: fields must be named, "
+                    f"not positional"
+                )
+            fields.add(field)
+        self.name = name
+        self.template = template
+        self.fields: FrozenSet[str] = frozenset(fields)
+
+    def render(self, **kwargs: Any) -> str:
+        """
+        Fills in the template. Extra keyword arguments are ignored.
+
+        Raises:
+            KeyError: If a field is missing.
+        """
+        try:
+            return self.template.format_map(kwargs)
+        except KeyError:
+            missing = sorted(self.fields - kwargs.keys())
+            raise KeyError(f"Missing required argument: {', '.join(missing)}")
+
+
+class PromptRegistry:
+    """Named prompt templates, each parsed and validated when registered."""
+
+    def __init__(self, templates: Optional[Mapping[str, str]] = None):
+        self._templates: Dict[str, PromptTemplate] = {}
+        for name, template in (templates or {}).items():
+            self.register(name, template)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+    def register(self, name: str, template: str) -> PromptTemplate:
+        """
+        Parses a template and registers it, replacing any of the same name.
+
+        Raises:
+            ValueError: If the template is malformed.
+        """
+        self._templates[name] = PromptTemplate(name, template)
+        return self._templates[name]
+
+    def get(self, name: str) -> PromptTemplate:
+        """
+        Returns a registered template.
+
+        Raises:
+            ValueError: If no template has that name.
+        """
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise ValueError(
+                f"No prompt template found for: {name}. "
+                f"Available functionalities: {list(self._templates)}"
+            )
+
+
+prompt_registry = PromptRegistry(PROMPT_TEMPLATES)
+
+
+def _log_prompt(functionality: str, prompt: str) -> None:
+    """Logs a sample of rendered prompts, truncated, when DEBUG logging is on."""
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < PROMPT_LOG_SAMPLE_RATE:
+        logger.debug(
+            "Created %s prompt (%d chars): %.*s",
+            functionality,
+            len(prompt),
+            PROMPT_LOG_MAX_CHARS,
+            prompt,
+        )
+
+
 def create_prompt(functionality: str, **kwargs: Any) -> str:
     """
     Creates a formatted prompt for the specified functionality.
@@ -35,25 +161,19 @@ def create_prompt(functionality: str, **kwargs: Any) -> str:
     Example:
         create_prompt("debate", topic="Climate Change")
     """
-    logging.info(
-        f"Creating prompt for functionality: {functionality} with arguments: {kwargs}"
-    )
-
     if not isinstance(functionality, str):
         raise TypeError("Functionality must be a string.")
 
-    if functionality not in PROMPT_TEMPLATES:
-        logging.error(f"Functionality {functionality} not found.")
-        raise ValueError(
-            f"No prompt template found for: {functionality}. Available functionalities: {list(PROMPT_TEMPLATES.keys())}"
-        )
-
-    prompt_template = PROMPT_TEMPLATES[functionality]
+    try:
+        template = prompt_registry.get(functionality)
+    except ValueError:
+        logger.error(f"Functionality {functionality} not found.")
+        raise
 
     try:
-        prompt = prompt_template.format(**kwargs)
-        logging.info(f"Prompt created successfully: {prompt}")
-        return prompt
+        prompt = template.render(**kwargs)
     except KeyError as e:
-        logging.error(f"Missing required argument: {e.args[0]}")
-        raise KeyError(f"Missing required argument: {e.args[0]}")
+        logger.error(f"Error creating {functionality} prompt: {e.args[0]}")
+        raise
+    _log_prompt(functionality, prompt)
+    return prompt
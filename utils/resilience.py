@@ -0,0 +1,331 @@
+"""Circuit breakers and adaptive concurrency limits for the upstream bots.
+
+When a bot degrades, every handler keeps calling it and every request waits
+until its call errors. Each bot gets:
+
+- a circuit breaker, which opens when too many of the bot's recent calls
+  failed or were slow to start, and then fails calls at once for
+  BREAKER_OPEN_SECONDS; after that a few probe calls are let through
+  (half-open), and the breaker closes again if they succeed;
+- an AIMD concurrency limit on calls in flight: it grows by one call per
+  window of calls that start quickly, and is halved (at most once per
+  LIMIT_LATENCY_TARGET) when a call fails or its first token takes longer
+  than LIMIT_LATENCY_TARGET. Calls over the limit
+  wait for a slot, for at most LIMIT_QUEUE_TIMEOUT seconds.
+
+Both are applied to every call made through ``utils.upstream``.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from utils.metrics import register_metrics
+from utils.model_selection import SERVER_BOT_DEPENDENCIES
+
+logger = logging.getLogger(__name__)
+
+# Recent calls a breaker judges a bot on, and how many it needs first
+BREAKER_WINDOW = int(os.environ.get("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.environ.get("BREAKER_MIN_CALLS", "10"))
+# Share of failed, or of slow, calls in the window that opens the breaker
+BREAKER_FAILURE_RATE = float(os.environ.get("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_RATE = float(os.environ.get("BREAKER_SLOW_RATE", "0.5"))
+# Seconds to first token after which a call counts as slow
+BREAKER_SLOW_SECONDS = float(os.environ.get("BREAKER_SLOW_SECONDS", "10"))
+# Seconds an open breaker fails calls before letting probes through
+BREAKER_OPEN_SECONDS = float(os.environ.get("BREAKER_OPEN_SECONDS", "30"))
+# Probe calls allowed at once while half-open
+BREAKER_HALF_OPEN_PROBES = int(os.environ.get("BREAKER_HALF_OPEN_PROBES", "1"))
+
+# Calls in flight each bot starts with, and the bounds of its limit
+LIMIT_INITIAL = int(os.environ.get("LIMIT_INITIAL", "16"))
+LIMIT_MIN = int(os.environ.get("LIMIT_MIN", "1"))
+LIMIT_MAX = int(os.environ.get("LIMIT_MAX", "64"))
+# Seconds to first token above which the limit is halved
+LIMIT_LATENCY_TARGET = float(os.environ.get("LIMIT_LATENCY_TARGET", "5"))
+# Seconds a call waits for a slot before failing
+LIMIT_QUEUE_TIMEOUT = float(os.environ.get("LIMIT_QUEUE_TIMEOUT", "10"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailableError(RuntimeError):
+    """Raised instead of calling a bot whose breaker is open or whose
+    concurrency limit stayed full."""
+
+
+class CircuitBreaker:
+    """
+    Tracks one bot's recent calls and decides whether to let calls through.
+
+    Example:
+        breaker = CircuitBreaker("GPT-4")
+        breaker.before_call()  # raises UpstreamUnavailableError if open
+        breaker.record(ok=True, first_token_seconds=0.8)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        slow_rate: float = BREAKER_SLOW_RATE,
+        slow_seconds: float = BREAKER_SLOW_SECONDS,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        half_open_probes: int = BREAKER_HALF_OPEN_PROBES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        # (failed, slow) per recent call
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._stats = {"rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+            logger.info(f"Circuit breaker for {self.name} half-open")
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        Lets a call through, or fails it at once.
+
+        Raises:
+            UpstreamUnavailableError: If the breaker is open, or half-open with
+                its probes already in flight.
+        """
+        state = self.state
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and self._probes < self.half_open_probes:
+            self._probes += 1
+            return
+        self._stats["rejected"] += 1
+        raise UpstreamUnavailableError(
+            f"{self.name} is unavailable (circuit breaker {state})"
+        )
+
+    def record(self, ok: bool, first_token_seconds: Optional[float] = None) -> None:
+        """
+        Records the outcome of a call let through.
+
+        Parameters:
+            ok (bool): Whether the call succeeded.
+            first_token_seconds (Optional[float]): Its time to first token.
+        """
+        slow = first_token_seconds is not None and (
+            first_token_seconds > self.slow_seconds
+        )
+        if self._state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            if ok and not slow:
+                logger.info(f"Circuit breaker for {self.name} closed")
+                self._state = CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        self._outcomes.append((not ok, slow))
+        if self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+            failures = sum(failed for failed, _ in self._outcomes)
+            slow_calls = sum(slow for _, slow in self._outcomes)
+            if failures >= self.failure_rate * len(
+                self._outcomes
+            ) or slow_calls >= self.slow_rate * len(self._outcomes):
+                self._open()
+
+    def release_probe(self) -> None:
+        """Frees a probe slot for a call that ended without an outcome (cancelled)."""
+        if self._state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def _open(self) -> None:
+        logger.warning(f"Circuit breaker for {self.name} opened")
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self._stats["opened"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"state": self.state, "recent_calls": len(self._outcomes), **self._stats}
+
+
+class AIMDLimiter:
+    """
+    Limits one bot's calls in flight, adapting the limit to its latency:
+    additive increase while calls start quickly, multiplicative decrease when
+    they fail or start slowly.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = LIMIT_INITIAL,
+        minimum: int = LIMIT_MIN,
+        maximum: int = LIMIT_MAX,
+        latency_target: float = LIMIT_LATENCY_TARGET,
+        queue_timeout: float = LIMIT_QUEUE_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.queue_timeout = queue_timeout
+        self.limit = float(min(maximum, max(minimum, initial)))
+        self.in_flight = 0
+        self._clock = clock
+        self._decreased_at = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._stats = {"timeouts": 0, "decreases": 0}
+
+    async def acquire(self) -> None:
+        """
+        Takes a slot, waiting for one if the limit is reached.
+
+        Raises:
+            UpstreamUnavailableError: If no slot frees up within the timeout.
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A releasing call hands its slot over by resolving the waiter
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise UpstreamUnavailableError(
+                f"{self.name} is overloaded ({self.in_flight} calls in flight)"
+            )
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(
+        self, ok: Optional[bool] = None, first_token_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Frees a slot and adapts the limit to the call's outcome.
+
+        Parameters:
+            ok (Optional[bool]): Whether the call succeeded; None for a call
+                cancelled before it ended, which leaves the limit as is.
+            first_token_seconds (Optional[float]): Its time to first token.
+        """
+        if ok is False or (
+            first_token_seconds is not None
+            and first_token_seconds > self.latency_target
+        ):
+            # Calls in flight together mostly fail together: halve once for them
+            now = self._clock()
+            if now - self._decreased_at >= self.latency_target:
+                self._decreased_at = now
+                self.limit = max(self.minimum, self.limit / 2)
+                self._stats["decreases"] += 1
+        elif ok:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            **self._stats,
+        }
+
+
+class BotGuard:
+    """A bot's circuit breaker and concurrency limiter, applied together."""
+
+    def __init__(self, name: str):
+        self.breaker = CircuitBreaker(name)
+        self.limiter = AIMDLimiter(name)
+
+    async def acquire(self) -> None:
+        """
+        Lets a call to the bot through once it has a slot.
+
+        Raises:
+            UpstreamUnavailableError: If the breaker is open or no slot frees up.
+        """
+        self.breaker.before_call()
+        try:
+            await self.limiter.acquire()
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+
+    def release(
+        self, ok: Optional[bool], first_token_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Records the outcome of a call let through by :meth:`acquire`.
+
+        Parameters:
+            ok (Optional[bool]): Whether the call succeeded; None if it was
+                cancelled before it ended.
+            first_token_seconds (Optional[float]): Its time to first token.
+        """
+        if ok is None:
+            self.breaker.release_probe()
+        else:
+            self.breaker.record(ok, first_token_seconds)
+        self.limiter.release(ok, first_token_seconds)
+
+
+class UpstreamGuards:
+    """The :class:`BotGuard` of each upstream bot, created on first use."""
+
+    def __init__(self, bots=SERVER_BOT_DEPENDENCIES):
+        self._guards: Dict[str, BotGuard] = {bot: BotGuard(bot) for bot in bots}
+
+    def get(self, bot: str) -> BotGuard:
+        guard = self._guards.get(bot)
+        if guard is None:
+            guard = self._guards[bot] = BotGuard(bot)
+        return guard
+
+    def metrics(self) -> Dict[str, Any]:
+        """Returns each bot's breaker state and concurrency limit."""
+        return {
+            bot: {
+                "breaker": guard.breaker.metrics(),
+                "concurrency": guard.limiter.metrics(),
+            }
+            for bot, guard in self._guards.items()
+        }
+
+
+upstream_guards = UpstreamGuards()
+register_metrics("resilience", upstream_guards.metrics)
@@ -0,0 +1,164 @@
+"""Database-backed salary cache shared by every worker and container.
+
+Entries younger than the TTL are served directly. Older entries are still
+served, but trigger a refresh in the background so the next lookup gets fresh
+data (stale-while-revalidate).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.database import SalaryCacheEntry, SessionLocal
+from utils.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds a stored salary lookup counts as fresh
+SALARY_STORE_TTL = float(os.environ.get("SALARY_STORE_TTL", "86400"))
+
+Fetcher = Callable[[str, str], Awaitable[dict]]
+
+
+def salary_cache_key(job_title: str, location: str) -> str:
+    """
+    Builds the cache key for a salary lookup.
+
+    Case and surrounding/repeated whitespace are ignored, so "Software
+    Engineer" and " software  engineer" share an entry.
+
+    Parameters:
+        job_title (str): The job title.
+        location (str): The job location.
+
+    Returns:
+        str: The key, e.g. ``"software engineer|austin"``.
+    """
+    return "|".join(" ".join(part.lower().split()) for part in (job_title, location))
+
+
+class SalaryCache:
+    """
+    Stale-while-revalidate salary cache stored in the ``salary_cache`` table.
+
+    Failed lookups are never stored: they propagate to the caller on a miss,
+    and are logged (keeping the stale entry) on a background refresh. Database
+    errors are logged and the lookup falls through to the fetcher, so the cache
+    can never make a lookup fail.
+    """
+
+    def __init__(
+        self,
+        ttl: float = SALARY_STORE_TTL,
+        session_factory: Callable[[], Any] = SessionLocal,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl = ttl
+        self._session_factory = session_factory
+        self._clock = clock
+        # Background refreshes by key, so a stale entry is refreshed only once
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "errors": 0,
+        }
+
+    async def get(self, job_title: str, location: str, fetch: Fetcher) -> dict:
+        """
+        Returns the salary data for a job and location.
+
+        Parameters:
+            job_title (str): The job title.
+            location (str): The job location.
+            fetch (Fetcher): Fetches fresh data on a miss or refresh.
+
+        Returns:
+            dict: The salary data.
+
+        Raises:
+            Exception: Whatever ``fetch`` raises on a miss.
+        """
+        key = salary_cache_key(job_title, location)
+        entry = await self._load(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            data = await fetch(job_title, location)
+            await self._store(key, data)
+            return data
+
+        payload, fetched_at = entry
+        if self._clock() - fetched_at < self.ttl:
+            self._stats["hits"] += 1
+        else:
+            self._stats["stale_hits"] += 1
+            self._schedule_refresh(key, job_title, location, fetch)
+        return payload
+
+    async def stop(self) -> None:
+        """Waits for background refreshes still in progress."""
+        if self._refreshing:
+            await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+
+    def metrics(self) -> Dict[str, int]:
+        """Returns the lookup counters and the number of pending refreshes."""
+        return {**self._stats, "refreshing": len(self._refreshing)}
+
+    def _schedule_refresh(
+        self, key: str, job_title: str, location: str, fetch: Fetcher
+    ) -> None:
+        if key in self._refreshing:
+            return
+        task = asyncio.get_running_loop().create_task(
+            self._refresh(key, job_title, location, fetch)
+        )
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(
+        self, key: str, job_title: str, location: str, fetch: Fetcher
+    ) -> None:
+        try:
+            data = await fetch(job_title, location)
+        except Exception as e:
+            logger.warning(f"Error refreshing salary data for {key}: {e}")
+            return
+        await self._store(key, data)
+        self._stats["refreshes"] += 1
+
+    async def _load(self, key: str) -> Optional[tuple]:
+        try:
+            async with self._session_factory() as db:
+                entry = await db.get(SalaryCacheEntry, key)
+                if entry is None:
+                    return None
+                return json.loads(entry.payload), entry.fetched_at
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.error(f"Error reading salary cache for {key}: {e}")
+            return None
+
+    async def _store(self, key: str, data: dict) -> None:
+        try:
+            async with self._session_factory() as db:
+                await db.merge(
+                    SalaryCacheEntry(
+                        key=key, payload=json.dumps(data), fetched_at=self._clock()
+                    )
+                )
+                await db.commit()
+        except Exception as e:
+            # Another worker may have stored the same key first; either way the
+            # caller already has its data.
+            self._stats["errors"] += 1
+            logger.error(f"Error writing salary cache for {key}: {e}")
+
+
+# Process-wide cache used by fetch_salary_data
+salary_cache = SalaryCache()
+register_metrics("salary_store", salary_cache.metrics)
@@ -0,0 +1,173 @@
+"""Offline salary index: a sorted binary file that is memory-mapped and
+binary-searched, so common salary lookups need no network call.
+
+File layout (little-endian)::
+
+    header   MAGIC (4s) | VERSION (H) | record count (I)
+    records  key offset (I) | key length (H) | currency (3s) |
+             min (d) | median (d) | max (d)            -- sorted by key
+    keys     UTF-8 keys, concatenated
+
+Keys are built with :func:`utils.salary_cache.salary_cache_key`. Build an index
+with ``python scripts/build_salary_index.py``.
+"""
+
+import csv
+import json
+import mmap
+import statistics
+import struct
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from utils.salary_cache import salary_cache_key
+
+MAGIC = b"SALX"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<IH3sddd")
+
+
+def read_salary_rows(path: str) -> Iterator[Dict[str, str]]:
+    """
+    Reads salary rows from a CSV file or a JSON Lines file (``.jsonl``).
+
+    Each row needs ``job_title`` and ``location``, an optional ``currency``
+    and either a single ``salary`` or ``salary_min``, ``salary_median`` and
+    ``salary_max``.
+
+    Parameters:
+        path (str): The dataset file.
+
+    Yields:
+        Dict[str, str]: One row per salary observation.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def build_salary_index(rows: Iterable[Mapping], path: str) -> int:
+    """
+    Aggregates salary rows by normalized (title, location) and writes the index.
+
+    Rows with a single ``salary`` are combined into min/median/max; rows that
+    already carry ``salary_min``/``salary_median``/``salary_max`` are used as-is
+    (the last such row for a key wins).
+
+    Parameters:
+        rows (Iterable[Mapping]): Salary rows, e.g. from :func:`read_salary_rows`.
+        path (str): Where to write the index.
+
+    Returns:
+        int: The number of keys in the index.
+
+    Raises:
+        ValueError: If a row has no job title, location or salary.
+    """
+    samples: Dict[bytes, List[float]] = defaultdict(list)
+    ranges: Dict[bytes, Tuple[float, float, float]] = {}
+    currencies: Dict[bytes, str] = {}
+    for row in rows:
+        if not row.get("job_title") or not row.get("location"):
+            raise ValueError(f"Salary row is missing a job title or location: {row}")
+        key = salary_cache_key(row["job_title"], row["location"]).encode("utf-8")
+        currencies[key] = (row.get("currency") or "USD").upper()
+        if row.get("salary") not in (None, ""):
+            samples[key].append(float(row["salary"]))
+        elif row.get("salary_median") not in (None, ""):
+            ranges[key] = (
+                float(row["salary_min"]),
+                float(row["salary_median"]),
+                float(row["salary_max"]),
+            )
+        else:
+            raise ValueError(f"Salary row has no salary: {row}")
+
+    for key, values in samples.items():
+        ranges[key] = (min(values), statistics.median(values), max(values))
+
+    keys = sorted(ranges)
+    records = []
+    offset = 0
+    for key in keys:
+        records.append(
+            RECORD.pack(
+                offset,
+                len(key),
+                currencies[key].encode("ascii")[:3],
+                *ranges[key],
+            )
+        )
+        offset += len(key)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys)))
+        f.writelines(records)
+        f.writelines(keys)
+    return len(keys)
+
+
+class SalaryIndex:
+    """
+    Read-only view of a salary index file.
+
+    The file is memory-mapped, so opening it is cheap, pages are shared between
+    processes, and a lookup is a binary search over ``log2(n)`` records.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} salary index.")
+        self._keys_start = HEADER.size + self._count * RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Unmaps the index file."""
+        self._map.close()
+
+    def lookup(self, job_title: str, location: str) -> Optional[dict]:
+        """
+        Looks up the salary range for a job title and location.
+
+        Parameters:
+            job_title (str): The job title.
+            location (str): The job location.
+
+        Returns:
+            Optional[dict]: The median as ``average_salary`` plus ``currency``,
+            ``salary_min``, ``salary_median`` and ``salary_max``; None if the
+            index has no entry.
+        """
+        target = salary_cache_key(job_title, location).encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = RECORD.unpack_from(self._map, HEADER.size + mid * RECORD.size)
+            start = self._keys_start + record[0]
+            key = self._map[start : start + record[1]]
+            if key < target:
+                lo = mid + 1
+            elif key > target:
+                hi = mid
+            else:
+                _, _, currency, low, median, high = record
+                return {
+                    "average_salary": int(median),
+                    "currency": currency.rstrip(b"\0").decode("ascii"),
+                    "salary_min": int(low),
+                    "salary_median": int(median),
+                    "salary_max": int(high),
+                }
+        return None
@@ -0,0 +1,204 @@
+"""Batched VADER sentiment labels.
+
+VADER scores a text by summing the valences of its words, adjusted by context
+rules (negations, boosters such as "very", "but", ALL CAPS, idioms), plus a
+bonus for "!" and "?". Most texts trigger none of the context rules, so their
+score is a plain sum of lexicon valences. For those, the batch scorer looks up
+every token in a NumPy valence array and sums per text in one pass; texts
+containing any token a rule could react to are scored one at a time by the
+VADER analyzer itself. Both paths give the labels of ``analyze_sentiment``.
+"""
+
+import re
+import string
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+from utils.helpers import sentiment_label
+from utils.nltk_data import get_sentiment_analyzer
+
+_PUNCTUATION = string.punctuation
+_HAS_PUNCTUATION = re.compile(f"[{re.escape(_PUNCTUATION)}]")
+
+# Lower-cased tokens that may make VADER's context rules apply: besides
+# negations and boosters, "but", "least", "kind" (of), "sort" (of), "just"
+# (enough), "this" (scales the next word), and one word of each idiom.
+_CONTEXT_WORDS = {
+    "but",
+    "least",
+    "kind",
+    "sort",
+    "just",
+    "this",
+    "shit",
+    "bomb",
+    "ass",
+    "yeah",
+    "mustard",
+    "death",
+    "mouth",
+}
+
+
+class _SentiTokens(NamedTuple):
+    """The parts of VADER's SentiText its scoring rules read."""
+
+    words_and_emoticons: List[str]
+    is_cap_diff: bool
+
+
+class BatchSentimentScorer:
+    """
+    Labels many texts at once with the same results as VADER one by one.
+
+    Example:
+        scorer = BatchSentimentScorer()
+        scorer.labels(["I love it", "It is not good"])  # ["positive", "negative"]
+    """
+
+    def __init__(self, analyzer=None):
+        self._analyzer = analyzer or get_sentiment_analyzer()
+        constants = self._analyzer.constants
+        self._punctuation_marks = set(constants.PUNC_LIST)
+        # Vocabulary: id 0 is any word outside the lexicon
+        self._ids: Dict[str, int] = {}
+        valences = [0.0]
+        for word, valence in self._analyzer.lexicon.items():
+            self._ids[word] = len(valences)
+            valences.append(valence)
+        self._valences = np.array(valences, dtype=np.float64)
+        self._context_words = (
+            _CONTEXT_WORDS | constants.NEGATE | set(constants.BOOSTER_DICT)
+        )
+
+    def tokens(self, text: str) -> List[str]:
+        """
+        Splits a text into VADER's words and emoticons.
+
+        Gives the same tokens as ``nltk.sentiment.vader.SentiText`` (leading or
+        trailing punctuation is stripped from words, emoticons are kept)
+        without building its table of every word and punctuation pair.
+        """
+        marks = self._punctuation_marks
+        result = []
+        for token in text.split():
+            if len(token) <= 1:
+                continue
+            if token[0] in _PUNCTUATION or token[-1] in _PUNCTUATION:
+                word = token.strip(_PUNCTUATION)
+                if len(word) > 1 and not _HAS_PUNCTUATION.search(word):
+                    if token.endswith(word) and token[: -len(word)] in marks:
+                        token = word
+                    elif token.startswith(word) and token[len(word) :] in marks:
+                        token = word
+            result.append(token)
+        return result
+
+    def compound_scores(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Computes VADER's compound score of every text.
+
+        Scores from the vectorized path are not yet rounded to four decimals as
+        VADER's are; those from the scalar path are.
+
+        Parameters:
+            texts (Sequence[str]): The texts to score.
+
+        Returns:
+            np.ndarray: One score per text, in order.
+        """
+        ids = self._ids
+        context_words = self._context_words
+        token_ids: List[int] = []
+        owners: List[int] = []
+        # Texts a context rule might apply to take the scalar path
+        scalar = np.zeros(len(texts), dtype=bool)
+        tokens_by_text = [self.tokens(text) for text in texts]
+        for position, tokens in enumerate(tokens_by_text):
+            for token in tokens:
+                lowered = token.lower()
+                if lowered in context_words or "n't" in lowered or token.isupper():
+                    scalar[position] = True
+                token_ids.append(ids.get(lowered, 0))
+                owners.append(position)
+
+        # bincount adds each text's valences left to right, as VADER's sum()
+        sums = np.bincount(
+            np.array(owners, dtype=np.int64),
+            weights=self._valences[np.array(token_ids, dtype=np.int64)],
+            minlength=len(texts),
+        )
+        exclamations = np.minimum(
+            np.fromiter((t.count("!") for t in texts), np.int64, len(texts)), 4
+        )
+        questions = np.fromiter((t.count("?") for t in texts), np.int64, len(texts))
+        emphasis = exclamations * 0.292 + np.where(
+            questions > 1, np.where(questions <= 3, questions * 0.18, 0.96), 0
+        )
+        sums = np.where(
+            sums > 0, sums + emphasis, np.where(sums < 0, sums - emphasis, 0)
+        )
+        compound = sums / np.sqrt(sums * sums + 15)
+
+        for position in np.flatnonzero(scalar).tolist():
+            compound[position] = self._scalar_compound(
+                texts[position], tokens_by_text[position]
+            )
+        return compound
+
+    def _scalar_compound(self, text: str, tokens: List[str]) -> float:
+        """
+        Scores one text with VADER's own rules.
+
+        Follows ``SentimentIntensityAnalyzer.polarity_scores`` but reuses the
+        tokens already split, which is most of VADER's cost per text.
+        """
+        analyzer = self._analyzer
+        boosters = analyzer.constants.BOOSTER_DICT
+        caps = sum(token.isupper() for token in tokens)
+        sentitext = _SentiTokens(tokens, 0 < len(tokens) - caps < len(tokens))
+        # VADER scores a repeated token by the context of its first occurrence
+        first_index: Dict[str, int] = {}
+        for i, token in enumerate(tokens):
+            first_index.setdefault(token, i)
+        sentiments: List[float] = []
+        for token in tokens:
+            i = first_index[token]
+            lowered = token.lower()
+            if (
+                i < len(tokens) - 1
+                and lowered == "kind"
+                and tokens[i + 1].lower() == "of"
+            ) or lowered in boosters:
+                sentiments.append(0)
+                continue
+            sentiments = analyzer.sentiment_valence(0, sentitext, token, i, sentiments)
+        sentiments = analyzer._but_check(tokens, sentiments)
+        return analyzer.score_valence(sentiments, text)["compound"]
+
+    def labels(self, texts: Sequence[str]) -> List[str]:
+        """
+        Labels every text as positive, negative, neutral or mixed.
+
+        Parameters:
+            texts (Sequence[str]): The texts to label.
+
+        Returns:
+            List[str]: One label per text, in order.
+        """
+        return [
+            sentiment_label(round(compound, 4))
+            for compound in self.compound_scores(texts).tolist()
+        ]
+
+
+_scorer = None
+
+
+def get_batch_scorer() -> BatchSentimentScorer:
+    """Returns the shared batch scorer, built on first call."""
+    global _scorer
+    if _scorer is None:
+        _scorer = BatchSentimentScorer()
+    return _scorer
@@ -0,0 +1,167 @@
+"""Coalesces streamed text chunks into fewer, larger response events.
+
+Upstream bots stream a response a token or two at a time, and each chunk a
+handler yields becomes its own server-sent event: serialized to JSON, framed
+and written. :func:`coalesce_chunks` joins consecutive text chunks into one
+frame until it holds STREAM_COALESCE_BYTES of text or STREAM_COALESCE_INTERVAL
+seconds have passed since the last frame was sent. The first chunk is sent at
+once, so the time to the first visible token is unchanged. Anything other than
+plain text (errors, replacements, suggested replies) flushes the pending text
+and passes through in order.
+"""
+
+import asyncio
+import os
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, NamedTuple, Optional
+
+import fastapi_poe as fp
+
+from utils.metrics import register_metrics
+
+# Text, in bytes, that makes a frame be sent; 0 turns coalescing off
+STREAM_COALESCE_BYTES = int(os.environ.get("STREAM_COALESCE_BYTES", "512"))
+# Longest a chunk waits for more text, in seconds
+STREAM_COALESCE_INTERVAL = float(os.environ.get("STREAM_COALESCE_INTERVAL", "0.05"))
+
+_stats = {"chunks": 0, "frames": 0}
+
+
+def is_text_chunk(msg: Any) -> bool:
+    """Whether a message is plain response text that can be joined with others."""
+    return (
+        type(msg) is fp.PartialResponse
+        and not msg.is_suggested_reply
+        and not msg.is_replace_response
+        and msg.data is None
+    )
+
+
+class _Failure(NamedTuple):
+    """An exception raised by the stream, to re-raise to the consumer."""
+
+    error: BaseException
+
+
+_END = object()  # Marks the end of the stream in the queue
+_TICK = object()  # Marks that the pending text is due
+
+
+async def _produce(messages: AsyncIterable[Any], queue: asyncio.Queue) -> None:
+    """Drains a stream into a queue, in a task of its own."""
+    try:
+        async for msg in messages:
+            queue.put_nowait(msg)
+    except Exception as e:
+        queue.put_nowait(_Failure(e))
+    else:
+        queue.put_nowait(_END)
+
+
+async def coalesce_chunks(
+    messages: AsyncIterable[Any],
+    max_bytes: Optional[int] = None,
+    interval: Optional[float] = None,
+) -> AsyncIterator[Any]:
+    """
+    Joins consecutive text chunks of a response stream into frames.
+
+    The stream is read by a separate task, so pending text is sent once the
+    interval passes even while the stream is waiting on an upstream bot. The
+    whole stream runs in that one task, as it would have run in the caller's;
+    a chunk costs a queue hand-off, and a frame one timer.
+
+    Parameters:
+        messages (AsyncIterable[Any]): The handler's response stream.
+        max_bytes (Optional[int]): Bytes of text that make a frame be sent.
+            Defaults to STREAM_COALESCE_BYTES; 0 or less passes chunks through.
+        interval (Optional[float]): Seconds a chunk may wait for more text.
+            Defaults to STREAM_COALESCE_INTERVAL.
+
+    Yields:
+        Any: The first chunk as is, then coalesced ``fp.PartialResponse``
+        frames and, in order, every message that is not plain text.
+
+    Raises:
+        Exception: Whatever the stream raises, after the text before it is sent.
+    """
+    max_bytes = STREAM_COALESCE_BYTES if max_bytes is None else max_bytes
+    interval = STREAM_COALESCE_INTERVAL if interval is None else interval
+    if max_bytes <= 0:
+        async for msg in messages:
+            yield msg
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    producer = asyncio.create_task(_produce(messages, queue))
+    # Posts _TICK to the queue when the pending text is due
+    timer: Optional[asyncio.TimerHandle] = None
+    pending: List[str] = []
+    pending_bytes = 0
+    sent_first = False
+
+    def flush() -> fp.PartialResponse:
+        nonlocal pending_bytes, timer
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        frame = fp.PartialResponse(text="".join(pending))
+        pending.clear()
+        pending_bytes = 0
+        _stats["frames"] += 1
+        return frame
+
+    try:
+        while True:
+            msg = await queue.get()
+            if msg is _TICK:
+                if pending:
+                    yield flush()
+                continue
+            if msg is _END:
+                break
+            if isinstance(msg, _Failure):
+                if pending:
+                    yield flush()
+                raise msg.error
+            if not is_text_chunk(msg):
+                if pending:
+                    yield flush()
+                yield msg
+                continue
+            _stats["chunks"] += 1
+            if not sent_first:
+                sent_first = True
+                _stats["frames"] += 1
+                yield msg
+                continue
+            pending.append(msg.text)
+            pending_bytes += len(msg.text.encode())
+            if pending_bytes >= max_bytes:
+                yield flush()
+            elif timer is None:
+                timer = loop.call_later(interval, queue.put_nowait, _TICK)
+        if pending:
+            yield flush()
+    finally:
+        if timer is not None:
+            timer.cancel()
+        # Stops the stream if the consumer went away before it ended
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+
+def streaming_metrics() -> Dict[str, Any]:
+    """Returns how many text chunks were coalesced into how many frames."""
+    chunks, frames = _stats["chunks"], _stats["frames"]
+    return {
+        "max_bytes": STREAM_COALESCE_BYTES,
+        "interval": STREAM_COALESCE_INTERVAL,
+        "chunks": chunks,
+        "frames": frames,
+        "chunks_per_frame": round(chunks / frames, 2) if frames else 0.0,
+    }
+
+
+register_metrics("streaming", streaming_metrics)
@@ -0,0 +1,158 @@
+"""Multi-pattern text matching over streamed text (Aho-Corasick)."""
+
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+
+class Match(NamedTuple):
+    """A pattern occurrence; ``start``/``end`` are offsets into the whole stream."""
+
+    pattern: str
+    start: int
+    end: int
+
+
+class PatternMatcher:
+    """
+    Finds every occurrence of a fixed set of patterns in one pass over the text.
+
+    The patterns are compiled once into an Aho-Corasick automaton, so scanning
+    costs one transition per character however many patterns there are.
+    Matching is case-insensitive by default.
+
+    Example:
+        matcher = PatternMatcher(["Halo Effect", "Anchoring Bias"])
+        scanner = matcher.scanner()
+        for chunk in ("...the halo ef", "fect and ..."):
+            scanner.feed(chunk)
+        scanner.patterns  # ["Halo Effect"]
+    """
+
+    def __init__(self, patterns: Iterable[str], case_insensitive: bool = True):
+        self.patterns: List[str] = list(patterns)
+        self.case_insensitive = case_insensitive
+        # State 0 is the root. _goto[s] maps a character to the next state,
+        # _fail[s] is the longest proper suffix state, _out[s] holds the
+        # indices of the patterns ending at s (including via fail links).
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for i, pattern in enumerate(self.patterns):
+            self._add(self._normalize(pattern), i)
+        self._link()
+        # Fail links resolved ahead of time: _delta[s][c] is the next state
+        # for every character that leads anywhere but the root, so scanning
+        # is a single dict lookup per character.
+        self._delta: List[Dict[str, int]] = self._compile()
+
+    def _normalize(self, text: str) -> str:
+        return text.lower() if self.case_insensitive else text
+
+    def _add(self, pattern: str, index: int) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._out[state].append(index)
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def _compile(self) -> List[Dict[str, int]]:
+        delta: List[Dict[str, int]] = [dict(self._goto[0])]
+        # Breadth-first, so a state's fail state is always compiled before it
+        order = list(self._goto[0].values())
+        for state in order:
+            order.extend(self._goto[state].values())
+        delta.extend({} for _ in order)
+        for state in order:
+            delta[state] = {**delta[self._fail[state]], **self._goto[state]}
+        return delta
+
+    def scanner(self) -> "StreamScanner":
+        """Returns a scanner for one stream of text."""
+        return StreamScanner(self)
+
+    def find_all(self, text: str) -> List[Match]:
+        """
+        Finds the first occurrence of each pattern in a complete text.
+
+        Parameters:
+            text (str): The text to scan.
+
+        Returns:
+            List[Match]: One match per pattern found, in order of occurrence.
+        """
+        scanner = self.scanner()
+        scanner.feed(text)
+        return scanner.matches
+
+
+class StreamScanner:
+    """
+    Incremental scan of a text that arrives in chunks.
+
+    The automaton state carries over between :meth:`feed` calls, so a pattern
+    split across two chunks is still found. Each pattern is reported once, at
+    its first occurrence.
+    """
+
+    def __init__(self, matcher: PatternMatcher):
+        self._matcher = matcher
+        self._state = 0
+        self._offset = 0
+        self._seen: Set[int] = set()
+        self.matches: List[Match] = []
+
+    @property
+    def patterns(self) -> List[str]:
+        """The patterns found so far, in order of first occurrence."""
+        return [match.pattern for match in self.matches]
+
+    def feed(self, chunk: str) -> List[Match]:
+        """
+        Scans the next chunk of the stream.
+
+        Parameters:
+            chunk (str): The next piece of text.
+
+        Returns:
+            List[Match]: Patterns found for the first time in this chunk.
+        """
+        matcher = self._matcher
+        self._offset += len(chunk)
+        if len(self._seen) == len(matcher.patterns):
+            return []  # Every pattern has already been reported
+        delta, out = matcher._delta, matcher._out
+        patterns = matcher.patterns
+        state = self._state
+        offset = self._offset - len(chunk)
+        new_matches = []
+        for i, char in enumerate(matcher._normalize(chunk)):
+            state = delta[state].get(char, 0)
+            if out[state]:
+                for index in out[state]:
+                    if index not in self._seen:
+                        self._seen.add(index)
+                        end = offset + i + 1
+                        new_matches.append(
+                            Match(patterns[index], end - len(patterns[index]), end)
+                        )
+        self._state = state
+        self.matches.extend(new_matches)
+        return new_matches
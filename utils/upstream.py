@@ -0,0 +1,167 @@
+"""Helpers for calling the upstream Poe bots."""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional
+
+import fastapi_poe as fp
+
+from utils.context_budget import fit_to_budget
+from utils.hedging import hedge_policy, hedged_stream
+from utils.llm_cache import response_cache, response_cache_key
+from utils.model_selection import model_selector, request_calls
+from utils.resilience import UpstreamUnavailableError, upstream_guards
+
+
+def fork_request(
+    request: fp.QueryRequest, messages: Iterable[fp.ProtocolMessage] = ()
+) -> fp.QueryRequest:
+    """
+    Copies a request with extra messages appended to a copy of its query.
+
+    Concurrent upstream calls each need their own conversation; appending to
+    the shared ``request.query`` would mix their prompts together.
+
+    Parameters:
+        request (fp.QueryRequest): The incoming request.
+        messages (Iterable[fp.ProtocolMessage]): Messages to append.
+
+    Returns:
+        fp.QueryRequest: The copy; ``request`` itself is left unchanged.
+    """
+    return request.model_copy(update={"query": [*request.query, *messages]})
+
+
+async def _timed_stream(
+    request: fp.QueryRequest, bot_name: str, api_key: str, **kwargs: Any
+) -> AsyncIterator[fp.PartialResponse]:
+    """
+    Calls ``fp.stream_request`` through the bot's circuit breaker and
+    concurrency limit (see ``utils.resilience``), recording the bot's latency
+    and errors for model selection and hedging.
+
+    Raises:
+        UpstreamUnavailableError: If the bot's breaker is open or its
+            concurrency limit stays full.
+    """
+    guard = upstream_guards.get(bot_name)
+    try:
+        await guard.acquire()
+    except UpstreamUnavailableError:
+        model_selector.record_error(bot_name)
+        raise
+    start = time.monotonic()
+    first_token = None
+    ok = None  # Stays None if the call is cancelled or abandoned
+    try:
+        async for msg in fp.stream_request(request, bot_name, api_key, **kwargs):
+            if first_token is None:
+                first_token = time.monotonic() - start
+                hedge_policy.record_first_token(bot_name, first_token)
+            yield msg
+        ok = True
+    except asyncio.CancelledError:
+        # A hedged call that lost: its first token took at least this long
+        if first_token is None:
+            hedge_policy.record_first_token(bot_name, time.monotonic() - start)
+        raise
+    except Exception:
+        ok = False
+        model_selector.record_error(bot_name)
+        raise
+    finally:
+        guard.release(ok, first_token)
+    duration = time.monotonic() - start
+    model_selector.record_success(
+        bot_name, duration if first_token is None else first_token, duration
+    )
+
+
+def _call_upstream(
+    request: fp.QueryRequest,
+    bot_name: str,
+    api_key: str,
+    on_answer: Optional[Callable[[str], None]] = None,
+    **kwargs: Any,
+) -> AsyncIterator[fp.PartialResponse]:
+    """Calls a bot, hedged with an alternate if its first token is late (see
+    ``utils.hedging``); ``on_answer`` is told which bot's response streams."""
+
+    def start(bot: str) -> AsyncIterator[fp.PartialResponse]:
+        if bot != bot_name:
+            return _timed_stream(fit_to_budget(request, bot), bot, api_key, **kwargs)
+        return _timed_stream(request, bot, api_key, **kwargs)
+
+    return hedged_stream(start, bot_name, request.message_id, on_answer=on_answer)
+
+
+async def stream_request(
+    request: fp.QueryRequest,
+    bot_name: str,
+    api_key: str = "",
+    handler: Optional[str] = None,
+    **kwargs: Any,
+) -> AsyncIterator[fp.PartialResponse]:
+    """
+    Streams a response from an upstream bot, through the response cache.
+
+    With a handler given, the bot named is only the default: the call goes to
+    the bot ``utils.model_selection`` picks for the prompt, within the bots'
+    per-request call budgets. The conversation is then trimmed to that bot's
+    token budget (see ``utils.context_budget``). If the handler's responses
+    are cached, a cached response from the bot named to the conversation
+    passed in is replayed chunk by chunk. Otherwise the bot is called through
+    its circuit breaker and concurrency limit (see ``utils.resilience``),
+    hedged with an alternate bot if its first token is late (see
+    ``utils.hedging``); if the handler's responses are cached, the stream
+    completes and the bot named is the one that answered, the chunks are
+    stored for the next identical request.
+
+    Parameters:
+        request (fp.QueryRequest): The request to send.
+        bot_name (str): The upstream bot the call site names.
+        api_key (str): The Poe access key.
+        handler (Optional[str]): The calling handler, which selects the cache
+            TTL (see ``utils.llm_cache.DEFAULT_HANDLER_TTLS``). Without one the
+            response is not cached.
+        **kwargs: Passed on to ``fp.stream_request``.
+
+    Yields:
+        fp.PartialResponse: The response chunks.
+    """
+    named_bot, query = bot_name, request.query
+    if handler is not None:
+        bot_name = model_selector.select(
+            handler, request.query, bot_name, request.message_id
+        )
+    # Counted as soon as it is chosen, so concurrent calls for the same Poe
+    # request see it against the budget
+    request_calls.record(request.message_id, bot_name)
+    request = fit_to_budget(request, bot_name)
+    if not response_cache.ttl(handler):
+        async for msg in _call_upstream(request, bot_name, api_key, **kwargs):
+            yield msg
+        return
+
+    # Keyed on what the call site asked for, not on the bot selected
+    key = response_cache_key(named_bot, query)
+    cached = await response_cache.get(handler, key, named_bot)
+    if cached is not None:
+        for text, is_suggested_reply, is_replace_response in cached:
+            yield fp.PartialResponse(
+                text=text,
+                is_suggested_reply=is_suggested_reply,
+                is_replace_response=is_replace_response,
+            )
+        return
+
+    chunks = []
+    answered_by: List[str] = []
+    async for msg in _call_upstream(
+        request, bot_name, api_key, on_answer=answered_by.append, **kwargs
+    ):
+        chunks.append((msg.text, msg.is_suggested_reply, msg.is_replace_response))
+        yield msg
+    # Another bot's answer is not replayed as the named bot's
+    if answered_by == [named_bot]:
+        await response_cache.set(handler, key, named_bot, chunks)